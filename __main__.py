@@ -22,7 +22,12 @@ Date:   November 1, 2017 (Python 3 Version)
 """
 from consts import *
 from app import *
+import argparse
 
 # Application code
 if __name__ == '__main__':
-    Invaders(width=GAME_WIDTH,height=GAME_HEIGHT).run()
+    # Kivy keeps any options after -- for us (e.g. python . -- --seed 42)
+    parser = argparse.ArgumentParser(prog='Alien Invaders')
+    parser.add_argument('--seed',type=int,default=None,help='seed for a reproducible game')
+    args, _ = parser.parse_known_args()
+    Invaders(width=GAME_WIDTH,height=GAME_HEIGHT,seed=args.seed).run()
@@ -23,10 +23,82 @@ Added background image and instructions in title screen
 
 """
 import cornell
+import random
 from consts import *
 from game2d import *
 from wave import *
 
+# The factor applied to the alien speed (a step delay) every time a wave is won
+WAVE_SPEEDUP = 0.85
+
+# The drawing layers; the wave draws itself in layer 0, between these two
+LAYER_BACKGROUND = -1
+LAYER_TEXT = 1
+
+# The outcomes of a single frame of a wave, as returned by playWave
+OUTCOME_PLAYING = 0
+OUTCOME_WON = 1
+OUTCOME_LIFE_LOST = 2
+OUTCOME_GAME_OVER = 3
+
+
+def playWave(wave, input, dt, speed, volume):
+    """
+    Returns the outcome of playing a single frame of a wave
+    
+    These are the rules of the game, shared by Invaders and the headless 
+    players in environment.py: the wave is won when its win/lose flag is 1, 
+    a life is lost when the number of lives drops but stays above 0, and the 
+    game is over when there are no lives left (which marks the wave as lost).
+    
+    Parameter wave: the wave to play
+    Precondition: wave is a Wave
+    
+    Parameter input: the keys held down this frame
+    Precondition: input is a GInput
+    
+    Parameter dt: The time in seconds since last update
+    Precondition: dt is a number (int or float)
+    
+    Parameter speed: the alien speed (a step delay)
+    Precondition: speed is a number > 0
+    
+    Parameter volume: the volume of the sound effects
+    Precondition: volume is a number between 0 and 1
+    """
+    initiallives = wave.getLives()
+    wave.waveUpdate(input, dt, speed, volume)
+    if wave.getWinLose() == 1:
+        return OUTCOME_WON
+    elif wave.getLives() != initiallives and wave.getLives() > 0:
+        return OUTCOME_LIFE_LOST
+    elif wave.getLives() == 0:
+        wave.setWinLose(0)
+        return OUTCOME_GAME_OVER
+    return OUTCOME_PLAYING
+
+
+def freshWave(wave, fresh):
+    """
+    Returns the pair (wave, fresh) for the start of a new wave
+    
+    The first wave is built from scratch, and fresh is a snapshot of it. Every 
+    wave after that restores this snapshot into the existing wave, which reuses 
+    all of its aliens, labels and sounds instead of building them again.
+    
+    Parameter wave: the current wave
+    Precondition: wave is a Wave or None
+    
+    Parameter fresh: the snapshot of a newly built wave
+    Precondition: fresh is a GSnapshot or None
+    """
+    if wave is None or fresh is None:
+        wave = Wave()
+        fresh = GSnapshot(wave)
+    else:
+        fresh.restore(wave)
+    return (wave, fresh)
+
 
 # PRIMARY RULE: Invaders can only access attributes in wave.py via getters/setters
 # Invaders is NOT allowed to access anything in models.py
@@ -54,24 +126,27 @@ class Invaders(GameApp):
     its own update and draw method.
     
     The primary purpose of this class is to manage the game state: which is when the 
-    game started, paused, completed, etc. It keeps track of that in an attribute
-    called _state.
+    game started, paused, completed, etc. It keeps track of that in a state machine
+    in the attribute _machine.  Each state has its own methods to update and draw it,
+    and to build its messages when it is entered.
     
     INSTANCE ATTRIBUTES:
         view:   the game view, used in drawing (see examples from class)
                 [instance of GView; it is inherited from GameApp]
         input:  the user input, used to control the ship and change state
                 [instance of GInput; it is inherited from GameApp]
-        _state: the current state of the game represented as a value from consts.py
-                [one of STATE_INACTIVE, STATE_NEWWAVE, STATE_ACTIVE, STATE_PAUSED, STATE_CONTINUE, STATE_COMPLETE]
+        _machine: the state machine; its attribute state is the current state of the
+                game represented as a value from consts.py
+                [GStateMachine with the states STATE_INACTIVE, STATE_NEWWAVE, STATE_ACTIVE,
+                 STATE_PAUSED, STATE_CONTINUE, STATE_WON and STATE_LOST]
         _wave:  the subcontroller for a single wave, which manages the ships and aliens
                 [Wave, or None if there is no wave currently active]
         _text:  the currently active message
                 [GLabel, or None if there is no message to display]
     
     STATE SPECIFIC INVARIANTS: 
-        Attribute _wave is only None if _state is STATE_INACTIVE.
-        Attribute _text is only None if _state is STATE_ACTIVE.
+        Attribute _wave is only None if the state is STATE_INACTIVE.
+        Attribute _text is only None if the state is STATE_ACTIVE.
     
     For a complete description of how the states work, see the specification for the
     method update.
@@ -82,15 +157,17 @@ class Invaders(GameApp):
     
     LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY:
         _text2:  the second currently active message [GLabel or None]
-        _last:   the variable that ensures that once a key is pressed and held, the
-                 function associated with that button executes only once [int >= 0]
-        _mlast:  the variable that ensures that once the mute key is pressed and held, the
-                 function associated with that button executes only once [int >= 0]
+        _instructs: the game instructions, shown in STATE_INACTIVE [list of GLabel,
+                 empty in every other state]
+        _displayWavesText: the wave counter, shown in STATE_ACTIVE and STATE_PAUSED
+                 [GLabel, or None in every other state]
         _speedMod: the modifier to increase alien speed between waves [double > 0]
         _waveCount: the number of the current wave [int >= 1]
         _background: the background image [GImage]
-        _song:   the background music [Sound]
-        _volume: the multiplier for volume of all sounds and music [double >= 0]
+        _fresh:  the snapshot of a newly built wave, used to start the next wave
+                 without building it again [GSnapshot, or None before the first wave]
+        _detail: whether to draw the background image; the governor turns this off
+                 when the game cannot keep up with its frame rate [bool]
         
     """
     
@@ -106,25 +183,45 @@ class Invaders(GameApp):
         You should use it to initialize any game specific attributes.
         
         This method should make sure that all of the attributes satisfy the given 
-        invariants. When done, it sets the _state to STATE_INACTIVE and create a message 
+        invariants. When done, it sets the state to STATE_INACTIVE, which creates a message 
         (in attribute _text) saying that the user should press to play a game.
+        
+        The module random is seeded with the seed of the game, so a game started 
+        with the same seed plays the same way.
         """
         # IMPLEMENT ME
-        self._state = STATE_INACTIVE
+        # The wave draws from the module random, not the stream of the game
+        random.seed(self.random.seed)
         self._wave = None
-        self.welcomeMessage()
-        self._last = 0
-        self._text2 = GLabel(text = '')
+        self._text = None
+        self._text2 = None
+        self._instructs = []
+        self._displayWavesText = None
         self._speedMod = ALIEN_SPEED
         self._waveCount = 1
         self._background = GImage(x = GAME_WIDTH/2, y = GAME_HEIGHT/2,
                                   width = GAME_WIDTH, height = GAME_HEIGHT, source = 'Background5.png')
-        self.instructionsText()
-        self._song = Sound('Superboy.mp3')
-        self._volume = GAME_VOLUME
-        self._song.volume = SONG_VOLUME
-        self._song.play(True)
-        self._mlast = 0
+        self.music.volume = SONG_VOLUME
+        self.music.play('Superboy.mp3')
+        self._fresh = None
+        self._detail = True
+        self.governor.register('background',self.lowerDetail,self.raiseDetail)
+        
+        # Each state builds its messages when entered and lets go of them when left
+        self._machine = GStateMachine(
+            GState(STATE_INACTIVE, update=self.startUpdate, draw=self.messageDraw,
+                   enter=self.titleText, exit=self.clearText, static=True),
+            GState(STATE_NEWWAVE, enter=self.newWave, exit=self.clearText),
+            GState(STATE_ACTIVE, update=self.activeUpdate, draw=self.activeDraw,
+                   enter=self.displayWavesText, exit=self.clearText),
+            GState(STATE_PAUSED, update=self.pausedUpdate, draw=self.pausedDraw,
+                   enter=self.pausedText, exit=self.clearText, static=True),
+            GState(STATE_CONTINUE, enter=self.continueWave, exit=self.clearText),
+            GState(STATE_WON, update=self.wonUpdate, draw=self.messageDraw,
+                   enter=self.wonText, exit=self.clearText, static=True),
+            GState(STATE_LOST, update=self.startUpdate, draw=self.messageDraw,
+                   enter=self.lostText, exit=self.clearText, static=True))
+        self._machine.state = STATE_INACTIVE
 
 
     def update(self,dt):
@@ -134,7 +231,9 @@ class Invaders(GameApp):
         It is the method that does most of the work. It is NOT in charge of playing the
         game.  That is the purpose of the class Wave. The primary purpose of this
         game is to determine the current state, and -- if the game is active -- pass
-        the input to the Wave object _wave to play the game.
+        the input to the Wave object _wave to play the game.  The state machine in
+        _machine only runs the update method of the current state, and a state
+        change builds the messages of the new state once.
         
         As part of the assignment, you are allowed to add your own states. However, at
         a minimum you must support the following states: STATE_INACTIVE, STATE_NEWWAVE,
@@ -165,7 +264,11 @@ class Invaders(GameApp):
         previous frame, and the player pressed a key. This state only lasts one animation 
         frame before switching to STATE_ACTIVE.
         
-        STATE_COMPLETE: The wave is over, and is either won or lost.
+        STATE_COMPLETE: The wave is over, and is either won or lost.  This is split into
+        STATE_WON and STATE_LOST.
+        
+        STATE_INACTIVE, STATE_PAUSED, STATE_WON and STATE_LOST are static: nothing moves
+        until the player presses a key, so the game stops redrawing the screen.
         
         You are allowed to add more states if you wish. Should you do so, you should 
         describe them here.
@@ -174,39 +277,9 @@ class Invaders(GameApp):
         Precondition: dt is a number (int or float)
         """
         # IMPLEMENT ME
-        self.welcomeMessage()
-        if self._state == STATE_INACTIVE:
-            self.buttonPress()
-            self.instructionsText()
-        if self._state == STATE_NEWWAVE:
-            self._wave = Wave()
-            self._state = STATE_ACTIVE
-        if self._state == STATE_ACTIVE:
-            initiallives = self._wave.getLives()
-            self._wave.waveUpdate(self.input, dt, self._speedMod, self._volume)
-            if self._wave.getWinLose() == 1:
-                self._state = STATE_WON
-                self.welcomeMessage()
-                self._waveCount += 1
-            elif self._wave.getLives() != initiallives and self._wave.getLives() > 0:
-                self._state = STATE_PAUSED
-                self.welcomeMessage()
-            elif self._wave.getLives() == 0:
-                self._wave.setWinLose(0)
-                self._state = STATE_LOST
-                self._waveCount = 1
-                self.welcomeMessage()
-        if self._state == STATE_PAUSED:
-            self.spacePress()
-        if self._state == STATE_CONTINUE:
-            self._wave.setCont(1)
-            self._state = STATE_ACTIVE
-        if self._state == STATE_WON:
-            self.buttonPress()
-        if self._state == STATE_LOST:
-            self.buttonPress()
-            self._speedMod = ALIEN_SPEED
+        self._machine.update(dt)
         self.muter()
+        self.static = self._machine.static
             
 
     def draw(self):
@@ -222,110 +295,234 @@ class Invaders(GameApp):
         the example subcontroller.py from class.
         """
         # IMPLEMENT ME
-        self._background.draw(self.view)
-        if self._state == STATE_INACTIVE:
-            self._instructs1.draw(self.view)
-            self._instructs2.draw(self.view)
-            self._instructs3.draw(self.view)
-            self._instructs4.draw(self.view)
-            self._instructs5.draw(self.view)
-            self._text.draw(self.view)
-            self._text2.draw(self.view)
-        if self._state == STATE_LOST:
-            self._text.draw(self.view)
-            self._text2.draw(self.view)
-        if (self._state == STATE_NEWWAVE or self._state == STATE_ACTIVE
-            or self._state == STATE_CONTINUE):
-            self._wave.waveDraw(self.view)
-            self.displayWavesText()
-            self._displayWavesText.draw(self.view)
-        if self._state == STATE_PAUSED:
-            self.displayWavesText()
-            self._wave.waveDraw(self.view)
-            self._text.draw(self.view)
-            self._displayWavesText.draw(self.view)
-        if self._state == STATE_WON:
-            self._text.draw(self.view)
-            self._text2.draw(self.view)
+        if self._detail:
+            self._background.draw(self.view,LAYER_BACKGROUND)
+        self._machine.draw(self.view)
             
             
-    def welcomeMessage(self):
-        """
-        Sets the active message to be displayed depending on the value of _state
-        
-        Since the game has to display different messages depending on which part
-        of the game is currently running, this helper method is needed for that
-        functionality (i.e. none for STATE_ACTIVE, "congratulations" for
-        STATE_WON, etc.).
-        
-        Parameters: none
-        """
-        if self._state == STATE_ACTIVE:
-            self._text = None
-        elif self._state == STATE_PAUSED:
-            self.pausedText()
-        elif self._state == STATE_LOST:
-            self.lostText()
-        elif self._state == STATE_WON:
-            self.wonText()
-        elif self._state == STATE_INACTIVE:
-            self._text = GLabel(text = "Press Enter to Start")
-            self._text.font_size = 40
-            self._text.x = GAME_WIDTH/2
-            self._text.y = GAME_HEIGHT/2 + 10
-            self._text.font_name = 'RetroGame.ttf'
-            self._text.linecolor = 'green'
-            self._text2 = GLabel(text = "Alien Invaders")
-            self._text2.font_size = 60
-            self._text2.x = GAME_WIDTH/2
-            self._text2.y = GAME_HEIGHT/2 + 100
-            self._text2.font_name = 'RetroGame.ttf'
-            self._text2.linecolor = 'green'
-
+    def activeUpdate(self,dt):
+        """
+        Animates a single frame of STATE_ACTIVE
+        
+        The input is passed to the wave, which plays the game (see playWave).  
+        Afterwards this switches state if the wave was won, a life was lost, or 
+        the game was lost.
+        
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        with self.tracer.span('Wave.waveUpdate'):
+            outcome = playWave(self._wave, self.input, dt, self._speedMod, GAME_VOLUME)
+        if outcome == OUTCOME_WON:
+            self._waveCount += 1
+            self._machine.state = STATE_WON
+        elif outcome == OUTCOME_LIFE_LOST:
+            self._machine.state = STATE_PAUSED
+        elif outcome == OUTCOME_GAME_OVER:
+            self._waveCount = 1
+            self._speedMod = ALIEN_SPEED
+            self._machine.state = STATE_LOST
+            
+            
+    def startUpdate(self,dt):
+        """
+        Starts a new game when the player presses "enter"
+        
+        This is the update method of STATE_INACTIVE and STATE_LOST; the "enter"
+        button starts the game from the starting screen and restarts it after 
+        losing. This function is inspired by the determineState method from 
+        state.py written by Walker M. White. It uses the edge-triggered 
+        was_pressed query of the input, so only the press itself changes the 
+        state; holding the button down will not alter the state again.
+        
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        if self.input.was_pressed('enter'):
+            self._machine.state = STATE_NEWWAVE
+            
+            
+    def wonUpdate(self,dt):
+        """
+        Starts the next wave when the player presses "enter"
+        
+        This is the update method of STATE_WON. It also speeds up the aliens by
+        a factor of WAVE_SPEEDUP (stored in self._speedMod) every time a wave is
+        completed and a new one is started.
+        
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        if self.input.was_pressed('enter'):
+            self._speedMod = self._speedMod * WAVE_SPEEDUP
+            self._machine.state = STATE_NEWWAVE
             
-    def buttonPress(self):
+            
+    def pausedUpdate(self,dt):
         """
-        Function to handle the input specifically for "enter"
+        Continues the game when the player presses "spacebar"
         
-        The "enter" button is used specifically for starting the game from the
-        starting screen as well as for restarting a game after losing. This
-        function is inspired by the determineState method from state.py written
-        by Walker M. White. It is to ensure that when the enter button is pressed,
-        only the first input registers and changes the state; any subsequent
-        input readings from the button being held will not alter the state.
+        This is the update method of STATE_PAUSED. The "spacebar" button is used
+        to start a new life once one is lost and the game is momentarily paused.
         
-        This function also serves the purpose of speeding up the aliens by a
-        factor of 0.85 (stored in self._speedMod) every time a wave is completed
-        and a new one is started.
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        if self.input.was_pressed('spacebar'):
+            self._machine.state = STATE_CONTINUE
+            
+            
+    def activeDraw(self,view):
+        """
+        Draws the wave and the wave counter in STATE_ACTIVE
+        
+        Parameter view: the view to draw to
+        Precondition: view is a GView
+        """
+        with self.tracer.span('Wave.waveDraw'):
+            self._wave.waveDraw(view)
+        self._displayWavesText.draw(view,LAYER_TEXT)
+            
+            
+    def pausedDraw(self,view):
+        """
+        Draws the wave, the wave counter and the paused message in STATE_PAUSED
+        
+        Parameter view: the view to draw to
+        Precondition: view is a GView
+        """
+        with self.tracer.span('Wave.waveDraw'):
+            self._wave.waveDraw(view)
+        self._text.draw(view,LAYER_TEXT)
+        self._displayWavesText.draw(view,LAYER_TEXT)
+            
+            
+    def messageDraw(self,view):
+        """
+        Draws the messages of STATE_INACTIVE, STATE_WON and STATE_LOST
+        
+        The instructions are only drawn on the title screen.
+        
+        Parameter view: the view to draw to
+        Precondition: view is a GView
+        """
+        for label in self._instructs:
+            label.draw(view,LAYER_TEXT)
+        self._text.draw(view,LAYER_TEXT)
+        self._text2.draw(view,LAYER_TEXT)
+            
+            
+    def clearText(self):
+        """
+        Lets go of the messages of the state that is being left
+        
+        This is the exit method of every state.  The next state builds its own
+        messages when it is entered.
         
         Parameters: None
         """
-        current = self.input.key_count
-        currentkey = self.input.is_key_down('enter')
-        if current > 0 and self._last == 0 and currentkey and self._state == STATE_WON:
-            self._state = STATE_NEWWAVE
-            self._speedMod = self._speedMod * .85
-        elif current > 0 and self._last == 0 and currentkey:
-            self._state = STATE_NEWWAVE
-        self._last = current
+        self._text = None
+        self._text2 = None
+        self._instructs = []
+        self._displayWavesText = None
         
         
-    def spacePress(self):
+    def newWave(self):
         """
-        Function to handle the input specifically for "spacebar"
+        Function to set up a new wave
+        
+        The first wave is built from scratch, and a snapshot of it is saved in
+        _fresh. Every wave after that restores this snapshot into the existing
+        wave (see freshWave).
         
-        The "spacebar" button is used to start a new life once one is lost and
-        the game is momentarily paused.
+        This is the enter method of STATE_NEWWAVE, which only lasts until the
+        wave is ready, and then switches to STATE_ACTIVE.  The start of a wave is
+        also when the memory telemetry (if enabled) takes a sample.
         
         Parameters: None
         """
-        current = self.input.key_count
-        currentkey = self.input.is_key_down('spacebar')
-        if current > 0 and self._last == 0 and currentkey:
-            self._state = STATE_CONTINUE
-        self._last = current
+        self.memory.sample('wave %d' % self._waveCount,self.view)
+        self._wave, self._fresh = freshWave(self._wave, self._fresh)
+        self._machine.state = STATE_ACTIVE
+        
+        
+    def continueWave(self):
+        """
+        Function to restore the ship after it was destroyed
+        
+        This is the enter method of STATE_CONTINUE, which switches to
+        STATE_ACTIVE right away.
+        
+        Parameters: None
+        """
+        self._wave.setCont(1)
+        self._machine.state = STATE_ACTIVE
+        
+        
+    def lowerDetail(self):
+        """
+        Stops drawing the background image, leaving a plain black screen
+        
+        The governor calls this when the game cannot keep up with its frame
+        rate, since the full-screen background is the largest texture drawn.
+        
+        Parameters: None
+        """
+        self._detail = False
+        
+        
+    def raiseDetail(self):
+        """
+        Draws the background image again once the game has recovered
+        
+        Parameters: None
+        """
+        self._detail = True
+        
+        
+    def saveState(self):
+        """
+        Returns a save state of the entire game
+        
+        The save state is a tuple of four values. The first three are GSnapshot 
+        objects: the first one holds the wave count, alien speed and random 
+        stream, the second one holds the current wave (or is None if there is no 
+        wave), and the third one holds the state of the state machine. The last 
+        one is the state of the module random, which the wave draws from, so a 
+        loaded game plays on exactly as it did.
+        
+        Parameters: None
+        """
+        game = GSnapshot(self, ('_waveCount','_speedMod','_random'))
+        wave = None if self._wave is None else GSnapshot(self._wave)
+        state = GSnapshot(self._machine, ('state',))
+        return (game, wave, state, random.getstate())
+        
+        
+    def loadState(self, state):
+        """
+        Puts the game back into a save state from saveState
+        
+        The current wave (if any) is reused, so loading a save state does not 
+        build new aliens or sounds.  Restoring the state machine enters the saved 
+        state, which builds its messages.  The module random is restored last, 
+        after anything that might draw from it.
+        
+        Parameter state: the save state
+        Precondition: state is a tuple returned by saveState
+        """
+        game, wave, machine, generator = state
+        game.restore(self)
+        if wave is None:
+            self._wave = None
+        else:
+            if self._wave is None:
+                self._wave = Wave()
+            wave.restore(self._wave)
+        machine.restore(self._machine)
+        random.setstate(generator)
+        
         
-            
     def displayWavesText(self):
         """
         Function to set the wave counter's attributes
@@ -333,7 +530,7 @@ class Invaders(GameApp):
         The wave counter in the game displays the current wave, or level, that
         the player is on. It increases by one every time an entire wave is eliminated
         and a new wave is started, and resets back to one once the player loses the
-        game.
+        game.  This is the enter method of STATE_ACTIVE.
         
         Parameters: None
         """
@@ -354,38 +551,64 @@ class Invaders(GameApp):
         
         Parameters: None
         """
-        self._instructs1 = GLabel(text = 'Controls:')
-        self._instructs1.font_size = 30
-        self._instructs1.x = GAME_WIDTH/2; self._instructs1.y = GAME_HEIGHT/2 - 25
-        self._instructs1.font_name = 'RetroGame.ttf'
-        self._instructs1.linecolor = 'green'
-        self._instructs2 = GLabel(text = 'SPACE to shoot')
-        self._instructs2.font_size = 20
-        self._instructs2.x = GAME_WIDTH/2; self._instructs2.y = GAME_HEIGHT/2 - 55
-        self._instructs2.font_name = 'RetroGame.ttf'
-        self._instructs2.linecolor = 'green'
-        self._instructs3 = GLabel(text = 'UP arrow key to fire missile')
-        self._instructs3.font_size = 20
-        self._instructs3.x = GAME_WIDTH/2; self._instructs3.y = GAME_HEIGHT/2 - 80
-        self._instructs3.font_name = 'RetroGame.ttf'
-        self._instructs3.linecolor = 'green'
-        self._instructs4 = GLabel(text = 'LEFT AND RIGHT arrow keys to move')
-        self._instructs4.font_size = 20
-        self._instructs4.x = GAME_WIDTH/2; self._instructs4.y = GAME_HEIGHT/2 - 105
-        self._instructs4.font_name = 'RetroGame.ttf'
-        self._instructs4.linecolor = 'green'
-        self._instructs5 = GLabel(text = 'M to mute music')
-        self._instructs5.font_size = 20
-        self._instructs5.x = GAME_WIDTH/2; self._instructs5.y = GAME_HEIGHT/2 - 130
-        self._instructs5.font_name = 'RetroGame.ttf'
-        self._instructs5.linecolor = 'green'
+        instructs1 = GLabel(text = 'Controls:')
+        instructs1.font_size = 30
+        instructs1.x = GAME_WIDTH/2; instructs1.y = GAME_HEIGHT/2 - 25
+        instructs1.font_name = 'RetroGame.ttf'
+        instructs1.linecolor = 'green'
+        instructs2 = GLabel(text = 'SPACE to shoot')
+        instructs2.font_size = 20
+        instructs2.x = GAME_WIDTH/2; instructs2.y = GAME_HEIGHT/2 - 55
+        instructs2.font_name = 'RetroGame.ttf'
+        instructs2.linecolor = 'green'
+        instructs3 = GLabel(text = 'UP arrow key to fire missile')
+        instructs3.font_size = 20
+        instructs3.x = GAME_WIDTH/2; instructs3.y = GAME_HEIGHT/2 - 80
+        instructs3.font_name = 'RetroGame.ttf'
+        instructs3.linecolor = 'green'
+        instructs4 = GLabel(text = 'LEFT AND RIGHT arrow keys to move')
+        instructs4.font_size = 20
+        instructs4.x = GAME_WIDTH/2; instructs4.y = GAME_HEIGHT/2 - 105
+        instructs4.font_name = 'RetroGame.ttf'
+        instructs4.linecolor = 'green'
+        instructs5 = GLabel(text = 'M to mute music')
+        instructs5.font_size = 20
+        instructs5.x = GAME_WIDTH/2; instructs5.y = GAME_HEIGHT/2 - 130
+        instructs5.font_name = 'RetroGame.ttf'
+        instructs5.linecolor = 'green'
+        self._instructs = [instructs1, instructs2, instructs3, instructs4, instructs5]
+        
+        
+    def titleText(self):
+        """
+        Sets the messages for when the state is STATE_INACTIVE
+        
+        This is the enter method of that state; it sets the active text to
+        "Press Enter to Start" under the title of the game, and builds the
+        game instructions.
+        
+        Parameters: None
+        """
+        self._text = GLabel(text = "Press Enter to Start")
+        self._text.font_size = 40
+        self._text.x = GAME_WIDTH/2
+        self._text.y = GAME_HEIGHT/2 + 10
+        self._text.font_name = 'RetroGame.ttf'
+        self._text.linecolor = 'green'
+        self._text2 = GLabel(text = "Alien Invaders")
+        self._text2.font_size = 60
+        self._text2.x = GAME_WIDTH/2
+        self._text2.y = GAME_HEIGHT/2 + 100
+        self._text2.font_name = 'RetroGame.ttf'
+        self._text2.linecolor = 'green'
+        self.instructionsText()
         
         
     def lostText(self):
         """
         Sets the message for when the state is STATE_LOST
         
-        This is called only in the helper function welcomeMessage above; it
+        This is the enter method of that state; it
         sets the active text to "GAME OVER" and a subtitle under it that
         says "HIT ENTER TO RESTART," to allow the player to replay the game
         (restart from wave 1).
@@ -410,7 +633,7 @@ class Invaders(GameApp):
         """
         Sets the message for when the state is STATE_WON
         
-        This is called only in the helper function welcomeMessage above; it
+        This is the enter method of that state; it
         sets the active text to "CONGRATULATIONS" and a subtitle under it that
         says "HIT ENTER FOR NEXT WAVE," to allow the player to continue to the
         next wave/level.
@@ -435,12 +658,14 @@ class Invaders(GameApp):
         """
         Sets the message for when the state is STATE_PAUSED
         
-        This is called only in the helper function welcomeMessage above; it
+        This is the enter method of that state; it
         sets the active text to "Press Space to Continue", which lets the player
-        know how to continue when they have lost a life.
+        know how to continue when they have lost a life.  It also builds the
+        wave counter, which stays on screen while the game is paused.
         
         Parameters: None
         """
+        self.displayWavesText()
         self._text = GLabel(text = "Press Space to Continue")
         self._text.font_size = 40
         self._text.x = GAME_WIDTH/2
@@ -453,20 +678,12 @@ class Invaders(GameApp):
         """
         This function toggles sound for the game on and off
         
-        If the current game volume is on (for both background music and sounds)
-        then pressing 'm' will mute the game (set the volumes to zero). If the
-        game is muted, then pressing 'm' will change the volumes back to their
-        original values.
+        Pressing 'm' mutes the mixer, which silences both the background music
+        and the sounds. Pressing 'm' again unmutes it, which puts the volumes
+        back to their original values.
         
         Parameters: None
         """
-        current = self.input.key_count
-        currentkey = self.input.is_key_down('m')
-        if current > 0 and self._mlast == 0 and currentkey and self._song.volume != 0:
-            self._volume = 0
-            self._song.volume = 0
-        elif current > 0 and self._mlast == 0 and currentkey and self._song.volume == 0:
-            self._volume = GAME_VOLUME
-            self._song.volume = SONG_VOLUME
-        self._mlast = current
+        if self.input.was_pressed('m'):
+            self.mixer.muted = not self.mixer.muted
     # HELPER METHODS FOR THE STATES GO HERE
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""
+Batch runner for headless Alien Invaders simulations
+
+This module plays many games of Alien Invaders without a window, using scripted
+players instead of the keyboard.  It is used to tune the difficulty settings in
+consts.py (such as ALIEN_SPEED, BOLT_RATE, ALIEN_ROWS and ALIENS_IN_ROW) and the
+speed-up factor WAVE_SPEEDUP in app.py.
+
+Each run is a job with its own seed and its own dictionary of constant overrides.
+The jobs are fanned out over a process pool, and the statistics for each run (waves
+cleared, frames survived, presses of the fire keys) are streamed into a single NumPy
+.npy file as they complete.  Load it with numpy.load and index it by column name.
+
+To sweep the alien speed over 4 values, with 250 games each, use the command
+
+    python batch.py --sweep ALIEN_SPEED=1.0,0.8,0.6,0.4 --runs 250 --out speed.npy
+"""
+import argparse
+import itertools
+import multiprocessing
+
+import numpy as np
+
+
+# The simulated frame length, matching the 60 fps of GameApp
+FRAME_TIME = 1.0/60
+
+# The default limit on the length of a single game, in frames
+MAX_FRAMES = 60*60*10
+
+# The keys that fire a bolt in Wave (the presses of these keys are counted)
+FIRE_KEYS = ('spacebar','up')
+
+
+# SCRIPTED PLAYERS
+def idle_player(frame,rng):
+    """
+    Returns: the keys held down by a player that never does anything
+
+    Parameter frame: The current frame number
+    Precondition: frame is an int >= 0
+
+    Parameter rng: The random generator of this run
+    Precondition: rng is a GRandom
+    """
+    return ()
+
+
+def sweeper_player(frame,rng):
+    """
+    Returns: the keys held down by a player that sweeps across the screen and fires
+
+    The player moves right for two seconds, then left for two seconds, tapping the
+    fire key every ten frames.
+
+    Parameter frame: The current frame number
+    Precondition: frame is an int >= 0
+
+    Parameter rng: The random generator of this run
+    Precondition: rng is a GRandom
+    """
+    keys = ['right' if (frame//120) % 2 == 0 else 'left']
+    if frame % 10 == 0:
+        keys.append('spacebar')
+    return keys
+
+
+def random_player(frame,rng):
+    """
+    Returns: the keys held down by a player that mashes random keys
+
+    Parameter frame: The current frame number
+    Precondition: frame is an int >= 0
+
+    Parameter rng: The random generator of this run
+    Precondition: rng is a GRandom
+    """
+    keys = []
+    move = rng.random()
+    if move < 0.4:
+        keys.append('left')
+    elif move < 0.8:
+        keys.append('right')
+    if rng.random() < 0.2:
+        keys.append('spacebar')
+    if rng.random() < 0.01:
+        keys.append('up')
+    return keys
+
+
+PLAYERS = {'idle': idle_player, 'sweeper': sweeper_player, 'random': random_player}
+
+
+# WORKER FUNCTIONS
+def _apply_overrides(overrides):
+    """
+    Returns: the previous values of the overridden constants
+
+    The constants are star-imported into the game modules, so each override is set
+    on every module that has a binding for that name.
+
+    Parameter overrides: The constants to override
+    Precondition: overrides is a dict mapping constant names to values
+    """
+    import sys
+    saved = []
+    for name in ('consts','models','wave','app'):
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        for key in overrides:
+            if hasattr(module,key):
+                saved.append((module,key,getattr(module,key)))
+                setattr(module,key,overrides[key])
+    return saved
+
+
+def _restore_overrides(saved):
+    """
+    Restores the constants changed by _apply_overrides.
+
+    Parameter saved: The value returned by _apply_overrides
+    Precondition: saved is a list of (module, name, value) triples
+    """
+    for module, key, value in reversed(saved):
+        setattr(module,key,value)
+
+
+def run_game(job):
+    """
+    Returns: the statistics for a single headless game
+
+    The game is played by an InvadersEnv, so it follows the same rules as the bot
+    environments: a won wave is replaced by a new, faster one, and a lost life is
+    continued immediately.  The game ends when all lives are lost or after the frame
+    limit.  The result is a tuple (index, waves, frames, fire_presses, lives).  The
+    value fire_presses counts the presses of the FIRE_KEYS, not the bolts fired, since
+    a press does not fire a bolt while the ship's last bolt is still in flight.
+
+    Parameter job: The job description
+    Precondition: job is a tuple (index, seed, overrides, player, frames)
+    """
+    index, seed, overrides, player, limit = job
+    # The game modules must be loaded for the overrides to reach them
+    import consts, wave, app
+    from game2d import GRandom
+    from environment import InvadersEnv
+
+    saved = _apply_overrides(overrides)
+    try:
+        rng = GRandom(seed)
+        script = PLAYERS[player]
+        env = InvadersEnv(seed,limit,{})
+        env.reset()
+        presses = 0
+        while not env.done:
+            env.play(script(env.frames,rng))
+            for key in FIRE_KEYS:
+                if env.input.was_pressed(key):
+                    presses += 1
+        return (index,env.waves,env.frames,presses,env.lives)
+    finally:
+        _restore_overrides(saved)
+
+
+# DRIVER
+def make_jobs(sweep,runs,seed,player,frames):
+    """
+    Returns: the list of jobs for a parameter sweep
+
+    There is one job for each run of each combination of the swept values.  Every job
+    gets a distinct seed derived from ``seed``, so the sweep is reproducible.
+
+    Parameter sweep: The values to try for each constant
+    Precondition: sweep is a dict mapping constant names to lists of numbers
+
+    Parameter runs: The number of games for each combination
+    Precondition: runs is an int > 0
+
+    Parameter seed: The base seed for the sweep
+    Precondition: seed is an int
+
+    Parameter player: The scripted player name
+    Precondition: player is a key of PLAYERS
+
+    Parameter frames: The frame limit for each game
+    Precondition: frames is an int > 0
+    """
+    names = sorted(sweep)
+    jobs = []
+    for combo in itertools.product(*[sweep[name] for name in names]):
+        overrides = dict(zip(names,combo))
+        for run in range(runs):
+            index = len(jobs)
+            jobs.append((index,seed*1000003+index,overrides,player,frames))
+    return jobs
+
+
+def run_batch(jobs,path,workers=None):
+    """
+    Runs the jobs over a process pool, streaming the results to a .npy file.
+
+    The file holds a structured array with one row per job.  The columns are the job
+    index and seed, one column for each overridden constant, and the statistics waves,
+    frames, fire_presses (see run_game) and lives.  Rows are written (and flushed) as
+    each job completes, so a partial file is usable if the batch is interrupted.
+
+    Parameter jobs: The jobs to run
+    Precondition: jobs is a list of job tuples from make_jobs
+
+    Parameter path: The file name for the results
+    Precondition: path is a string
+
+    Parameter workers: The number of worker processes (None for one per core)
+    Precondition: workers is None or an int > 0
+    """
+    names = sorted(set(key for job in jobs for key in job[2]))
+    dtype = ([('job','i8'),('seed','i8')]+[(name,'f8') for name in names]+
+             [('waves','i4'),('frames','i4'),('fire_presses','i4'),('lives','i4')])
+    results = np.lib.format.open_memmap(path,mode='w+',dtype=dtype,shape=(len(jobs),))
+    results['job'] = -1
+
+    with multiprocessing.Pool(workers) as pool:
+        for done, (index,waves,frames,presses,lives) in enumerate(pool.imap_unordered(run_game,jobs)):
+            job = jobs[index]
+            row = results[index]
+            row['job'] = index
+            row['seed'] = job[1]
+            for name in names:
+                row[name] = job[2].get(name,np.nan)
+            row['waves'] = waves
+            row['frames'] = frames
+            row['fire_presses'] = presses
+            row['lives'] = lives
+            if done % 64 == 0:
+                results.flush()
+    results.flush()
+    return results
+
+
+def _parse_number(text):
+    """
+    Returns: the number in the given text, as an int if possible and a float otherwise
+
+    Parameter text: The text of a number (such as '3', '0.8' or '1e-1')
+    Precondition: text is a string
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_sweep(values):
+    """
+    Returns: the sweep dictionary for the --sweep command line options
+
+    Parameter values: The command line options, each of the form NAME=v1,v2,...
+    Precondition: values is a list of strings
+    """
+    sweep = {}
+    for item in values:
+        name, _, numbers = item.partition('=')
+        sweep[name.strip()] = [_parse_number(x) for x in numbers.split(',')]
+    return sweep
+
+
+# Application code
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run headless Alien Invaders games in parallel.')
+    parser.add_argument('--sweep',action='append',default=[],metavar='NAME=v1,v2,...',
+                        help='a constant to override, with the values to try')
+    parser.add_argument('--runs',type=int,default=100,help='games per combination')
+    parser.add_argument('--seed',type=int,default=0,help='base random seed')
+    parser.add_argument('--player',choices=sorted(PLAYERS),default='sweeper')
+    parser.add_argument('--frames',type=int,default=MAX_FRAMES,help='frame limit per game')
+    parser.add_argument('--workers',type=int,default=None,help='number of processes')
+    parser.add_argument('--out',default='results.npy',help='results file')
+    args = parser.parse_args()
+
+    jobs = make_jobs(parse_sweep(args.sweep),args.runs,args.seed,args.player,args.frames)
+    results = run_batch(jobs,args.out,args.workers)
+    print('Ran %d games; mean waves %.2f, mean frames %.0f' %
+          (len(results),results['waves'].mean(),results['frames'].mean()))
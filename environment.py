@@ -0,0 +1,591 @@
+"""
+Bot training environments for Alien Invaders
+
+This module wraps a game of Alien Invaders in the reset/step interface of a Gym
+environment, so that automated players can be trained and compared without a window.
+The game follows the same rules as the states of Invaders: a won wave is replaced by
+a new, faster one, a lost life is continued at once, and the game is over when all
+lives are lost (or after a frame limit).
+
+An action is an index into ACTIONS, the combinations of keys a player may hold down.
+The keys are passed to the wave with a GScriptedInput.  An observation is an array
+with a row for each object the wave draws (its kind, center and size), which comes
+from drawing the wave to a GRecorder instead of a view.  The reward is WAVE_REWARD
+for each wave cleared and LIFE_REWARD for each life lost.  For a bot that learns
+from pixels instead, the method render draws the same objects into a small picture
+with a GRenderer, which needs no window.  To check that every image of the game can be
+drawn this way, use the command
+    
+    python environment.py --check
+
+The class InvadersVecEnv steps many independent games in lockstep, and keeps their
+observations, rewards and statistics in NumPy arrays.  For example
+    
+    envs = InvadersVecEnv(256,seed=1)
+    observations = envs.reset()
+    while envs.frames.max() < 3600:
+        actions = np.random.randint(len(ACTIONS),size=256)
+        observations, rewards, dones, infos = envs.step(actions)
+
+Finished games are reset automatically, as in the vector environments of Gym.  To
+time the environment, use the command
+    
+    python environment.py --games 256 --frames 600
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from batch import FRAME_TIME, MAX_FRAMES
+
+
+# The keys held down for each action
+ACTIONS = ((), ('left',), ('right',), ('spacebar',), ('left','spacebar'), ('right','spacebar'))
+
+# The reward for clearing a wave
+WAVE_REWARD = 10.0
+
+# The reward for losing a life
+LIFE_REWARD = -5.0
+
+# The number of objects in an observation (extra objects are left out)
+MAX_OBJECTS = 128
+
+# The columns of an observation
+OBSERVATION = ('kind', 'x', 'y', 'width', 'height')
+
+# The file types of images
+IMAGE_TYPES = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+# The size of a rendered picture relative to the view
+RENDER_SCALE = 0.125
+
+# The kinds of objects that are not images, after the images in the Images folder
+SHAPES = ('GRectangle', 'GEllipse', 'GLabel', 'GBitmap', 'GPath', 'GTriangle', 'GPolygon')
+
+
+def image_folder():
+    """
+    Returns: the path of the Images folder of the game
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)),'Images')
+
+
+def make_headless():
+    """
+    Prepares GameApp and Kivy for a game without a window, unless a game has a window
+    
+    A GameApp finds the Fonts, Sounds and Images folders of the game when it is made,
+    and its window sets up OpenGL.  A headless game has neither.  But its models still
+    look up their files in these folders, and Kivy needs OpenGL to make the drawing
+    instructions of every object.  So this function points GameApp at the folders of
+    the game, and starts the mock OpenGL backend of Kivy, which draws nothing.
+    """
+    from game2d import GameApp
+    if getattr(GameApp,'images',None) is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        GameApp.fonts  = os.path.join(root,'Fonts')
+        GameApp.sounds = os.path.join(root,'Sounds')
+        GameApp.images = os.path.join(root,'Images')
+        
+        import kivy.resources
+        for folder in (GameApp.fonts,GameApp.sounds,GameApp.images):
+            kivy.resources.resource_add_path(folder)
+        
+        from kivy.graphics.cgl import cgl_init
+        os.environ['KIVY_GL_BACKEND'] = 'mock'
+        cgl_init()
+
+
+def check_images():
+    """
+    Returns: the images in the Images folder that a GRenderer draws as nothing
+    
+    Each image is drawn on its own, filling the view, without a window.  An image that
+    cannot be decoded without a window (or that is completely transparent) is listed.
+    """
+    from consts import GAME_WIDTH, GAME_HEIGHT
+    from game2d import GImage, GRenderer
+    make_headless()
+    renderer = GRenderer(GAME_WIDTH,GAME_HEIGHT,RENDER_SCALE,folder=image_folder())
+    blank = []
+    for name in sorted(image_kinds()):
+        image = GImage(x=GAME_WIDTH/2,y=GAME_HEIGHT/2,width=GAME_WIDTH,height=GAME_HEIGHT,source=name)
+        if not renderer.render([image]).any():
+            blank.append(name)
+    return blank
+
+
+def image_kinds():
+    """
+    Returns: the kind number of every image file, as a dictionary
+    
+    The kinds are numbered from 1 in the order of the file names, so that they are the
+    same from run to run.  Kind 0 is an empty row of an observation.
+    """
+    folder = image_folder()
+    names = sorted(name for name in os.listdir(folder) if os.path.splitext(name)[1].lower() in IMAGE_TYPES)
+    return dict((name,kind+1) for (kind, name) in enumerate(names))
+
+
+# #mark -
+class InvadersEnv(object):
+    """
+    A class representing a single game of Alien Invaders as an environment.
+    
+    Use :meth:`reset` to start a game and :meth:`step` to play a frame.  Wave still
+    draws from the global random module, so each environment keeps its own state of
+    that module, and swaps it in for every frame.  Hence games played in lockstep are
+    as reproducible as games played one at a time.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def input(self):
+        """
+        The scripted input of the game, which holds the keys of the last frame.
+        
+        **Invariant**: Must be a GScriptedInput.
+        """
+        return self._input
+    
+    @property
+    def wave(self):
+        """
+        The current wave, or None before the first reset.
+        
+        **Invariant**: Must be a Wave or None.
+        """
+        return self._wave
+    
+    @property
+    def waves(self):
+        """
+        The number of waves cleared in this game.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._waves
+    
+    @property
+    def frames(self):
+        """
+        The number of frames played in this game.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._frames
+    
+    @property
+    def lives(self):
+        """
+        The number of lives left.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return 0 if self._wave is None else self._wave.getLives()
+    
+    @property
+    def done(self):
+        """
+        Whether this game is over.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._done
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,seed=None,frames=MAX_FRAMES,kinds=None,renderer=None):
+        """
+        Creates a new environment.
+        
+        The game does not start until :meth:`reset` is called.
+        
+        :param seed: The seed of the first game (None for a random seed)
+        :type seed:  ``int`` or ``None``
+        
+        :param frames: The frame limit of a game
+        :type frames:  ``int`` > 0
+        
+        :param kinds: The kind number of every image file (None to read the folder)
+        :type kinds:  ``dict`` or ``None``
+        
+        :param renderer: The renderer for pictures (None to make one when needed)
+        :type renderer:  :class:`GRenderer` or ``None``
+        """
+        from consts import GAME_WIDTH, GAME_HEIGHT
+        from game2d import GScriptedInput, GRecorder
+        assert type(frames) == int and frames > 0, '%s is not a valid frame limit' % repr(frames)
+        make_headless()
+        self._seed = seed
+        self._limit = frames
+        self._kinds = image_kinds() if kinds is None else kinds
+        self._input = GScriptedInput()
+        self._view = GRecorder(GAME_WIDTH,GAME_HEIGHT)
+        self._renderer = renderer
+        self._random = None
+        self._wave = None
+        self._fresh = None
+        self._speed = 0
+        self._waves = 0
+        self._frames = 0
+        self._done = True
+    
+    
+    # PUBLIC METHODS
+    def reset(self,seed=None):
+        """
+        Starts a new game, and returns the first observation.
+        
+        :param seed: The seed of the game (None to continue from the last seed)
+        :type seed:  ``int`` or ``None``
+        
+        :return: The observation
+        :rtype:  a float32 array of shape (MAX_OBJECTS,5)
+        """
+        import app, consts
+        if not seed is None:
+            self._seed = seed
+        saved = random.getstate()
+        if self._random is None or not seed is None:
+            random.seed(self._seed)
+        else:
+            random.setstate(self._random)
+        try:
+            self._input.hold(())
+            self._wave, self._fresh = app.freshWave(self._wave,self._fresh)
+        finally:
+            self._random = random.getstate()
+            random.setstate(saved)
+        self._speed = consts.ALIEN_SPEED
+        self._waves = 0
+        self._frames = 0
+        self._done = False
+        return self.observe()
+    
+    def step(self,action):
+        """
+        Plays a single frame, and returns the result as in Gym.
+        
+        The result is a tuple (observation,reward,done,info), where info is a
+        dictionary with the keys 'waves', 'frames' and 'lives'.
+        
+        :param action: The keys to hold down this frame
+        :type action:  an index into ACTIONS
+        
+        :return: The result of the frame
+        :rtype:  ``tuple``
+        """
+        reward = self.play(ACTIONS[action])
+        info = {'waves': self._waves, 'frames': self._frames, 'lives': self.lives}
+        return (self.observe(),reward,self._done,info)
+    
+    def observe(self,out=None):
+        """
+        Returns the current observation.
+        
+        Each row describes an object drawn by the wave, bottom to top, with the
+        columns in OBSERVATION.  The kind of an image is its number in the kinds of
+        this environment, and the kind of any other shape follows the images, in the
+        order of SHAPES.  Unused rows are all zero.
+        
+        :param out: The array to write the observation to (None for a new array)
+        :type out:  a float32 array of shape (MAX_OBJECTS,5) or ``None``
+        
+        :return: The observation
+        :rtype:  a float32 array of shape (MAX_OBJECTS,5)
+        """
+        if out is None:
+            out = np.zeros((MAX_OBJECTS,len(OBSERVATION)),dtype=np.float32)
+        else:
+            out[:] = 0
+        if self._wave is None:
+            return out
+        
+        self._view.clear()
+        self._wave.waveDraw(self._view)
+        for (row, obj) in enumerate(self._view.objects[:MAX_OBJECTS]):
+            out[row] = (self._kind(obj),obj.x,obj.y,obj.width,obj.height)
+        return out
+    
+    def play(self,keys):
+        """
+        Plays a single frame with the given keys held down, and returns the reward.
+        
+        The frame is played by the function playWave of app.py, so the rules are those
+        of Invaders.  Unlike Invaders, no key is needed between waves or lives: a won
+        wave is replaced by a new one right away (restored from the snapshot of the
+        first wave, as with freshWave), with the alien speed multiplied by WAVE_SPEEDUP,
+        and a lost life is continued at once.  The game is over when all lives are lost
+        or after the frame limit.
+        
+        :param keys: The keys to hold down this frame
+        :type keys:  iterable of ``str``
+        
+        :return: The reward for this frame
+        :rtype:  ``float``
+        """
+        import app
+        assert not self._done, 'the game is over; call reset first'
+        saved = random.getstate()
+        random.setstate(self._random)
+        try:
+            self._input.hold(keys)
+            lives = self._wave.getLives()
+            outcome = app.playWave(self._wave,self._input,FRAME_TIME,self._speed,0)
+            self._frames += 1
+            
+            reward = 0.0
+            if outcome == app.OUTCOME_WON:
+                reward += WAVE_REWARD
+                self._waves += 1
+                self._speed = self._speed*app.WAVE_SPEEDUP
+                self._wave, self._fresh = app.freshWave(self._wave,self._fresh)
+            else:
+                reward += LIFE_REWARD*(lives-self._wave.getLives())
+                if outcome == app.OUTCOME_LIFE_LOST:
+                    self._wave.setCont(1)
+        finally:
+            self._random = random.getstate()
+            random.setstate(saved)
+        
+        self._done = self._wave.getLives() == 0 or self._frames >= self._limit
+        return reward
+    
+    def render(self,out=None):
+        """
+        Returns a picture of the current frame.
+        
+        The picture is drawn by a GRenderer from the objects of the last observation,
+        so call this method after :meth:`reset` or :meth:`step`.  It is RENDER_SCALE
+        times the size of the view, unless the environment was given another renderer.
+        
+        :param out: The array to write the picture to (None for a new array)
+        :type out:  a uint8 array of shape (height,width,3) or ``None``
+        
+        :return: The picture, top row first
+        :rtype:  a uint8 array of shape (height,width,3)
+        """
+        if self._renderer is None:
+            from consts import GAME_WIDTH, GAME_HEIGHT
+            from game2d import GRenderer
+            self._renderer = GRenderer(GAME_WIDTH,GAME_HEIGHT,RENDER_SCALE,folder=image_folder())
+        return self._renderer.render(self._view.objects,out)
+    
+    
+    # HIDDEN METHODS
+    def _kind(self,obj):
+        """
+        Returns the kind number of an object.
+        
+        :param obj: The object
+        :type obj:  :class:`GObject`
+        """
+        source = getattr(obj,'source',None)
+        if source in self._kinds:
+            return self._kinds[source]
+        name = type(obj).__name__
+        extra = SHAPES.index(name)+1 if name in SHAPES else len(SHAPES)+1
+        return len(self._kinds)+extra
+
+
+# #mark -
+class InvadersVecEnv(object):
+    """
+    A class representing many games of Alien Invaders played in lockstep.
+    
+    The observations of all the games are written into one array of shape
+    (games,MAX_OBJECTS,5), and the rewards, lives, waves and frames of the games are
+    kept in arrays with one entry per game.  A game that ends is reset right away, and
+    its last observation and statistics are in the info dictionary of that step.
+    Game i of an environment with seed s has the seed s+i.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def games(self):
+        """
+        The number of games.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return len(self._envs)
+    
+    @property
+    def observations(self):
+        """
+        The current observation of every game.
+        
+        **Invariant**: Must be a float32 array of shape (games,MAX_OBJECTS,5).
+        """
+        return self._observations
+    
+    @property
+    def lives(self):
+        """
+        The lives left in every game.
+        
+        **Invariant**: Must be an int array of shape (games,).
+        """
+        return self._lives
+    
+    @property
+    def waves(self):
+        """
+        The waves cleared in the current game of every environment.
+        
+        **Invariant**: Must be an int array of shape (games,).
+        """
+        return self._waves
+    
+    @property
+    def frames(self):
+        """
+        The frames played in the current game of every environment.
+        
+        **Invariant**: Must be an int array of shape (games,).
+        """
+        return self._frames
+    
+    @property
+    def finished(self):
+        """
+        The number of games finished (and reset) by every environment.
+        
+        **Invariant**: Must be an int array of shape (games,).
+        """
+        return self._finished
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,games,seed=0,frames=MAX_FRAMES):
+        """
+        Creates the given number of games.
+        
+        :param games: The number of games
+        :type games:  ``int`` > 0
+        
+        :param seed: The seed of the first game
+        :type seed:  ``int``
+        
+        :param frames: The frame limit of a game
+        :type frames:  ``int`` > 0
+        """
+        assert type(games) == int and games > 0, '%s is not a valid number of games' % repr(games)
+        from consts import GAME_WIDTH, GAME_HEIGHT
+        from game2d import GRenderer
+        kinds = image_kinds()
+        renderer = GRenderer(GAME_WIDTH,GAME_HEIGHT,RENDER_SCALE,folder=image_folder())
+        self._envs = [InvadersEnv(seed+index,frames,kinds,renderer) for index in range(games)]
+        self._pictures = np.zeros((games,renderer.height,renderer.width,3),dtype=np.uint8)
+        self._observations = np.zeros((games,MAX_OBJECTS,len(OBSERVATION)),dtype=np.float32)
+        self._rewards = np.zeros(games,dtype=np.float32)
+        self._dones = np.zeros(games,dtype=bool)
+        self._lives = np.zeros(games,dtype=np.int32)
+        self._waves = np.zeros(games,dtype=np.int32)
+        self._frames = np.zeros(games,dtype=np.int32)
+        self._finished = np.zeros(games,dtype=np.int32)
+    
+    
+    # PUBLIC METHODS
+    def reset(self):
+        """
+        Starts a new game in every environment, and returns the observations.
+        
+        :return: The observations
+        :rtype:  a float32 array of shape (games,MAX_OBJECTS,5)
+        """
+        for (index, env) in enumerate(self._envs):
+            self._observations[index] = env.reset()
+            self._lives[index] = env.lives
+        self._waves[:] = 0
+        self._frames[:] = 0
+        return self._observations
+    
+    def step(self,actions):
+        """
+        Plays a single frame of every game, and returns the results as in Gym.
+        
+        The result is a tuple (observations,rewards,dones,info).  The dictionary info
+        has arrays of the statistics 'waves', 'frames' and 'lives' of every game at the
+        end of the frame, before the games that ended are reset.  Its key 'final' is a
+        dictionary of the last observations of the games that ended, by game number.
+        The arrays returned are reused by the next step.
+        
+        :param actions: The action of every game
+        :type actions:  a sequence or array of indices into ACTIONS, one per game
+        
+        :return: The result of the frame
+        :rtype:  ``tuple``
+        """
+        actions = np.asarray(actions).reshape(-1)
+        assert len(actions) == len(self._envs), 'there are %d actions for %d games' % (len(actions),len(self._envs))
+        for (index, env) in enumerate(self._envs):
+            self._rewards[index] = env.play(ACTIONS[int(actions[index])])
+            self._dones[index] = env.done
+            self._waves[index] = env.waves
+            self._frames[index] = env.frames
+            self._lives[index] = env.lives
+        info = {'waves': self._waves.copy(), 'frames': self._frames.copy(),
+                'lives': self._lives.copy(), 'final': {}}
+        
+        for (index, env) in enumerate(self._envs):
+            if env.done:
+                info['final'][index] = env.observe()
+                self._finished[index] += 1
+                env.reset()
+                self._waves[index] = 0
+                self._frames[index] = 0
+                self._lives[index] = env.lives
+            env.observe(self._observations[index])
+        return (self._observations,self._rewards,self._dones,info)
+    
+    def render(self):
+        """
+        Returns a picture of the current frame of every game.
+        
+        The games share one renderer, so the shrunk copies of the images are made once
+        for all of them.  The array returned is reused by the next call.
+        
+        :return: The pictures, top row first
+        :rtype:  a uint8 array of shape (games,height,width,3)
+        """
+        for (index, env) in enumerate(self._envs):
+            env.render(self._pictures[index])
+        return self._pictures
+
+
+# Application code
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time random players in many headless games.')
+    parser.add_argument('--games',type=int,default=64,help='games played in lockstep')
+    parser.add_argument('--frames',type=int,default=600,help='frames to play')
+    parser.add_argument('--seed',type=int,default=0,help='seed of the first game')
+    parser.add_argument('--pixels',action='store_true',help='render a picture every frame')
+    parser.add_argument('--check',action='store_true',help='check that every image renders, then quit')
+    args = parser.parse_args()
+    
+    os.environ['KIVY_NO_ARGS'] = '1'
+    if args.check:
+        blank = check_images()
+        print('Images that do not render: %s' % ', '.join(blank) if blank else 'Every image renders')
+        sys.exit(1 if blank else 0)
+    
+    envs = InvadersVecEnv(args.games,args.seed)
+    rng = np.random.default_rng(args.seed)
+    envs.reset()
+    start = time.perf_counter()
+    total = 0.0
+    for frame in range(args.frames):
+        _, rewards, _, _ = envs.step(rng.integers(len(ACTIONS),size=args.games))
+        total += rewards.sum()
+        if args.pixels:
+            envs.render()
+    seconds = time.perf_counter()-start
+    print('Played %d frames of %d games in %.2f s (%.0f steps/s); %d games ended, total reward %.1f' %
+          (args.frames,args.games,seconds,args.frames*args.games/seconds,envs.finished.sum(),total))
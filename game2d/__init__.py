@@ -10,7 +10,24 @@ Date:   August 1, 2017 (Python 3 version)
 from .gobject import GObject, GScene
 from .grectangle import GRectangle, GEllipse, GImage, GLabel
 from .gsprite import GSprite
+from .ganimation import GClip, GAnimator
+from .gtween import GTweener
+from .ggovernor import GGovernor
+from .gcache import GCache
+from .gatlas import GAtlas
 from .gpath import GPath, GTriangle, GPolygon
-from .gview import GInput, GView
-from .sound import Sound, SoundLibrary
+from .gparticle import GParticleSystem
+from .gspatial import GSpatialGrid
+from .gcollide import sweep_box, sweep_boxes, sweep_hit, sweep_hits
+from .gmask import GMask
+from .gbitmap import GBitmap
+from .gstate import GState, GStateMachine
+from .gview import GInput, GScriptedInput, GView
+from .grecorder import GRecorder
+from .grender import GRenderer
+from .sound import Sound, SoundLibrary, GMixer, GMusic
+from .grandom import GRandom
+from .gsnapshot import GSnapshot
+from .gtrace import GTracer, TRACER, traced
+from .gmemory import GMemory
 from .app import GameApp
\ No newline at end of file
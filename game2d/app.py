@@ -16,6 +16,7 @@ from kivy.config import Config
 from kivy.clock  import Clock
 
 import os.path
+import time
 
 class GameApp(kivy.app.App):
     """
@@ -39,6 +40,18 @@ class GameApp(kivy.app.App):
     # Class attribute for tracking textures (to reduce memory footprint)
     TEXTURE_CACHE = {}
     
+    # Class attribute for tracking collision masks, by image name and frame format
+    MASK_CACHE = {}
+    
+    # Class attribute for the packed images (None if images are not packed)
+    ATLAS = None
+    
+    # Class attribute for the cache of decoded assets (None before the game is made)
+    ASSETS = None
+    
+    # Class attribute for the sound mixer (None before the game is made)
+    MIXER = None
+    
     
     # MUTABLE ATTRIBUTES
     @property
@@ -48,7 +61,8 @@ class GameApp(kivy.app.App):
         
         By default this value is 60 FPS. However, we cannot guarantee that the FPS is 
         achievable.  If you are having performance stuttering, you might want to drop
-        this value to 30 FPS instead.
+        this value to 30 FPS instead.  As a last resort, the ``governor`` will halve this
+        value on its own while the game cannot keep up.
         
         **Invariant**: Must be an int or float > 0.
         """
@@ -58,9 +72,34 @@ class GameApp(kivy.app.App):
     def fps(self,value):
         assert type(value) in [int,float], 'value %s is not a number' % repr(value)
         assert value > 0, 'value %s is not positive' % repr(value)
-        Clock.unschedule(self._refresh)
         self._fps = value
-        Clock.schedule_interval(self._refresh,1.0/self._fps)
+        self._schedule()
+    
+    @property
+    def static(self):
+        """
+        Whether the current game state is static.
+        
+        A static state (such as a title screen or a pause menu) does not change unless
+        the player does something.  While this value is True, the game stops its
+        animation frames once nothing is moving: there must be no new input, no
+        animation clips or tweens running, and no music loading or fading.  The screen
+        keeps showing the last frame drawn.  The next key or touch event restarts the
+        frames, as does a call to :meth:`wake` (use this in any timers of your own).
+        
+        Setting this value to False restarts the frames immediately.  The default value
+        is False.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._static
+    
+    @static.setter
+    def static(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._static = value
+        if not value:
+            self.wake()
     
     
     # IMMUTABLE PROPERTIES
@@ -82,6 +121,17 @@ class GameApp(kivy.app.App):
         """
         return self._gheight
     
+    @property
+    def asleep(self):
+        """
+        Whether the animation frames are stopped because the game is idle.
+        
+        See the attribute ``static`` for more information.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._asleep
+    
     @property
     def view(self):
         """
@@ -106,6 +156,115 @@ class GameApp(kivy.app.App):
         """
         return self._input
     
+    @property
+    def random(self):
+        """
+        The game random number stream.
+        
+        Use this attribute for every random choice in the game, instead of the module
+        ``random``.  The stream is seeded by the ``seed`` keyword of the constructor, so 
+        a game can be replayed exactly.  See the class :class:`GRandom` for more 
+        information.
+        
+        **Invariant**: Must be instance of :class:`GRandom`
+        """
+        return self._random
+    
+    @property
+    def animator(self):
+        """
+        The game animation scheduler.
+        
+        Use this attribute to play animation clips on sprites.  It is advanced 
+        automatically at the start of every animation frame.  See the class 
+        :class:`GAnimator` for more information.
+        
+        **Invariant**: Must be instance of :class:`GAnimator`
+        """
+        return self._animator
+    
+    @property
+    def tweener(self):
+        """
+        The game tween engine.
+        
+        Use this attribute to move, turn, scale or recolor objects smoothly over time.
+        It is advanced automatically at the start of every animation frame.  See the 
+        class :class:`GTweener` for more information.
+        
+        **Invariant**: Must be instance of :class:`GTweener`
+        """
+        return self._tweener
+    
+    @property
+    def mixer(self):
+        """
+        The sound mixer.
+        
+        The mixer groups sounds into named buses (such as 'music', 'sfx' and 'ui'),
+        each with its own gain and limits.  It also has a master gain and a mute switch.
+        See the class :class:`GMixer` for more information.
+        
+        **Invariant**: Must be instance of :class:`GMixer`
+        """
+        return GameApp.MIXER
+    
+    @property
+    def music(self):
+        """
+        The background music player.
+        
+        The music player loads tracks in the background and crossfades between them,
+        so switching tracks never stalls an animation frame.  It is updated for you
+        every animation frame.  See the class :class:`GMusic` for more information.
+        
+        **Invariant**: Must be instance of :class:`GMusic`
+        """
+        return self._music
+    
+    @property
+    def governor(self):
+        """
+        The frame-rate governor.
+        
+        The governor lowers the game quality when the game cannot keep up with its
+        frame rate, and raises it again when there is headroom.  Register the optional
+        features of your game with its ``register`` method.  Lowering the frame rate is
+        always the last step.  See the class :class:`GGovernor` for more information.
+        
+        **Invariant**: Must be instance of :class:`GGovernor`
+        """
+        return self._governor
+    
+    @property
+    def tracer(self):
+        """
+        The frame tracer.
+        
+        The tracer records how long each part of an animation frame takes, such as
+        ``update``, ``draw`` and clearing the view.  It is off until it is enabled, or
+        until the player presses the trace key (see the constructor).  Record your own
+        spans with its ``span`` method.  See the class :class:`GTracer` for more
+        information.
+        
+        **Invariant**: Must be instance of :class:`GTracer`
+        """
+        return self._tracer
+    
+    @property
+    def memory(self):
+        """
+        The memory telemetry.
+        
+        Telemetry counts the live graphics objects, the texture cache and the memory
+        allocated by Python each time you take a sample, which is a good way to find
+        a leak.  It is off unless the game was made with the keyword ``memory``.  See
+        the class :class:`GMemory` for more information.
+        
+        **Invariant**: Must be instance of :class:`GMemory`
+        """
+        return self._memory
+    
     # CLASS METHODS
     @classmethod
     def is_image(cls,name):
@@ -168,7 +327,10 @@ class GameApp(kivy.app.App):
         
         The ``name`` must refer to the file in the **Images** folder.  If the texture
         has already been loaded, it will return the cached texture.  Otherwise, it will
-        load the texture and cache it before returning it.
+        load the texture and cache it before returning it.  Images packed in the
+        ``ATLAS`` are returned as regions of the shared atlas texture.  The pixels of
+        any other image are kept in the ``ASSETS`` cache on disk, so an image is only
+        decoded the first time the game is run.
         
         This method will crash if name is not a valid file.
         
@@ -180,8 +342,13 @@ class GameApp(kivy.app.App):
             return cls.TEXTURE_CACHE[name]
         
         try:
-            from kivy.core.image import Image
-            texture = Image(name).texture
+            if not cls.ATLAS is None and name in cls.ATLAS:
+                texture = cls.ATLAS.region(name)
+            elif not cls.ASSETS is None:
+                texture = cls._load_cached(name)
+            else:
+                from kivy.core.image import Image
+                texture = Image(name).texture
             cls.TEXTURE_CACHE[name] = texture
         except:
             texture = None
@@ -201,6 +368,8 @@ class GameApp(kivy.app.App):
         :type name:  ``str``
         """
         assert type(name) == str, '%s is not a valid texture name' % repr(name)
+        for key in [key for key in cls.MASK_CACHE if key[0] == name]:
+            del cls.MASK_CACHE[key]
         if name in cls.TEXTURE_CACHE:
             texture = cls.TEXTURE_CACHE[name]
             del cls.TEXTURE_CACHE[name]
@@ -208,6 +377,76 @@ class GameApp(kivy.app.App):
         
         return None
     
+    @classmethod
+    def load_mask(cls,name,format=(1,1)):
+        """
+        Returns: The collision masks for the given file name, or None if it cannot be loaded
+        
+        The ``name`` must refer to the file in the **Images** folder.  The image is cut
+        into frames by ``format`` (rows,columns), just like a :class:`GSprite`, and the
+        result is a list with the :class:`GMask` of each frame.  The masks are cached
+        alongside the textures, and their bits are kept in the ``ASSETS`` cache on disk,
+        so the alpha channel of an image is only read the first time the game is run.
+        
+        :param name: The file name
+        :type name:  ``str``
+        
+        :param format: The rows and columns of frames in the image
+        :type format:  a pair of ints > 0
+        """
+        assert cls.is_image(name), '%s is not an image file' % repr(name)
+        key = (name,tuple(format))
+        if key in cls.MASK_CACHE:
+            return cls.MASK_CACHE[key]
+        
+        from .gmask import GMask, make_masks
+        from .gcache import read_pixels
+        try:
+            path  = os.path.join(cls.images,name)
+            label = None
+            entry = None
+            if not cls.ASSETS is None:
+                label = '%s-%dx%d' % (cls.ASSETS.digest(path),format[0],format[1])
+                entry = cls.ASSETS.load('mask',label)
+            if entry is None:
+                pixels = read_pixels(path)
+                packed = make_masks(pixels,format)
+                width  = pixels.shape[1]//format[1]
+                if not label is None:
+                    cls.ASSETS.store('mask',label,packed,{'source': name, 'width': width})
+            else:
+                packed, width = entry[0], entry[1]['width']
+            masks = [GMask(frame,width) for frame in packed]
+        except:
+            masks = None
+        
+        cls.MASK_CACHE[key] = masks
+        return masks
+    
+    @classmethod
+    def _load_cached(cls,name):
+        """
+        Returns: The texture for the given image file, using the asset cache
+        
+        The decoded pixels are memory-mapped from the cache if they are there.
+        Otherwise the image is decoded and its pixels are added to the cache.
+        
+        :param name: The file name
+        :type name:  ``str``
+        """
+        from .gcache import read_pixels, make_texture
+        path = os.path.join(cls.images,name)
+        key  = cls.ASSETS.digest(path)
+        entry = cls.ASSETS.load('rgba',key)
+        if not entry is None:
+            return make_texture(entry[0])
+        
+        pixels = read_pixels(path)
+        if pixels is None:
+            return None
+        cls.ASSETS.store('rgba',key,pixels,{'source': name})
+        return make_texture(pixels)
+    
     # BUILT-IN METHODS
     def __init__(self,**keywords):
         """
@@ -223,6 +462,18 @@ class GameApp(kivy.app.App):
         The game window will not show until you start the game. To start the game, use 
         the method ``run()``.
         
+        The optional keyword ``seed`` seeds the random stream in the attribute ``random``.
+        If it is missing, the stream is seeded from the operating system.  The optional
+        keyword ``atlas`` (True by default) packs the small images in the **Images**
+        folder into shared textures when the game starts.
+        
+        The optional keyword ``trace`` is the key that turns the ``tracer`` on and off
+        ('f12' by default, or None for no key).  When the tracer is turned off, the
+        spans it recorded are written to a Chrome trace file ``trace-<time>.json``.
+        
+        The optional keyword ``memory`` (False by default) turns on the ``memory``
+        telemetry before the game starts.
+        
         **You will never call the constructor or run yourself**.  That is handled for 
         you in the provided code.
         
@@ -232,15 +483,51 @@ class GameApp(kivy.app.App):
         w = keywords.pop('width', 0.0)
         h = keywords.pop('height', 0.0)
         f = keywords.pop('fps', 60.0)
+        s = keywords.pop('seed', None)
+        a = keywords.pop('atlas', True)
+        t = keywords.pop('trace', 'f12')
+        m = keywords.pop('memory', False)
 
         assert type(w) in [int,float], 'width %s is not a number' % repr(w)
         assert type(h) in [int,float], 'height %s is not a number' % repr(h)
         assert type(f) in [int,float], 'fps %s is not a number' % repr(value)
         assert f > 0, 'fps %s is not positive' % repr(value)
+        assert t is None or type(t) == str, 'trace key %s is not a string' % repr(t)
+        assert type(m) == bool, 'memory %s is not a bool' % repr(m)
 
         self._gwidth = w
         self._gheight = h
         self._fps = f
+        self._atlas = a
+        self._static = False
+        self._asleep = False
+        self._dirty  = True
+        
+        from .grandom import GRandom
+        self._random = GRandom(s)
+        
+        from .ganimation import GAnimator
+        self._animator = GAnimator()
+        
+        from .gtween import GTweener
+        self._tweener = GTweener()
+        
+        from .sound import GMixer, GMusic
+        GameApp.MIXER = GMixer()
+        self._music = GMusic()
+        
+        from .ggovernor import GGovernor
+        self._governor = GGovernor()
+        self._basefps = f
+        self._governor.register('fps',self._lower_fps,self._raise_fps,last=True)
+        
+        from .gtrace import TRACER
+        self._tracer = TRACER
+        self._tracekey = t
+        
+        from .gmemory import GMemory
+        self._memory = GMemory()
+        self._memory.enabled = m
         
         Config.set('graphics', 'width', str(self.width))
         Config.set('graphics', 'height', str(self.height))
@@ -262,7 +549,7 @@ class GameApp(kivy.app.App):
         self._view = GView()
         self._view.size_hint = (1,1)
         self._input = GInput()
-        self._input._register(self._view)
+        self._input._register(self._view,self.wake)
         return self.view
     
     def run(self):
@@ -325,18 +612,34 @@ class GameApp(kivy.app.App):
         pass
     
     
+    def wake(self):
+        """
+        Makes sure that the next animation frame is processed.
+        
+        If the game is ``static`` and its animation frames are stopped, this restarts
+        them.  Input events call this method for you.  You only need to call it when
+        something else changes the game, such as a Kivy ``Clock`` timer of your own.
+        """
+        self._dirty = True
+        if self._asleep:
+            self._schedule()
+    
+    
     # HIDDEN METHODS
     def _bootstrap(self,dt):
         """
         Bootstraps the clock scheduler for the game..
         
         This method is a callback-proxy for method `start`.  It handles important issues 
-        behind the scenes, particularly with setting the FPS
-        """
-        if (self.fps < 60):
-            Clock.schedule_interval(self._refresh,1.0/self.fps)
-        else:
-            Clock.schedule_interval(self._refresh,0)
+        behind the scenes, particularly with setting the FPS and packing the images
+        """
+        if self._atlas and GameApp.ATLAS is None:
+            from .gatlas import GAtlas
+            try:
+                GameApp.ATLAS = GAtlas(GameApp.images,GameApp.ASSETS)
+            except:
+                GameApp.ATLAS = None
+        self._schedule()
         self.start()
     
     def _refresh(self,dt):
@@ -345,13 +648,85 @@ class GameApp(kivy.app.App):
         
         This method a callback-proxy for the methods `update` and `draw`.  It handles
         important issues behind the scenes, particularly with clearing the window.
+        A frame of a ``static`` game with nothing to do is skipped, and stops the frames
+        until the next call to :meth:`wake`.
         
         :param dt: time in seconds since last update
         :type dt:  ``int`` or ``float``
         """
+        if self._static and not self._dirty and self._settled():
+            # Nothing can change until the next input event, so stop asking for frames
+            Clock.unschedule(self._refresh)
+            self._asleep = True
+            return
+        
+        self._dirty = False
+        start = time.perf_counter()
+        tracer = self._tracer
+        tracer.advance()
+        begin = time.perf_counter_ns()
+        self.input._advance()
+        if not self._tracekey is None and self.input.was_pressed(self._tracekey):
+            self._toggle_trace()
+        with tracer.span('GameApp.animate'):
+            self._animator.update(dt)
+            self._tweener.update(dt)
+            GameApp.MIXER.update(dt)
+            self._music.update(dt)
         self.view.clear()
-        self.update(dt)
-        self.draw()
+        with tracer.span('GameApp.update'):
+            self.update(dt)
+        with tracer.span('GameApp.draw'):
+            self.draw()
+        self.view._flush()
+        if tracer.enabled:
+            tracer.record('GameApp.frame',begin)
+        self._governor.measure(dt,time.perf_counter()-start,1.0/self._fps)
+    
+    def _toggle_trace(self):
+        """
+        Turns the tracer on or off, writing the recorded spans when it is turned off.
+        
+        The spans are written to a Chrome trace file named for the current time.
+        """
+        if self._tracer.enabled:
+            self._tracer.enabled = False
+            self._tracer.export(time.strftime('trace-%Y%m%d-%H%M%S.json'))
+        else:
+            self._tracer.clear()
+            self._tracer.enabled = True
+    
+    def _schedule(self):
+        """
+        (Re)schedules the animation frames for the current FPS.
+        
+        At 60 FPS or more, frames are scheduled as fast as the display allows.
+        """
+        self._asleep = False
+        Clock.unschedule(self._refresh)
+        if (self.fps < 60):
+            Clock.schedule_interval(self._refresh,1.0/self.fps)
+        else:
+            Clock.schedule_interval(self._refresh,0)
+    
+    def _settled(self):
+        """
+        Returns: True if no animation, tween or music fade needs another frame
+        """
+        return (self._animator.playing == 0 and self._tweener.active == 0 and
+                not self._music.fading and not self._music.loading)
+    
+    def _lower_fps(self):
+        """
+        Halves the frame rate; this is the last quality level of the governor.
+        """
+        self.fps = min(self._basefps,max(15,self._basefps/2.0))
+    
+    def _raise_fps(self):
+        """
+        Returns the frame rate to the value given to the constructor.
+        """
+        self.fps = self._basefps
     
     def _setpaths(self):
         """
@@ -373,4 +748,7 @@ class GameApp(kivy.app.App):
         kivy.resources.resource_add_path(GameApp.fonts)
         kivy.resources.resource_add_path(GameApp.sounds)
         kivy.resources.resource_add_path(GameApp.images)
+        
+        from .gcache import GCache
+        GameApp.ASSETS = GCache(str(os.path.join(path, '.cache')))
 
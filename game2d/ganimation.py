@@ -0,0 +1,328 @@
+"""
+Clip-based animation for sprite filmstrips.
+
+This module lets you play named animation clips on :class:`GSprite` objects instead of
+setting the ``frame`` attribute by hand every animation frame.  A clip is a sequence of
+frames with a playback speed.  All clips are advanced by a single scheduler, which
+only touches the sprites whose frame actually changes.  The scheduler provided by the
+``animator`` attribute of :class:`GameApp` is advanced for you at the start of every
+animation frame.
+"""
+import heapq
+
+
+class GClip(object):
+    """
+    A class representing a named animation clip.
+    
+    A clip is a sequence of frames in a filmstrip, played at a fixed number of frames
+    per second.  A looping clip starts over when it reaches the end.  Otherwise the clip
+    stops on its last frame and reports that it has finished.
+    
+    Clips are immutable, so one clip can be shared by any number of sprites.
+    """
+    __slots__ = ('_name', '_frames', '_fps', '_loop')
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def name(self):
+        """
+        The name of this clip.
+        
+        **Invariant**: Must be a string.
+        """
+        return self._name
+    
+    @property
+    def frames(self):
+        """
+        The filmstrip frames played by this clip, in order.
+        
+        **Invariant**: Must be a nonempty tuple of ints >= 0.
+        """
+        return self._frames
+    
+    @property
+    def fps(self):
+        """
+        The playback speed in frames per second.
+        
+        **Invariant**: Must be a number > 0.
+        """
+        return self._fps
+    
+    @property
+    def loop(self):
+        """
+        Whether this clip starts over when it reaches the end.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._loop
+    
+    @property
+    def duration(self):
+        """
+        The length of one pass through this clip in seconds.
+        
+        **Invariant**: Must be a float > 0.
+        """
+        return len(self._frames)/float(self._fps)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,name,frames,fps,loop=True):
+        """
+        Creates a new animation clip.
+        
+        The frames may either be a pair ``(first,last)`` giving a range of frames
+        (including both ends) or a list of frames.  For example, to make a clip that
+        plays frames 2 through 5 of a filmstrip once at 12 frames per second, use the
+        constructor call::
+            
+            GClip('explode',(2,5),12,loop=False)
+        
+        :param name: The clip name
+        :type name:  ``str``
+        
+        :param frames: The frame range, or the frame sequence
+        :type frames:  a pair ``(first,last)`` of ints, or a ``list`` of ints
+        
+        :param fps: The playback speed
+        :type fps:  ``int`` or ``float`` > 0
+        
+        :param loop: Whether the clip starts over when it reaches the end
+        :type loop:  ``bool``
+        """
+        assert type(name) == str, '%s is not a string' % repr(name)
+        assert type(fps) in [int,float] and fps > 0, '%s is not a valid speed' % repr(fps)
+        assert type(loop) == bool, '%s is not a bool' % repr(loop)
+        if type(frames) == tuple and len(frames) == 2:
+            frames = range(frames[0],frames[1]+1)
+        frames = tuple(frames)
+        assert len(frames) > 0, 'clip %s has no frames' % repr(name)
+        assert all(type(x) == int and x >= 0 for x in frames), '%s is not a list of frames' % repr(frames)
+        self._name = name
+        self._frames = frames
+        self._fps = fps
+        self._loop = loop
+    
+    def __str__(self):
+        """
+        :return: A readable string representation of this object.
+        :rtype:  ``str``
+        """
+        return '[name=%s,frames=%s,fps=%s,loop=%s]' % (repr(self._name),repr(self._frames),
+                                                       repr(self._fps),repr(self._loop))
+    
+    def __repr__(self):
+        """
+        :return: An unambiguous string representation of this object.
+        :rtype:  ``str``
+        """
+        return str(self.__class__)+str(self)
+
+
+# #mark -
+class _Playback(object):
+    """
+    The playback state of a single clip on a single sprite.
+    
+    These are the entries in the scheduler queue.  An entry is never removed from the
+    queue directly; stopping it just marks it inactive.
+    """
+    __slots__ = ('sprite', 'clip', 'index', 'callback', 'active')
+    
+    def __init__(self,sprite,clip,callback):
+        """
+        Creates the playback state for the given sprite and clip.
+        """
+        self.sprite = sprite
+        self.clip = clip
+        self.index = 0
+        self.callback = callback
+        self.active = True
+
+
+class GAnimator(object):
+    """
+    A class representing a scheduler for sprite animation clips.
+    
+    The animator keeps every playing clip in a priority queue ordered by the time of its
+    next frame change.  Each call to :meth:`update` only visits the sprites that are due,
+    so the cost depends on how many frames change, not how many sprites are animated.
+    The new frames are assigned in one batch, and each assignment only swaps the texture
+    of the sprite rectangle.
+    
+    When a clip that does not loop finishes, the animator calls its callback (if any)
+    with the sprite.  For example, an explosion clip can remove the alien when it ends.
+    
+    You should not need to make an animator.  Use the one in the ``animator`` attribute
+    of :class:`GameApp`.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def time(self):
+        """
+        The time of the animation clock in seconds.
+        
+        **Invariant**: Must be a float >= 0.
+        """
+        return self._time
+    
+    @property
+    def playing(self):
+        """
+        The number of clips currently playing.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return len(self._active)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self):
+        """
+        Creates a new animator with no clips playing.
+        """
+        self._time = 0.0
+        self._clips = {}
+        self._queue = []
+        self._count = 0
+        self._active = {}
+    
+    
+    # PUBLIC METHODS
+    def add(self,clip):
+        """
+        Registers a clip, so that it can be played by name.
+        
+        :param clip: The clip to register
+        :type clip:  :class:`GClip`
+        """
+        assert isinstance(clip,GClip), '%s is not a clip' % repr(clip)
+        self._clips[clip.name] = clip
+    
+    def play(self,sprite,clip,callback=None):
+        """
+        Starts playing a clip on the given sprite.
+        
+        Any clip already playing on the sprite is stopped.  The sprite is immediately set
+        to the first frame of the clip.
+        
+        :param sprite: The sprite to animate
+        :type sprite:  :class:`GSprite`
+        
+        :param clip: The clip to play
+        :type clip:  :class:`GClip` or the name of a registered clip
+        
+        :param callback: The function to call with the sprite when the clip finishes
+        :type callback:  ``None`` or a function of one argument
+        """
+        if type(clip) == str:
+            assert clip in self._clips, '%s is not a registered clip' % repr(clip)
+            clip = self._clips[clip]
+        assert isinstance(clip,GClip), '%s is not a clip' % repr(clip)
+        assert clip.frames[-1] < sprite.count, 'clip %s is too long for %s' % (repr(clip.name),repr(sprite))
+        
+        self.stop(sprite)
+        entry = _Playback(sprite,clip,callback)
+        self._active[id(sprite)] = entry
+        sprite._swap(clip.frames[0])
+        self._schedule(entry,self._time+1.0/clip.fps)
+    
+    def stop(self,sprite):
+        """
+        Stops the clip playing on the given sprite, if any.
+        
+        The sprite keeps its current frame, and the callback is not called.
+        
+        :param sprite: The sprite to stop
+        :type sprite:  :class:`GSprite`
+        """
+        entry = self._active.pop(id(sprite),None)
+        if not entry is None:
+            entry.active = False
+    
+    def is_playing(self,sprite):
+        """
+        Checks whether a clip is playing on the given sprite
+        
+        :param sprite: The sprite to check
+        :type sprite:  :class:`GSprite`
+        
+        :return: True if a clip is playing on ``sprite``
+        :rtype:  ``bool``
+        """
+        return id(sprite) in self._active
+    
+    def clear(self):
+        """
+        Stops all clips, without calling any callbacks.
+        """
+        for entry in self._active.values():
+            entry.active = False
+        self._active = {}
+        self._queue = []
+    
+    def update(self,dt):
+        """
+        Advances the animation clock and changes the frames that are due.
+        
+        This method is called for you by :class:`GameApp` at the start of each animation
+        frame.  If the clock jumps ahead by several clip frames at once, the sprite goes
+        straight to the correct frame.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        self._time += dt
+        queue = self._queue
+        now = self._time
+        
+        # Gather the frame changes that are due
+        swaps = []
+        finished = []
+        while queue and queue[0][0] <= now:
+            due, _, entry = heapq.heappop(queue)
+            if not entry.active:
+                continue
+            clip = entry.clip
+            step = 1.0/clip.fps
+            steps = 1+int((now-due)/step)
+            size = len(clip.frames)
+            index = entry.index+steps
+            if index >= size and not clip.loop:
+                entry.index = size-1
+                finished.append(entry)
+            else:
+                entry.index = index % size
+                self._schedule(entry,due+steps*step)
+            swaps.append(entry)
+        
+        # Apply the changes in one pass
+        for entry in swaps:
+            entry.sprite._swap(entry.clip.frames[entry.index])
+        
+        for entry in finished:
+            entry.active = False
+            if self._active.get(id(entry.sprite)) is entry:
+                del self._active[id(entry.sprite)]
+            if not entry.callback is None:
+                entry.callback(entry.sprite)
+    
+    
+    # HIDDEN METHODS
+    def _schedule(self,entry,due):
+        """
+        Adds an entry to the queue for the given time.
+        
+        :param entry: The playback entry
+        :type entry:  :class:`_Playback`
+        
+        :param due: The time of the next frame change
+        :type due:  ``float``
+        """
+        self._count += 1
+        heapq.heappush(self._queue,(due,self._count,entry))
@@ -0,0 +1,262 @@
+"""
+Texture atlases for 2D game support.
+
+This module packs the small images in the **Images** folder into one or a few large
+textures, called atlases.  Every object drawn from the same atlas shares one texture,
+so Kivy does not have to switch textures between, say, aliens of different rows.  The
+packed pixels are kept in the asset cache together with a manifest of where each image
+went.  The cache is keyed by the contents of the source images, so the images are only
+packed the first time the game runs (or after one of them changes).
+"""
+import os
+import hashlib
+import numpy as np
+from .gcache import read_pixels, make_texture
+
+
+# The version of the atlas format; changing it invalidates every cached atlas
+ATLAS_VERSION = 1
+
+# Images with a side longer than this (such as backgrounds) keep their own texture
+ATLAS_LIMIT = 512
+
+# The side length of the largest atlas page
+ATLAS_SIZE = 2048
+
+# The image file extensions that are packed
+_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+# The border around each image, filled by repeating its edge pixels to stop bleeding
+_PADDING = 1
+
+
+def _power_of_two(value):
+    """
+    Returns: the smallest power of two >= value
+    
+    Parameter value: The value to round up
+    Precondition: value is an int > 0
+    """
+    result = 1
+    while result < value:
+        result *= 2
+    return result
+
+
+def pack(sizes,size=ATLAS_SIZE):
+    """
+    Returns: the placement of the given rectangles in square pages of the given size
+    
+    This is a shelf packer.  The rectangles are placed tallest first, left to right in
+    rows called shelves.  A rectangle goes on the first shelf with room for it, then on
+    a new shelf, and only then on a new page.  The result is a pair (places,pages).
+    The list places has an entry (page,x,y) for each rectangle, in the same order as
+    sizes, where (x,y) is the top left corner.  The list pages has the (width,height)
+    of each page, trimmed to the smallest power of two that fits.
+    
+    Parameter sizes: The rectangle sizes
+    Precondition: sizes is a list of (width,height) pairs of ints in 1..size
+    
+    Parameter size: The page side length
+    Precondition: size is an int > 0
+    """
+    places = [None]*len(sizes)
+    shelves = []     # For each page, a list of shelves [y,height,x]
+    extents = []     # For each page, the used [width,height]
+    order = sorted(range(len(sizes)),key=lambda i: (-sizes[i][1],-sizes[i][0]))
+    for i in order:
+        width, height = sizes[i]
+        assert 0 < width <= size and 0 < height <= size, '%s does not fit in a page' % repr(sizes[i])
+        place = None
+        for page in range(len(shelves)):
+            for shelf in shelves[page]:
+                if height <= shelf[1] and shelf[2]+width <= size:
+                    place = (page,shelf[2],shelf[0])
+                    shelf[2] += width
+                    break
+            if place is None:
+                top = extents[page][1]
+                if top+height <= size:
+                    shelves[page].append([top,height,width])
+                    place = (page,0,top)
+            if not place is None:
+                break
+        if place is None:
+            shelves.append([[0,height,width]])
+            extents.append([0,0])
+            place = (len(shelves)-1,0,0)
+        
+        extent = extents[place[0]]
+        extent[0] = max(extent[0],place[1]+width)
+        extent[1] = max(extent[1],place[2]+height)
+        places[i] = place
+    
+    pages = [(_power_of_two(w),_power_of_two(h)) for (w,h) in extents]
+    return (places,pages)
+
+
+class GAtlas(object):
+    """
+    A class representing the packed atlases for a folder of images.
+    
+    Making an atlas scans the folder and hashes every image in it.  If the asset cache
+    has an atlas for exactly these images, its manifest is read and its pixels are
+    memory-mapped.  Otherwise the images are decoded, packed and written to the cache.
+    Images larger than ``limit`` in either direction are not packed.
+    
+    The atlas textures are only made when one of their images is first used.  Each
+    image is returned as a region of its atlas texture, so it can be used anywhere an
+    ordinary texture can.
+    
+    You should not need to make an atlas.  :class:`GameApp` makes one for the **Images**
+    folder when the game starts, and the method ``load_texture`` uses it for you.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def key(self):
+        """
+        The hash of the packed images, which names the files in the cache.
+        
+        **Invariant**: Must be a string of hex digits.
+        """
+        return self._key
+    
+    @property
+    def names(self):
+        """
+        The names of the images packed in this atlas.
+        
+        **Invariant**: Must be a tuple of strings (possibly empty).
+        """
+        return tuple(self._regions.keys())
+    
+    @property
+    def pages(self):
+        """
+        The number of atlas pages (textures).
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return len(self._pixels)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,folder,cache,limit=ATLAS_LIMIT,size=ATLAS_SIZE):
+        """
+        Creates the atlas for the images in the given folder.
+        
+        :param folder: The folder with the source images
+        :type folder:  ``str``
+        
+        :param cache: The cache for the packed atlases
+        :type cache:  :class:`GCache`
+        
+        :param limit: The longest side of a packed image
+        :type limit:  ``int`` > 0
+        
+        :param size: The side length of the largest atlas page
+        :type size:  ``int`` >= limit+2
+        """
+        assert type(limit) == int and limit > 0, '%s is not a valid limit' % repr(limit)
+        assert type(size) == int and size >= limit+2*_PADDING, '%s is not a valid size' % repr(size)
+        self._folder = folder
+        self._cache = cache
+        self._limit = limit
+        self._size = size
+        self._textures = {}
+        
+        files = sorted(name for name in os.listdir(folder) if name.lower().endswith(_EXTENSIONS))
+        digest = hashlib.sha1(('%d:%d:%d' % (ATLAS_VERSION,limit,size)).encode())
+        for name in files:
+            digest.update((name+':'+cache.digest(os.path.join(folder,name))).encode('utf-8'))
+        self._key = digest.hexdigest()[:16]
+        
+        if not self._load():
+            self._build(files)
+            self._save()
+    
+    def __contains__(self,name):
+        """
+        :return: True if the image ``name`` is packed in this atlas
+        :rtype:  ``bool``
+        """
+        return name in self._regions
+    
+    
+    # PUBLIC METHODS
+    def region(self,name):
+        """
+        Returns the texture for the given image.
+        
+        The texture is a region of the atlas page holding the image.  The page texture
+        is made the first time one of its images is needed.
+        
+        :param name: The image file name
+        :type name:  a name in ``names``
+        
+        :return: The texture for the image
+        :rtype:  ``Texture``
+        """
+        assert name in self._regions, '%s is not in the atlas' % repr(name)
+        page, x, y, width, height = self._regions[name]
+        if not page in self._textures:
+            self._textures[page] = make_texture(self._pixels[page])
+        return self._textures[page].get_region(x,y,width,height)
+    
+    
+    # HIDDEN METHODS
+    def _load(self):
+        """
+        Returns: True if this atlas was loaded from the cache; False otherwise
+        """
+        first = self._cache.load('atlas',self._key+'-0')
+        if first is None or first[1].get('version') != ATLAS_VERSION:
+            return False
+        
+        manifest = first[1]
+        pixels = [first[0]]
+        for page in range(1,manifest['pages']):
+            entry = self._cache.load('atlas',self._key+'-%d' % page)
+            if entry is None:
+                return False
+            pixels.append(entry[0])
+        self._pixels = pixels
+        self._regions = {name: tuple(value) for (name, value) in manifest['regions'].items()}
+        return True
+    
+    def _save(self):
+        """
+        Writes this atlas to the cache, replacing the atlas for any older images.
+        """
+        self._cache.discard('atlas')
+        manifest = {'version': ATLAS_VERSION, 'pages': len(self._pixels),
+                    'regions': {name: list(value) for (name, value) in self._regions.items()}}
+        # The manifest goes with the first page, which is written last
+        for page in range(len(self._pixels)-1,-1,-1):
+            self._cache.store('atlas',self._key+'-%d' % page,self._pixels[page],
+                              manifest if page == 0 else None)
+    
+    def _build(self,files):
+        """
+        Decodes and packs the given image files.
+        
+        :param files: The image file names
+        :type files:  ``list`` of ``str``
+        """
+        images = {}
+        for name in files:
+            pixels = read_pixels(os.path.join(self._folder,name))
+            if not pixels is None and max(pixels.shape[:2]) <= self._limit:
+                images[name] = np.pad(pixels,((_PADDING,_PADDING),(_PADDING,_PADDING),(0,0)),mode='edge')
+        
+        names = list(images.keys())
+        places, pages = pack([(images[n].shape[1],images[n].shape[0]) for n in names],self._size)
+        self._pixels = [np.zeros((height,width,4),dtype=np.uint8) for (width, height) in pages]
+        self._regions = {}
+        for name, (page, x, y) in zip(names,places):
+            height, width = images[name].shape[:2]
+            self._pixels[page][y:y+height,x:x+width] = images[name]
+            # Texture regions are measured from the bottom left corner of the page
+            bottom = self._pixels[page].shape[0]-y-height
+            self._regions[name] = (page,x+_PADDING,bottom+_PADDING,width-2*_PADDING,height-2*_PADDING)
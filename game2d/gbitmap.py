@@ -0,0 +1,331 @@
+"""
+Destructible bitmaps for 2D game support.
+
+A shape that is worn away a piece at a time (such as a shield bunker) could be built
+from many small rectangles, but every rectangle is a separate drawing instruction.
+This module stores such a shape as a NumPy array of booleans instead, one for each
+cell of a grid, and draws it as a single texture.  Damage removes cells with array
+operations, and only the rows that changed are copied to the texture again.
+"""
+import numpy as np
+from kivy.graphics import *
+from kivy.graphics.instructions import *
+from .grectangle import GRectangle
+from .gobject import GObject
+
+
+# #mark -
+class GBitmap(GRectangle):
+    """
+    A class representing a rectangle made of solid and empty cells.
+    
+    The cells are stored in a boolean array with a row for each row of cells.  Row 0
+    is the bottom row, so the cell (col,row) of the array grows in the same directions
+    as the coordinates of the view.  The cells are stretched to fill the rectangle of
+    size ``width`` by ``height``.  Solid cells are drawn in the ``fillcolor`` and empty
+    cells are transparent.
+    
+    The method :meth:`erode` removes the cells under a stamp, such as a :meth:`crater`.
+    Testing a point with :meth:`is_solid` looks up a single cell, and :meth:`collides`
+    only looks at the cells under the other object.  A bitmap should not be rotated;
+    its cells are always measured along its bounding box.
+    """
+    __slots__ = ('_cells', '_pixels', '_texture', '_dirty')
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def cells(self):
+        """
+        The cells of this bitmap as a read-only array.
+        
+        **Invariant**: Must be a boolean array of shape (rows,columns).
+        """
+        view = self._cells.view()
+        view.flags.writeable = False
+        return view
+    
+    @property
+    def count(self):
+        """
+        The number of solid cells in this bitmap.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return int(np.count_nonzero(self._cells))
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,**keywords):
+        """
+        Creates a new bitmap.
+        
+        To use the constructor for this class, you should provide it with a list of
+        keyword arguments that initialize various attributes.  The keyword ``cells`` is
+        a boolean array of the cells, bottom row first.  For example, to make a solid
+        bunker of 44 by 32 cells drawn at twice that size, use the constructor::
+            
+            GBitmap(x=100,y=150,width=88,height=64,cells=np.ones((32,44),dtype=bool))
+        
+        This class supports the all same keywords as :class:`GRectangle`.  The
+        ``fillcolor`` is white by default.
+        
+        :param keywords: dictionary of keyword arguments
+        :type keywords:  keys are attribute names
+        """
+        self._defined = False
+        cells = np.array(keywords['cells'],dtype=bool)
+        assert cells.ndim == 2 and cells.size > 0, 'cells must be a nonempty 2d array'
+        self._cells = cells
+        self._pixels = np.full(cells.shape+(4,),255,dtype=np.uint8)
+        self._pixels[:,:,3] = cells*np.uint8(255)
+        self._texture = None
+        self._dirty = None
+        if not 'fillcolor' in keywords:
+            keywords['fillcolor'] = (1,1,1,1)
+        GRectangle.__init__(self,**keywords)
+        self._defined = True
+    
+    
+    # PUBLIC METHODS
+    @staticmethod
+    def crater(radius):
+        """
+        Returns a round stamp for :meth:`erode` with the given radius in cells.
+        
+        :param radius: The radius of the stamp
+        :type radius:  ``int`` >= 0
+        
+        :return: A square array of side 2*radius+1 that is True inside the circle
+        :rtype:  a 2d boolean array
+        """
+        assert type(radius) == int and radius >= 0, '%s is not a valid radius' % repr(radius)
+        span = np.arange(-radius,radius+1)
+        return span[:,None]**2+span[None,:]**2 <= radius*radius
+    
+    def snapshot(self):
+        """
+        Returns the current state of this object.
+        
+        Besides the attributes of a :class:`GRectangle`, the state has the key 'cells',
+        with the cells as a list of rows of bools.  Hence restoring a snapshot puts back
+        any damage done since.
+        
+        :return: The object state
+        :rtype:  ``dict``
+        """
+        state = GRectangle.snapshot(self)
+        state['cells'] = self._cells.tolist()
+        return state
+    
+    def restore(self,state):
+        """
+        Puts this object back into a state returned by :meth:`snapshot`.
+        
+        Only the rows of cells that differ are copied to the texture again.
+        
+        :param state: The object state
+        :type state:  ``dict``
+        """
+        GRectangle.restore(self,state)
+        if 'cells' in state:
+            cells = np.array(state['cells'],dtype=bool)
+            assert cells.shape == self._cells.shape, 'cells %s do not match shape %s' % (cells.shape,self._cells.shape)
+            rows = np.flatnonzero((cells != self._cells).any(axis=1))
+            if len(rows):
+                self._cells[:] = cells
+                self._pixels[:,:,3] = cells*np.uint8(255)
+                self._touch(int(rows[0]),int(rows[-1])+1)
+    
+    def cell(self,x,y):
+        """
+        Returns the cell (col,row) at the given point, or None if it is outside.
+        
+        :param x: The horizontal coordinate of the point
+        :type x:  ``int`` or ``float``
+        
+        :param y: The vertical coordinate of the point
+        :type y:  ``int`` or ``float``
+        
+        :return: The cell at the point
+        :rtype:  ``tuple`` or ``None``
+        """
+        rows, cols = self._cells.shape
+        col, row = self._locate(x,y)
+        col, row = int(np.floor(col)), int(np.floor(row))
+        if 0 <= col < cols and 0 <= row < rows:
+            return (col,row)
+        return None
+    
+    def is_solid(self,x,y):
+        """
+        Checks whether the given point is in a solid cell.
+        
+        :param x: The horizontal coordinate of the point
+        :type x:  ``int`` or ``float``
+        
+        :param y: The vertical coordinate of the point
+        :type y:  ``int`` or ``float``
+        
+        :return: True if the point is in a solid cell
+        :rtype:  ``bool``
+        """
+        cell = self.cell(x,y)
+        return not cell is None and bool(self._cells[cell[1],cell[0]])
+    
+    def collides(self,other):
+        """
+        Checks whether another shape overlaps a solid cell of this bitmap.
+        
+        The other shape counts as its bounding box.
+        
+        :param other: the other shape
+        :type other:  :class:`GObject`
+        
+        :return: True if the shapes overlap
+        :rtype:  ``bool``
+        """
+        span = self._span(other.bbox)
+        if span is None:
+            return False
+        return bool(self._cells[span[1]:span[3],span[0]:span[2]].any())
+    
+    def erode(self,x,y,stamp):
+        """
+        Removes the cells under a stamp centered at the given point.
+        
+        The stamp is a boolean array of cells, bottom row first, and its True cells are
+        removed.  Parts of the stamp outside of this bitmap are ignored.  The texture
+        is updated (only in the rows that changed) the next time this bitmap is drawn.
+        
+        :param x: The horizontal coordinate of the center of the stamp
+        :type x:  ``int`` or ``float``
+        
+        :param y: The vertical coordinate of the center of the stamp
+        :type y:  ``int`` or ``float``
+        
+        :param stamp: The cells to remove
+        :type stamp:  a 2d boolean array, such as the result of :meth:`crater`
+        
+        :return: The number of solid cells removed
+        :rtype:  ``int`` >= 0
+        """
+        rows, cols = self._cells.shape
+        stamp = np.asarray(stamp,dtype=bool)
+        col, row = self._locate(x,y)
+        col = int(np.floor(col))-stamp.shape[1]//2
+        row = int(np.floor(row))-stamp.shape[0]//2
+        left, right = max(col,0), min(col+stamp.shape[1],cols)
+        bottom, top = max(row,0), min(row+stamp.shape[0],rows)
+        if left >= right or bottom >= top:
+            return 0
+        
+        window = self._cells[bottom:top,left:right]
+        hit = window & stamp[bottom-row:top-row,left-col:right-col]
+        count = int(np.count_nonzero(hit))
+        if count:
+            window &= ~hit
+            self._pixels[bottom:top,left:right,3] = window*np.uint8(255)
+            self._touch(bottom,top)
+        return count
+    
+    def draw(self,view,layer=None):
+        """
+        Draws this bitmap in the given view.
+        
+        Any rows changed by :meth:`erode` since the last draw are copied to the texture
+        first.
+        
+        :param view: view to draw to
+        :type view:  :class:`GView`
+        
+        :param layer: the drawing layer, or None to draw immediately
+        :type layer:  ``int`` or ``None``
+        """
+        if not self._dirty is None and not self._texture is None:
+            bottom, top = self._dirty
+            rows = memoryview(self._pixels[bottom:top].reshape(-1))
+            self._texture.blit_buffer(rows,pos=(0,bottom),size=(self._cells.shape[1],top-bottom),
+                                      colorfmt='rgba',bufferfmt='ubyte')
+        self._dirty = None
+        GObject.draw(self,view,layer)
+    
+    
+    # HIDDEN METHODS
+    def _locate(self,x,y):
+        """
+        Returns the position of a point measured in cells, as a pair of floats.
+        
+        :param x: The horizontal coordinate of the point
+        :type x:  ``int`` or ``float``
+        
+        :param y: The vertical coordinate of the point
+        :type y:  ``int`` or ``float``
+        """
+        rows, cols = self._cells.shape
+        box = self.bbox
+        return ((x-box[0])*cols/(box[2]-box[0]),(y-box[1])*rows/(box[3]-box[1]))
+    
+    def _touch(self,bottom,top):
+        """
+        Marks the rows from bottom to top (not included) to be copied to the texture.
+        
+        :param bottom: The first changed row
+        :type bottom:  ``int``
+        
+        :param top: The row after the last changed row
+        :type top:  ``int``
+        """
+        if self._dirty is None:
+            self._dirty = (bottom,top)
+        else:
+            self._dirty = (min(bottom,self._dirty[0]),max(top,self._dirty[1]))
+    
+    def _span(self,box):
+        """
+        Returns the cells (left,bottom,right,top) under a box, or None if there are none.
+        
+        The right and top cells are not included, as in a slice.
+        
+        :param box: The box as (left,bottom,right,top)
+        :type box:  a tuple of four numbers
+        """
+        rows, cols = self._cells.shape
+        low  = self._locate(box[0],box[1])
+        high = self._locate(box[2],box[3])
+        left   = max(0,int(np.floor(low[0])))
+        bottom = max(0,int(np.floor(low[1])))
+        right  = min(cols,int(np.ceil(high[0])))
+        top    = min(rows,int(np.ceil(high[1])))
+        if left >= right or bottom >= top:
+            return None
+        return (left,bottom,right,top)
+    
+    def _state(self):
+        """
+        Returns the drawing state of this object as a pair (texture,color).
+        """
+        texture = 0 if self._texture is None else self._texture.id
+        return (texture,() if self._fillcolor is None else tuple(self._fillcolor.rgba))
+    
+    def _reset(self):
+        """
+        Resets the drawing cache, uploading every cell to a new texture.
+        """
+        from kivy.graphics.texture import Texture
+        GObject._reset(self)
+        x = -self.width/2.0
+        y = -self.height/2.0
+        
+        rows, cols = self._cells.shape
+        self._texture = Texture.create(size=(cols,rows),colorfmt='rgba')
+        self._texture.mag_filter = 'nearest'
+        self._texture.blit_buffer(memoryview(self._pixels.reshape(-1)),colorfmt='rgba',bufferfmt='ubyte')
+        self._dirty = None
+        
+        self._cache.add(self._fillcolor)
+        self._cache.add(Rectangle(pos=(x,y),size=(self.width,self.height),texture=self._texture))
+        if not self._linecolor is None and self.linewidth > 0:
+            line = Line(rectangle=(x,y,self.width,self.height),joint='miter',close=True,width=self.linewidth)
+            self._cache.add(self._linecolor)
+            self._cache.add(line)
+        self._cache.add(PopMatrix())
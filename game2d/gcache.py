@@ -0,0 +1,275 @@
+"""
+Preprocessed asset cache for 2D game support.
+
+Decoding a PNG (or packing an atlas) is the slowest part of starting a game.  This
+module keeps the decoded results in a cache folder, keyed by a hash of the source
+file contents.  On the next launch the pixels are memory-mapped straight from the
+cache instead of being decoded again.  The cache folder is versioned, so changing
+the format of the cached data simply starts a new, empty cache.
+"""
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+
+# The version of the cache format; changing it discards every cached asset
+CACHE_VERSION = 1
+
+# The order of the red, green, blue (and alpha) channels in the formats of decoded images
+_CHANNELS = {'rgba': [0,1,2,3], 'bgra': [2,1,0,3], 'rgb': [0,1,2], 'bgr': [2,1,0]}
+
+
+def read_pixels(path):
+    """
+    Returns: the RGBA pixels of the given image, top row first, or None on failure
+    
+    The result is a contiguous uint8 array of shape (height,width,4).  The image is
+    decoded by Kivy, so this must be called after the game window exists.
+    
+    Parameter path: The path to the image file
+    Precondition: path is a string
+    """
+    try:
+        from kivy.core.image import Image
+        texture = Image(path).texture
+        pixels = np.frombuffer(texture.pixels,dtype=np.uint8)
+        pixels = pixels.reshape(texture.height,texture.width,4)
+        # Kivy flips image textures instead of their pixels; undo any other layout
+        if texture.uvsize[1] >= 0:
+            pixels = pixels[::-1]
+        return np.ascontiguousarray(pixels)
+    except:
+        return None
+
+
+def decode_pixels(path):
+    """
+    Returns: the RGBA pixels of the given image, top row first, or None on failure
+    
+    The result is a contiguous uint8 array of shape (height,width,4).  Unlike
+    :func:`read_pixels`, the image is decoded by the Kivy image loader without making a
+    texture, so this needs no window (or OpenGL context) at all.
+    
+    Parameter path: The path to the image file
+    Precondition: path is a string
+    """
+    try:
+        from kivy.core.image import ImageLoader
+        data = ImageLoader.load(path,keep_data=True)._data[0]
+        order = _CHANNELS[data.fmt]
+        stride = data.rowlength or data.width*len(order)
+        rows = np.frombuffer(data.data,dtype=np.uint8).reshape(data.height,stride)
+        rows = rows[:,:data.width*len(order)].reshape(data.height,data.width,len(order))
+        pixels = np.full((data.height,data.width,4),255,dtype=np.uint8)
+        pixels[:,:,:len(order)] = rows[:,:,order]
+        # Loaders that store the bottom row first ask for the texture not to be flipped
+        if not data.flip_vertical:
+            pixels = pixels[::-1]
+        return np.ascontiguousarray(pixels)
+    except:
+        return None
+
+
+def make_texture(pixels):
+    """
+    Returns: a new texture with the given RGBA pixels
+    
+    The pixels are uploaded directly from the array, so a memory-mapped array is
+    never copied in Python.  The texture is flipped just as Kivy flips the images it
+    loads, so regions are measured from the bottom left corner of the image.
+    
+    Parameter pixels: The image pixels, top row first
+    Precondition: pixels is a contiguous uint8 array of shape (height,width,4)
+    """
+    from kivy.graphics.texture import Texture
+    texture = Texture.create(size=(pixels.shape[1],pixels.shape[0]),colorfmt='rgba')
+    texture.blit_buffer(memoryview(pixels.reshape(-1)),colorfmt='rgba',bufferfmt='ubyte')
+    texture.flip_vertical()
+    return texture
+
+
+class GCache(object):
+    """
+    A class representing a versioned folder of preprocessed assets.
+    
+    Each asset is stored as a NumPy array (``.npy``) and a JSON file of metadata.  An
+    asset is named by its kind (such as ``'rgba'`` for decoded images) and a key, which
+    is normally the :meth:`digest` of its source file.  Loading an asset memory-maps
+    the array, so the data is only read from disk as it is used.
+    
+    The folder is only made when the first asset is stored, and the folders of other
+    cache versions are removed at that time.
+    
+    You should not need to make a cache.  Use the one in the ``ASSETS`` attribute of
+    :class:`GameApp`.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def folder(self):
+        """
+        The folder holding the cached assets for this version.
+        
+        **Invariant**: Must be a string.
+        """
+        return self._folder
+    
+    @property
+    def version(self):
+        """
+        The version of the cache format.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._version
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,root,version=CACHE_VERSION):
+        """
+        Creates a cache in a subfolder of root for the given version.
+        
+        :param root: The folder holding every version of the cache
+        :type root:  ``str``
+        
+        :param version: The version of the cache format
+        :type version:  ``int`` >= 0
+        """
+        assert type(root) == str, '%s is not a folder name' % repr(root)
+        assert type(version) == int and version >= 0, '%s is not a valid version' % repr(version)
+        self._root = root
+        self._version = version
+        self._folder = os.path.join(root,'v%d' % version)
+        self._digests = {}
+    
+    
+    # PUBLIC METHODS
+    def digest(self,path):
+        """
+        Returns the hash of the contents of the given file.
+        
+        Hashes are remembered for as long as the size and modification time of the
+        file stay the same, so each file is only read once.
+        
+        :param path: The path to the file
+        :type path:  ``str``
+        
+        :return: The file hash as hex digits
+        :rtype:  ``str``
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_size,stat.st_mtime_ns)
+        if path in self._digests and self._digests[path][0] == stamp:
+            return self._digests[path][1]
+        
+        digest = hashlib.sha1()
+        with open(path,'rb') as file:
+            for block in iter(lambda: file.read(1 << 20),b''):
+                digest.update(block)
+        result = digest.hexdigest()[:16]
+        self._digests[path] = (stamp,result)
+        return result
+    
+    def path(self,name):
+        """
+        Returns the path of a file in the cache folder.
+        
+        :param name: The file name
+        :type name:  ``str``
+        
+        :return: The path to the file
+        :rtype:  ``str``
+        """
+        return os.path.join(self._folder,name)
+    
+    def load(self,kind,key):
+        """
+        Returns the cached asset of the given kind and key, or None if there is none.
+        
+        The result is a pair (data,meta), where data is a read-only memory-mapped array
+        and meta is the dictionary given to :meth:`store`.
+        
+        :param kind: The kind of asset
+        :type kind:  ``str``
+        
+        :param key: The asset key
+        :type key:  ``str``
+        
+        :return: The asset data and metadata
+        :rtype:  ``tuple`` or ``None``
+        """
+        name = kind+'-'+key
+        try:
+            with open(self.path(name+'.json')) as file:
+                meta = json.load(file)
+            return (np.load(self.path(name+'.npy'),mmap_mode='r'),meta)
+        except (OSError, ValueError):
+            return None
+    
+    def store(self,kind,key,data,meta=None):
+        """
+        Saves an asset of the given kind and key.
+        
+        The metadata is written last, so an asset that was only partly written is
+        never loaded.
+        
+        :param kind: The kind of asset
+        :type kind:  ``str``
+        
+        :param key: The asset key
+        :type key:  ``str``
+        
+        :param data: The asset data
+        :type data:  a NumPy array
+        
+        :param meta: Extra information about the asset
+        :type meta:  ``None`` or a ``dict`` that can be written as JSON
+        """
+        if not os.path.isdir(self._folder):
+            self._prune()
+            os.makedirs(self._folder,exist_ok=True)
+        
+        name = kind+'-'+key
+        np.save(self.path(name+'.npy'),data)
+        temp = self.path(name+'.tmp')
+        with open(temp,'w') as file:
+            json.dump({} if meta is None else meta,file)
+        os.replace(temp,self.path(name+'.json'))
+    
+    def discard(self,kind,key=None):
+        """
+        Removes cached assets of the given kind.
+        
+        If key is None, every asset of that kind is removed.
+        
+        :param kind: The kind of asset
+        :type kind:  ``str``
+        
+        :param key: The asset key (or None for every key)
+        :type key:  ``str`` or ``None``
+        """
+        if not os.path.isdir(self._folder):
+            return
+        prefix = kind+'-'+('' if key is None else key+'.')
+        for name in os.listdir(self._folder):
+            if name.startswith(prefix):
+                os.remove(self.path(name))
+    
+    
+    # HIDDEN METHODS
+    def _prune(self):
+        """
+        Removes the folders (and files) of every other cache version.
+        """
+        if not os.path.isdir(self._root):
+            return
+        for name in os.listdir(self._root):
+            path = os.path.join(self._root,name)
+            if path == self._folder:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path,ignore_errors=True)
+            else:
+                os.remove(path)
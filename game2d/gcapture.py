@@ -0,0 +1,241 @@
+"""
+Offscreen capture and golden images for 2D game support.
+
+Changes to the drawing code (such as batching or culling) should not change what ends
+up on the screen.  This module renders a view into an offscreen framebuffer (a Kivy
+``Fbo``) and reads the pixels back into a NumPy array.  The pixels can then be compared
+with golden images saved from an earlier, trusted version of the game.
+
+Rendering needs an OpenGL context, but not a graphics card.  On a machine without a
+display, run the game under a virtual display (such as ``xvfb-run``) with a software
+renderer (such as Mesa llvmpipe, selected by ``LIBGL_ALWAYS_SOFTWARE=1``).
+"""
+import os
+import time
+import numpy as np
+
+
+def capture(widget):
+    """
+    Returns: the pixels of the widget as drawn, and the time it took to draw them
+    
+    The widget canvas is drawn into a new framebuffer the size of the widget.  The
+    result is a pair (pixels,seconds).  The pixels are a uint8 array of shape
+    (height,width,4), top row first, and seconds is the time spent drawing and
+    reading back the framebuffer.
+    
+    Parameter widget: The widget to draw (normally the ``view`` of a GameApp)
+    Precondition: widget is a Kivy widget that has been added to the window
+    """
+    from kivy.graphics import Fbo, ClearColor, ClearBuffers, Translate
+    width, height = int(widget.width), int(widget.height)
+    
+    # A canvas can only have one parent, so borrow it from the window
+    parent = None if widget.parent is None else widget.parent.canvas
+    index = -1 if parent is None else parent.indexof(widget.canvas)
+    if index > -1:
+        parent.remove(widget.canvas)
+    try:
+        fbo = Fbo(size=(width,height),with_stencilbuffer=True)
+        with fbo:
+            ClearColor(0,0,0,0)
+            ClearBuffers()
+            Translate(-widget.x,-widget.y,0)
+        fbo.add(widget.canvas)
+        start = time.perf_counter()
+        fbo.draw()
+        data = fbo.pixels
+        seconds = time.perf_counter()-start
+        fbo.remove(widget.canvas)
+    finally:
+        if index > -1:
+            parent.insert(index,widget.canvas)
+    
+    pixels = np.frombuffer(data,dtype=np.uint8).reshape(height,width,4)
+    return (np.ascontiguousarray(pixels[::-1]),seconds)
+
+
+def compare(pixels,golden,tolerance=2):
+    """
+    Returns: the fraction of pixels that differ between two images
+    
+    A pixel differs if any of its channels differs by more than ``tolerance``, which
+    allows for the small rounding differences between OpenGL drivers.  Images of
+    different sizes differ in every pixel, so the result is 1.
+    
+    Parameter pixels: The new image
+    Precondition: pixels is a uint8 array of shape (height,width,4)
+    
+    Parameter golden: The image to compare against
+    Precondition: golden is a uint8 array of shape (height,width,4)
+    
+    Parameter tolerance: The largest difference in a channel that is ignored
+    Precondition: tolerance is an int >= 0
+    """
+    if pixels.shape != golden.shape:
+        return 1.0
+    error = np.abs(pixels.astype(np.int16)-golden.astype(np.int16)).max(axis=2)
+    return float(np.count_nonzero(error > tolerance))/error.size
+
+
+# #mark -
+class GGolden(object):
+    """
+    A class representing a folder of golden images.
+    
+    Each image is named, and saved as a compressed NumPy file ``<name>.npz`` in the
+    folder.  The method :meth:`check` compares a new image with the golden image of
+    the same name, and keeps a record of every check (including how long the image
+    took to render) for the :meth:`report`.
+    
+    When ``update`` is True, :meth:`check` saves every image as the new golden image
+    instead.  An image with no golden image is also saved, and counts as passing.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def update(self):
+        """
+        Whether checked images replace the golden images.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._update
+    
+    @update.setter
+    def update(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._update = value
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def folder(self):
+        """
+        The folder holding the golden images.
+        
+        **Invariant**: Must be a string.
+        """
+        return self._folder
+    
+    @property
+    def results(self):
+        """
+        The results of every check, in order.
+        
+        Each result is a tuple (name,status,difference,seconds), where status is one
+        of 'pass', 'fail' or 'new', and difference is the fraction of pixels that
+        differ from the golden image.
+        
+        **Invariant**: Must be a tuple of tuples (possibly empty).
+        """
+        return tuple(self._results)
+    
+    @property
+    def passed(self):
+        """
+        Whether every check so far has passed.
+        
+        **Invariant**: Must be a bool.
+        """
+        return all(result[1] != 'fail' for result in self._results)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,folder,tolerance=2,limit=0.001,update=False):
+        """
+        Creates a set of golden images in the given folder.
+        
+        :param folder: The folder holding the golden images
+        :type folder:  ``str``
+        
+        :param tolerance: The largest difference in a channel that is ignored
+        :type tolerance:  ``int`` >= 0
+        
+        :param limit: The largest fraction of different pixels that still passes
+        :type limit:  ``int`` or ``float`` in 0..1
+        
+        :param update: Whether checked images replace the golden images
+        :type update:  ``bool``
+        """
+        assert type(folder) == str, '%s is not a folder name' % repr(folder)
+        assert type(tolerance) == int and tolerance >= 0, '%s is not a valid tolerance' % repr(tolerance)
+        assert type(limit) in [int,float] and 0 <= limit <= 1, '%s is not a valid limit' % repr(limit)
+        self._folder = folder
+        self._tolerance = tolerance
+        self._limit = limit
+        self.update = update
+        self._results = []
+    
+    
+    # PUBLIC METHODS
+    def load(self,name):
+        """
+        Returns the golden image with the given name, or None if there is none.
+        
+        :param name: The image name
+        :type name:  ``str``
+        
+        :return: The image pixels, top row first
+        :rtype:  a uint8 array of shape (height,width,4) or ``None``
+        """
+        path = os.path.join(self._folder,name+'.npz')
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            return data['pixels']
+    
+    def save(self,name,pixels):
+        """
+        Saves an image as the golden image with the given name.
+        
+        :param name: The image name
+        :type name:  ``str``
+        
+        :param pixels: The image pixels, top row first
+        :type pixels:  a uint8 array of shape (height,width,4)
+        """
+        os.makedirs(self._folder,exist_ok=True)
+        np.savez_compressed(os.path.join(self._folder,name+'.npz'),pixels=pixels)
+    
+    def check(self,name,pixels,seconds=0.0):
+        """
+        Compares an image with the golden image of the same name.
+        
+        :param name: The image name
+        :type name:  ``str``
+        
+        :param pixels: The image pixels, top row first
+        :type pixels:  a uint8 array of shape (height,width,4)
+        
+        :param seconds: The time it took to render the image
+        :type seconds:  ``int`` or ``float`` >= 0
+        
+        :return: True if the image matches (or was saved as) the golden image
+        :rtype:  ``bool``
+        """
+        golden = None if self._update else self.load(name)
+        if golden is None:
+            self.save(name,pixels)
+            self._results.append((name,'new',0.0,seconds))
+            return True
+        
+        difference = compare(pixels,golden,self._tolerance)
+        status = 'pass' if difference <= self._limit else 'fail'
+        self._results.append((name,status,difference,seconds))
+        return status == 'pass'
+    
+    def report(self):
+        """
+        Returns a text report of every check, one line per image.
+        
+        :return: The report
+        :rtype:  ``str``
+        """
+        lines = ['%-24s %-4s %8.4f%% %8.2f ms' % (name,status,100*difference,1000*seconds)
+                 for (name, status, difference, seconds) in self._results]
+        if self._results:
+            average = sum(result[3] for result in self._results)/len(self._results)
+            lines.append('%d images, %d failed, %.2f ms per frame' %
+                         (len(self._results),sum(r[1] == 'fail' for r in self._results),1000*average))
+        return '\n'.join(lines)
@@ -0,0 +1,276 @@
+"""
+Adaptive quality scaling for 2D game support.
+
+This module watches how long each animation frame takes.  When the game cannot keep
+up with its frame rate, it turns off optional features one at a time (the game decides
+what these are, such as particle effects).  When there is enough headroom again, it
+turns them back on in the reverse order.
+"""
+
+
+# #mark -
+class GGovernor(object):
+    """
+    A class representing a frame-rate governor.
+    
+    The governor keeps a smoothed average of the frame interval (``dt``) and of the time
+    spent in ``update`` and ``draw``.  The game is overloaded when frames arrive late or
+    when the frame work uses most of the frame budget.  If that lasts for ``patience``
+    seconds, the governor steps down one quality level by calling the ``degrade``
+    function of the next feature.  If the frame work stays under half of the budget for
+    ``recovery`` seconds, it steps back up by calling the ``restore`` function of the
+    last degraded feature.  After any change it waits ``patience`` seconds before
+    changing again, to avoid flickering between levels.
+    
+    Features are degraded in the order they are registered.  Features registered with
+    ``last=True`` (such as lowering the frame rate, which :class:`GameApp` registers
+    itself) always come after the others.
+    
+    You should not need to make a governor.  Use the one in the ``governor`` attribute
+    of :class:`GameApp`.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def enabled(self):
+        """
+        Whether the governor may change the quality level.
+        
+        Disabling the governor restores every degraded feature.
+        
+        **Invariant**: Must be a bool
+        """
+        return self._enabled
+    
+    @enabled.setter
+    def enabled(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._enabled = value
+        if not value:
+            while self._level > 0:
+                self._step_up()
+    
+    @property
+    def patience(self):
+        """
+        The number of seconds of overload before the quality is lowered.
+        
+        **Invariant**: Must be an int or float > 0.
+        """
+        return self._patience
+    
+    @patience.setter
+    def patience(self,value):
+        assert type(value) in [int,float] and value > 0, 'value %s is not a valid time' % repr(value)
+        self._patience = value
+    
+    @property
+    def recovery(self):
+        """
+        The number of seconds of headroom before the quality is raised.
+        
+        **Invariant**: Must be an int or float > 0.
+        """
+        return self._recovery
+    
+    @recovery.setter
+    def recovery(self,value):
+        assert type(value) in [int,float] and value > 0, 'value %s is not a valid time' % repr(value)
+        self._recovery = value
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def level(self):
+        """
+        The number of features currently degraded.
+        
+        Level 0 is full quality.
+        
+        **Invariant**: Must be an int in 0..len(features).
+        """
+        return self._level
+    
+    @property
+    def features(self):
+        """
+        The names of the registered features, in the order they are degraded.
+        
+        **Invariant**: Must be a tuple of strings.
+        """
+        return tuple(feature[0] for feature in self._order())
+    
+    @property
+    def degraded(self):
+        """
+        The names of the features currently degraded.
+        
+        **Invariant**: Must be a tuple of strings.
+        """
+        return self.features[:self._level]
+    
+    @property
+    def frame_time(self):
+        """
+        The smoothed frame interval in seconds.
+        
+        **Invariant**: Must be a float >= 0.
+        """
+        return self._dt
+    
+    @property
+    def work_time(self):
+        """
+        The smoothed time spent in ``update`` and ``draw`` in seconds.
+        
+        **Invariant**: Must be a float >= 0.
+        """
+        return self._work
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,patience=1.0,recovery=5.0):
+        """
+        Creates a new governor with no features.
+        
+        :param patience: The seconds of overload before the quality is lowered
+        :type patience:  ``int`` or ``float`` > 0
+        
+        :param recovery: The seconds of headroom before the quality is raised
+        :type recovery:  ``int`` or ``float`` > 0
+        """
+        self.patience = patience
+        self.recovery = recovery
+        self._enabled = True
+        self._features = []
+        self._finals = []
+        self._level = 0
+        self._dt = 0.0
+        self._work = 0.0
+        self._overload = 0.0
+        self._headroom = 0.0
+        self._cooldown = 0.0
+    
+    
+    # PUBLIC METHODS
+    def register(self,name,degrade,restore,last=False):
+        """
+        Registers a feature that can be turned off when the game is overloaded.
+        
+        The function ``degrade`` is called (with no arguments) to turn the feature off
+        and ``restore`` is called to turn it back on.  For example, a game can hide its
+        particle effects with the method call::
+            
+            governor.register('particles',self.hideParticles,self.showParticles)
+        
+        :param name: The feature name
+        :type name:  ``str``
+        
+        :param degrade: The function that turns the feature off
+        :type degrade:  a function of no arguments
+        
+        :param restore: The function that turns the feature on
+        :type restore:  a function of no arguments
+        
+        :param last: Whether this feature should be degraded after all the others
+        :type last:  ``bool``
+        """
+        assert type(name) == str, '%s is not a string' % repr(name)
+        assert callable(degrade) and callable(restore), 'degrade and restore must be functions'
+        assert not name in self.features, 'feature %s is already registered' % repr(name)
+        feature = (name,degrade,restore)
+        if last:
+            self._finals.append(feature)
+        elif self._level > len(self._features):
+            # The final features are already degraded, so this one starts degraded too
+            self._features.append(feature)
+            self._level += 1
+            degrade()
+        else:
+            self._features.append(feature)
+    
+    def reset(self):
+        """
+        Restores every degraded feature and clears the frame statistics.
+        """
+        while self._level > 0:
+            self._step_up()
+        self._dt = 0.0
+        self._work = 0.0
+        self._overload = 0.0
+        self._headroom = 0.0
+        self._cooldown = 0.0
+    
+    def measure(self,dt,work,budget):
+        """
+        Records the timing of one animation frame, changing the level if necessary.
+        
+        This method is called for you by :class:`GameApp` after every animation frame.
+        
+        :param dt: The time in seconds since the previous frame
+        :type dt:  ``int`` or ``float`` >= 0
+        
+        :param work: The time in seconds spent in ``update`` and ``draw``
+        :type work:  ``int`` or ``float`` >= 0
+        
+        :param budget: The target frame length (1/fps) in seconds
+        :type budget:  ``int`` or ``float`` > 0
+        """
+        # Exponential moving averages over roughly ten frames
+        self._dt   += 0.1*(dt-self._dt)
+        self._work += 0.1*(work-self._work)
+        if not self._enabled:
+            return
+        
+        if self._cooldown > 0:
+            self._cooldown -= dt
+            return
+        
+        if self._dt > 1.25*budget or self._work > 0.9*budget:
+            self._overload += dt
+            self._headroom = 0.0
+        elif self._work < 0.5*budget and self._dt < 1.1*budget:
+            self._headroom += dt
+            self._overload = 0.0
+        else:
+            self._overload = 0.0
+            self._headroom = 0.0
+        
+        if self._overload >= self._patience and self._level < len(self.features):
+            self._step_down()
+        elif self._headroom >= self._recovery and self._level > 0:
+            self._step_up()
+    
+    
+    # HIDDEN METHODS
+    def _order(self):
+        """
+        Returns the features in the order they are degraded.
+        """
+        return self._features+self._finals
+    
+    def _step_down(self):
+        """
+        Degrades the next feature.
+        """
+        feature = self._order()[self._level]
+        self._level += 1
+        self._changed()
+        feature[1]()
+    
+    def _step_up(self):
+        """
+        Restores the most recently degraded feature.
+        """
+        self._level -= 1
+        feature = self._order()[self._level]
+        self._changed()
+        feature[2]()
+    
+    def _changed(self):
+        """
+        Resets the counters after a level change.
+        """
+        self._overload = 0.0
+        self._headroom = 0.0
+        self._cooldown = self._patience
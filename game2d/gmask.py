@@ -0,0 +1,183 @@
+"""
+Collision masks for 2D game support.
+
+An image with transparency is not really a rectangle, so testing a collision against
+its bounding box reports hits in the empty corners of the image.  This module makes a
+mask for an image from its alpha channel, with one bit for each pixel that is solid.
+The rows of a mask are packed into Python integers, so two masks are compared a whole
+row at a time with a bitwise and.
+
+The masks of an image are made once and saved in the asset cache, next to the decoded
+pixels.  Use the method ``collides`` of :class:`GObject`, which only looks at the masks
+once the bounding boxes overlap.
+"""
+import numpy as np
+
+
+# Pixels with at least this alpha value are solid
+MASK_ALPHA = 128
+
+
+def make_masks(pixels,format=(1,1)):
+    """
+    Returns: the packed masks of the frames of an image
+    
+    The image is cut into a grid of frames with ``format`` (rows,columns), arranged
+    left-to-right, top-to-bottom, just like a :class:`GSprite`.  The result is a uint8
+    array of shape (frames,height,bytes) where each row of a frame is packed with
+    :func:`numpy.packbits`, bottom row first.
+    
+    Parameter pixels: The image pixels, top row first
+    Precondition: pixels is a uint8 array of shape (height,width,4)
+    
+    Parameter format: The rows and columns of frames in the image
+    Precondition: format is a pair of ints > 0
+    """
+    rows, cols = format
+    height, width = pixels.shape[0]//rows, pixels.shape[1]//cols
+    solid = pixels[:,:,3] >= MASK_ALPHA
+    frames = []
+    for row in range(rows):
+        for col in range(cols):
+            frame = solid[row*height:(row+1)*height,col*width:(col+1)*width]
+            frames.append(np.packbits(frame[::-1],axis=1,bitorder='little'))
+    return np.stack(frames)
+
+
+# #mark -
+class GMask(object):
+    """
+    A class representing the solid pixels of an image.
+    
+    Row 0 of a mask is the bottom row of the image, and bit i of a row is column i, so
+    mask coordinates grow in the same directions as the coordinates of the view.
+    
+    You should not need to make a mask.  The method ``load_mask`` of :class:`GameApp`
+    makes (and caches) the masks for an image.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def width(self):
+        """
+        The width of this mask in pixels.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return self._width
+    
+    @property
+    def height(self):
+        """
+        The height of this mask in pixels.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return self._height
+    
+    @property
+    def count(self):
+        """
+        The number of solid pixels in this mask.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return sum(bin(row).count('1') for row in self._rows)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,packed,width):
+        """
+        Creates a mask from packed rows.
+        
+        :param packed: The rows of the mask, packed bottom row first
+        :type packed:  a uint8 array of shape (height,bytes), such as one frame of
+                       the result of :func:`make_masks`
+        
+        :param width: The width of the mask in pixels
+        :type width:  ``int`` > 0
+        """
+        assert type(width) == int and 0 < width <= 8*packed.shape[1], '%s is not a valid width' % repr(width)
+        self._packed = np.array(packed,dtype=np.uint8)
+        self._width  = width
+        self._height = packed.shape[0]
+        self._rows = [int.from_bytes(row.tobytes(),'little') for row in self._packed]
+        self._fits = {}
+    
+    
+    # PUBLIC METHODS
+    def overlaps(self,other,dx,dy):
+        """
+        Returns True if this mask and other have a solid pixel in common.
+        
+        The mask other is placed with its bottom left pixel at the pixel (dx,dy) of
+        this mask.
+        
+        :param other: The other mask
+        :type other:  :class:`GMask`
+        
+        :param dx: The column of this mask at the left edge of other
+        :type dx:  ``int``
+        
+        :param dy: The row of this mask at the bottom edge of other
+        :type dy:  ``int``
+        
+        :return: True if the masks overlap
+        :rtype:  ``bool``
+        """
+        mine, theirs = self._rows, other._rows
+        for y in range(max(0,dy),min(self._height,dy+other._height)):
+            row = theirs[y-dy]
+            row = row << dx if dx >= 0 else row >> -dx
+            if mine[y] & row:
+                return True
+        return False
+    
+    def resample(self,width,height,flipx=False,flipy=False):
+        """
+        Returns this mask scaled (and perhaps flipped) to the given size.
+        
+        Each pixel of the result takes the value of the nearest pixel of this mask.
+        The results are remembered, so asking for the same size again is free.
+        
+        :param width: The width of the result
+        :type width:  ``int`` > 0
+        
+        :param height: The height of the result
+        :type height:  ``int`` > 0
+        
+        :param flipx: Whether to mirror the result left to right
+        :type flipx:  ``bool``
+        
+        :param flipy: Whether to mirror the result top to bottom
+        :type flipy:  ``bool``
+        
+        :return: The resampled mask
+        :rtype:  :class:`GMask`
+        """
+        if width == self._width and height == self._height and not (flipx or flipy):
+            return self
+        key = (width,height,flipx,flipy)
+        if not key in self._fits:
+            solid = np.unpackbits(self._packed,axis=1,count=self._width,bitorder='little')
+            cols = (np.arange(width)*self._width)//width
+            rows = (np.arange(height)*self._height)//height
+            solid = solid[rows[::-1] if flipy else rows][:,cols[::-1] if flipx else cols]
+            self._fits[key] = GMask(np.packbits(solid,axis=1,bitorder='little'),width)
+        return self._fits[key]
+    
+    @classmethod
+    def solid(cls,width,height):
+        """
+        Returns a mask of the given size with every pixel solid.
+        
+        :param width: The width of the mask
+        :type width:  ``int`` > 0
+        
+        :param height: The height of the mask
+        :type height:  ``int`` > 0
+        
+        :return: The solid mask
+        :rtype:  :class:`GMask`
+        """
+        return cls(np.packbits(np.ones((height,width),dtype=np.uint8),axis=1,bitorder='little'),width)
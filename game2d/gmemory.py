@@ -0,0 +1,264 @@
+"""
+Memory telemetry for 2D game support.
+
+A game that makes new graphics objects every frame (such as a label for the score)
+makes a lot of garbage, and a game that holds on to them by mistake slowly leaks.
+Neither shows up in a single frame, so this module takes a sample of memory use at
+chosen moments (such as the start of every wave) and compares the samples.
+
+Each sample records the number of live graphics objects of each class, the number of
+drawing instructions they hold, the size of the texture cache, the memory allocated
+by Python (with ``tracemalloc``) and the source lines where it grew since the last
+sample, and the time spent in garbage collection.  Live objects are counted with weak
+references, so counting them does not keep them alive.
+
+Telemetry is off by default, since ``tracemalloc`` slows down every allocation.  Turn
+it on with the attribute ``enabled`` of the ``memory`` attribute of :class:`GameApp`.
+"""
+import gc
+import time
+import weakref
+import tracemalloc
+
+# The number of stack frames that tracemalloc records for each allocation
+MEMORY_FRAMES = 1
+
+# The number of source lines listed in the growth of each sample
+MEMORY_TOP = 5
+
+
+# #mark -
+class GMemory(object):
+    """
+    A class representing a series of memory samples.
+    
+    While this object is ``enabled``, every graphics object made is remembered with a
+    weak reference, ``tracemalloc`` is tracing allocations, and every garbage
+    collection is timed.  The method :meth:`sample` records a sample and logs it.  The
+    method :meth:`leaking` checks whether memory grows from sample to sample.
+    
+    Only objects made after telemetry is enabled are counted.  Hence it should be
+    enabled before the game starts (with the keyword ``memory`` of :class:`GameApp`).
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def enabled(self):
+        """
+        Whether memory use is being tracked.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._enabled
+    
+    @enabled.setter
+    def enabled(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        if value == self._enabled:
+            return
+        from .gobject import GObject
+        self._enabled = value
+        if value:
+            GObject._LIVE = weakref.WeakSet()
+            self._started = not tracemalloc.is_tracing()
+            if self._started:
+                tracemalloc.start(MEMORY_FRAMES)
+            gc.callbacks.append(self._collect)
+            self._snapshot = None
+        else:
+            GObject._LIVE = None
+            if self._started:
+                tracemalloc.stop()
+            gc.callbacks.remove(self._collect)
+            self._snapshot = None
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def samples(self):
+        """
+        The samples taken so far, in order.
+        
+        Each sample is a dictionary with the keys 'label', 'objects' (a dictionary of
+        live objects by class name), 'live', 'instructions', 'textures', 'texture_bytes',
+        'traced', 'peak', 'growth' (a list of strings), 'collections', 'gc_time' and
+        'gc_max'.  Memory sizes are in bytes and times are in seconds.
+        
+        **Invariant**: Must be a tuple of dictionaries (possibly empty).
+        """
+        return tuple(self._samples)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self):
+        """
+        Creates a new series of memory samples.
+        
+        Telemetry is off when this object is created.
+        """
+        self._enabled = False
+        self._started = False
+        self._samples = []
+        self._snapshot = None
+        self._gcstart = None
+        self._collections = 0
+        self._gctime = 0.0
+        self._gcmax = 0.0
+    
+    
+    # PUBLIC METHODS
+    def sample(self,label,view=None):
+        """
+        Records and logs a sample of memory use, or returns None if not enabled.
+        
+        The garbage collection times are for the collections since the last sample.
+        If a view is given, its drawing instructions are counted as well.
+        
+        :param label: The name of the sample (such as 'wave 3')
+        :type label:  ``str``
+        
+        :param view: The view of the game (or None)
+        :type view:  :class:`GView` or ``None``
+        
+        :return: The sample, as described in the attribute ``samples``
+        :rtype:  ``dict`` or ``None``
+        """
+        if not self._enabled:
+            return None
+        from .gobject import GObject
+        from .app import GameApp
+        
+        objects = {}
+        instructions = 0
+        for obj in list(GObject._LIVE):
+            name = type(obj).__name__
+            objects[name] = objects.get(name,0)+1
+            if not obj._cache is None:
+                instructions += len(obj._cache.children)
+        if not view is None:
+            for group in (view._below,view._frame,view._above):
+                instructions += len(group.children)
+        
+        textures = GameApp.TEXTURE_CACHE.values()
+        texture_bytes = sum(4*texture.width*texture.height for texture in textures if not texture is None)
+        
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False,tracemalloc.__file__),
+            tracemalloc.Filter(False,'<frozen importlib._bootstrap>'),
+        ))
+        growth = []
+        if not self._snapshot is None:
+            for stat in snapshot.compare_to(self._snapshot,'lineno')[:MEMORY_TOP]:
+                if stat.size_diff > 0:
+                    growth.append(str(stat))
+        self._snapshot = snapshot
+        traced, peak = tracemalloc.get_traced_memory()
+        
+        result = {'label': label, 'objects': objects, 'live': sum(objects.values()),
+                  'instructions': instructions, 'textures': len(GameApp.TEXTURE_CACHE),
+                  'texture_bytes': texture_bytes, 'traced': traced, 'peak': peak,
+                  'growth': growth, 'collections': self._collections,
+                  'gc_time': self._gctime, 'gc_max': self._gcmax}
+        self._collections = 0
+        self._gctime = 0.0
+        self._gcmax = 0.0
+        self._samples.append(result)
+        self._log(result)
+        return result
+    
+    def leaking(self,warmup=2,memory=65536,objects=1.0):
+        """
+        Checks whether memory grows steadily from sample to sample.
+        
+        The first few samples are skipped, since a game fills its caches as it warms
+        up.  A line is fit to the rest of the samples, and the game is leaking if the
+        traced memory grows faster than ``memory`` bytes per sample, or the live objects
+        grow faster than ``objects`` per sample.  At least two samples after the warm
+        up are needed, so there is no leak until then.
+        
+        :param warmup: The number of samples to skip
+        :type warmup:  ``int`` >= 0
+        
+        :param memory: The largest growth in traced memory (in bytes) per sample
+        :type memory:  ``int`` or ``float`` >= 0
+        
+        :param objects: The largest growth in live objects per sample
+        :type objects:  ``int`` or ``float`` >= 0
+        
+        :return: True if memory grows too fast
+        :rtype:  ``bool``
+        """
+        samples = self._samples[warmup:]
+        if len(samples) < 2:
+            return False
+        return (self._slope([sample['traced'] for sample in samples]) > memory or
+                self._slope([sample['live'] for sample in samples]) > objects)
+    
+    def report(self):
+        """
+        Returns a text report of every sample, one line per sample.
+        
+        :return: The report
+        :rtype:  ``str``
+        """
+        return '\n'.join(self._line(sample) for sample in self._samples)
+    
+    
+    # HIDDEN METHODS
+    def _collect(self,phase,info):
+        """
+        Times a garbage collection; this is a callback for ``gc.callbacks``.
+        
+        :param phase: Either 'start' or 'stop'
+        :type phase:  ``str``
+        
+        :param info: Information about the collection
+        :type info:  ``dict``
+        """
+        if phase == 'start':
+            self._gcstart = time.perf_counter()
+        elif not self._gcstart is None:
+            pause = time.perf_counter()-self._gcstart
+            self._gcstart = None
+            self._collections += 1
+            self._gctime += pause
+            self._gcmax = max(self._gcmax,pause)
+    
+    def _line(self,sample):
+        """
+        Returns a one line summary of a sample.
+        
+        :param sample: The sample
+        :type sample:  ``dict``
+        """
+        return ('%s: %d objects, %d instructions, %d textures (%.1f MB), %.1f MB traced '
+                '(peak %.1f MB), %d collections (%.2f ms, max %.2f ms)' %
+                (sample['label'],sample['live'],sample['instructions'],sample['textures'],
+                 sample['texture_bytes']/2**20,sample['traced']/2**20,sample['peak']/2**20,
+                 sample['collections'],1000*sample['gc_time'],1000*sample['gc_max']))
+    
+    def _log(self,sample):
+        """
+        Writes a sample to the Kivy log.
+        
+        :param sample: The sample
+        :type sample:  ``dict``
+        """
+        from kivy.logger import Logger
+        Logger.info('Memory: '+self._line(sample))
+        for line in sample['growth']:
+            Logger.info('Memory:   '+line)
+    
+    def _slope(self,values):
+        """
+        Returns the slope of the least squares line through a list of values.
+        
+        :param values: The values, at x = 0, 1, 2, ...
+        :type values:  ``list`` of numbers (at least two)
+        """
+        count = len(values)
+        mean = (count-1)/2.0
+        average = sum(values)/count
+        top = sum((x-mean)*(y-average) for (x, y) in enumerate(values))
+        bottom = sum((x-mean)**2 for x in range(count))
+        return top/bottom
@@ -88,7 +88,28 @@ class GObject(object):
     You should never make a `GObject` directly.  Instead, you should use one of the 
     subclasses: :class:`GRectangle`, :class:`GEllipse`, :class:`GImage`, :class:`GLabel`, 
     :class:`GTriangle`, :class:`GPolygon`, or :class:`GPath`.
+    
+    The geometry of a graphics object is stored as plain floats.  The Kivy transform 
+    instructions are only created when the drawing cache is built, and the rotation and 
+    scaling instructions only exist if the object is actually rotated or scaled.  All 
+    subclasses should declare ``__slots__`` for any new attributes.
+    
+    An object is not drawn at all if its ``visible`` attribute is False, or if its 
+    bounding box (the attribute ``bbox``) lies completely outside of the view.
     """
+    # Geometry is plain floats; Kivy instructions are created on demand
+    __slots__ = ('_defined', '_x', '_y', '_width', '_height', '_angle', '_sx', '_sy',
+                 '_linecolor', '_fillcolor', '_name', '_trans', '_rotate', '_scale', 
+                 '_cache', '_matrix', '_invrse', '_mtrue', '_visible', '_box', '__weakref__')
+    
+    # The attributes saved by snapshot, in the order that restore sets them
+    _SNAPSHOT = ('angle', 'scale', 'x', 'y', 'fillcolor', 'linecolor', 'visible')
+    
+    # Whether the view may skip this object when its bounding box is off screen
+    _CULL = True
+    
+    # The live objects, counted by GMemory (None unless memory telemetry is enabled)
+    _LIVE = None
     
     # MUTABLE PROPERTIES 
     @property
@@ -98,13 +119,16 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``
         """
-        return self._trans.x
+        return self._x
     
     @x.setter
     def x(self,value):
         assert type(value) in [int,float], '%s is not a number' % repr(value)
-        self._trans.x = float(value)
+        self._x = float(value)
+        if not self._trans is None:
+            self._trans.x = self._x
         self._mtrue = False
+        self._box = None
     
     @property
     def y(self):
@@ -113,13 +137,16 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``
         """
-        return self._trans.y
+        return self._y
     
     @y.setter
     def y(self,value):
         assert type(value) in [int,float], '%s is not a number' % repr(value)
-        self._trans.y = float(value)
+        self._y = float(value)
+        if not self._trans is None:
+            self._trans.y = self._y
         self._mtrue = False
+        self._box = None
     
     @property
     def width(self):
@@ -174,7 +201,7 @@ class GObject(object):
         
         **invariant**: Value must be either a number (``int`` or ``float``) or a pair of numbers.
         """ 
-        return (self._scale.x,self._scale.y)
+        return (self._sx,self._sy)
     
     @scale.setter
     def scale(self,value):
@@ -182,12 +209,21 @@ class GObject(object):
         assert type(value) in [int,float] or is_num_tuple(value,2), \
                 '%s is not a valid scaling factor' % repr(value)
         if type(value) in [int,float]:
-            self._scale.x = float(value)
-            self._scale.y = float(value)
+            self._sx = float(value)
+            self._sy = float(value)
         else:
-            self._scale.x = float(value[0])
-            self._scale.y = float(value[1])
+            self._sx = float(value[0])
+            self._sy = float(value[1])
+        
+        if not self._scale is None:
+            self._scale.x = self._sx
+            self._scale.y = self._sy
+        elif not self._cache is None and (self._sx != 1.0 or self._sy != 1.0):
+            # Goes after PushMatrix, Translate and (possibly) Rotate
+            self._scale = Scale(self._sx,self._sy,1)
+            self._cache.insert(2 if self._rotate is None else 3,self._scale)
         self._mtrue = False
+        self._box = None
     
     @property
     def angle(self):
@@ -198,15 +234,24 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``
         """ 
-        return self._rotate.angle
+        return self._angle
     
     @angle.setter
     def angle(self,value):
         assert type(value) in [int,float], '%s is not a number' % repr(value)
-        diff = np.allclose([self._rotate.angle],[value])
-        self._rotate.angle = float(value)
-        if not diff:
-            self._mtrue = False
+        value = float(value)
+        if value == self._angle:
+            return
+        
+        self._angle = value
+        if not self._rotate is None:
+            self._rotate.angle = value
+        elif not self._cache is None:
+            # Goes right after PushMatrix and Translate
+            self._rotate = Rotate(angle=value,axis=(0,0,1))
+            self._cache.insert(2,self._rotate)
+        self._mtrue = False
+        self._box = None
     
     @property
     def linecolor(self):
@@ -301,6 +346,24 @@ class GObject(object):
         assert value is None or type(value) == str, '%s is not a valid name' % repr(value)
         self._name = value
     
+    @property
+    def visible(self):
+        """
+        Whether this object is drawn.
+        
+        An invisible object is skipped by :meth:`draw`, so it costs nothing to draw. 
+        For example, an alien can be hidden while it waits to be removed, rather than 
+        being removed and created again.
+        
+        **invariant**: Value must be a ``bool``
+        """
+        return self._visible
+    
+    @visible.setter
+    def visible(self,value):
+        assert type(value) == bool, '%s is not a bool' % repr(value)
+        self._visible = value
+    
     # DERIVED PROPERTIES
     @property
     def left(self):
@@ -317,7 +380,7 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.x-self.width/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[0]
@@ -347,7 +410,7 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.x+self.width/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[0]
@@ -377,7 +440,7 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.y+self.height/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[1]
@@ -408,7 +471,7 @@ class GObject(object):
         
         **invariant**: Value must be an ``int`` or ``float``.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.y-self.height/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[1]
@@ -426,6 +489,28 @@ class GObject(object):
     
     
     # IMMUTABLE PROPERTIES
+    @property
+    def bbox(self):
+        """
+        The bounding box of this object as a tuple (left,bottom,right,top).
+        
+        The box contains the whole object, including any rotation and scaling.  It may
+        be a little larger than the object when it is rotated.  The value is cached 
+        until the position, size, angle or scale of the object changes.
+        
+        **invariant**: Value must be a tuple of four numbers
+        """
+        if self._box is None:
+            w = abs(self._sx)*self.width/2.0
+            h = abs(self._sy)*self.height/2.0
+            if self._angle != 0.0:
+                import math
+                c = abs(math.cos(math.radians(self._angle)))
+                s = abs(math.sin(math.radians(self._angle)))
+                w, h = c*w+s*h, s*w+c*h
+            self._box = (self._x-w,self._y-h,self._x+w,self._y+h)
+        return self._box
+    
     @property
     def matrix(self):
         """
@@ -478,11 +563,23 @@ class GObject(object):
         """
         # Set the properties.
         self._defined = False
-        
-        # Create the Kivy transforms for position and size
-        self._trans  = Translate(0,0,0)
-        self._rotate = Rotate(angle=0,axis=(0,0,1))
-        self._scale  = Scale(1,1,1)
+        if not GObject._LIVE is None:
+            GObject._LIVE.add(self)
+        
+        # Plain geometry; the Kivy transforms are not made until _reset
+        self._x = 0.0
+        self._y = 0.0
+        self._angle = 0.0
+        self._sx = 1.0
+        self._sy = 1.0
+        self._trans  = None
+        self._rotate = None
+        self._scale  = None
+        self._cache  = None
+        self._matrix = None
+        self._invrse = None
+        self._mtrue  = False
+        self._box    = None
         
         # Now update these with the keywords; size first
         try:
@@ -516,6 +613,9 @@ class GObject(object):
         
         # Add a name for debugging
         self.name = keywords['name'] if 'name' in keywords else None
+        
+        # And whether to draw it at all
+        self.visible = keywords['visible'] if 'visible' in keywords else True
     
     def __str__(self):
         """
@@ -538,6 +638,39 @@ class GObject(object):
     
     
     # PUBLIC METHODS
+    def snapshot(self):
+        """
+        Returns the current state of this object.
+        
+        The state is a dictionary mapping attribute names to plain Python values, so
+        it can be saved with ``json`` or ``pickle``.  Use :meth:`restore` to put this
+        object back into that state.
+        
+        :return: The object state
+        :rtype:  ``dict``
+        """
+        return {key: getattr(self,key) for key in self._SNAPSHOT}
+    
+    def restore(self,state):
+        """
+        Puts this object back into a state returned by :meth:`snapshot`.
+        
+        This method reuses this object and its drawing cache.  Only the attributes that
+        differ from the current values are assigned, so restoring the position of an 
+        object never rebuilds its Kivy instructions.
+        
+        :param state: The object state
+        :type state:  ``dict``
+        """
+        for key in self._SNAPSHOT:
+            if key in state:
+                value = state[key]
+                current = getattr(self,key)
+                if type(current) == tuple and type(value) == list:
+                    value = tuple(value)
+                if current != value:
+                    setattr(self,key,value)
+    
     def contains(self,point):
         """
         Checks whether this shape contains the point
@@ -556,12 +689,53 @@ class GObject(object):
             point = (point.x,point.y)
         assert is_num_tuple(point,2), "%s is not a valid point" % repr(point)
         
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return abs(point[0]-self.x) < self.width/2.0 and abs(point[1]-self.y) < self.height/2.0
         
         p = self.matrix.inverse()._transform(point[0],point[1])
         return abs(p[0]) < self.width/2.0 and abs(p[1]) < self.height/2.0
     
+    def collides(self,other):
+        """
+        Checks whether this shape overlaps another one.
+        
+        The bounding boxes are compared first, which is all that happens if they do not
+        overlap.  If they do, and either object is an image or sprite with transparency,
+        the solid pixels of its collision mask are compared instead (a sprite uses the
+        mask of its current frame).  Any other shape, and any rotated object, counts as
+        its whole bounding box.
+        
+        :param other: the other shape
+        :type other:  :class:`GObject`
+        
+        :return: True if the shapes overlap
+        :rtype:  ``bool``
+        """
+        assert isinstance(other,GObject), '%s is not a GObject' % repr(other)
+        box1, box2 = self.bbox, other.bbox
+        if not (box1[0] < box2[2] and box2[0] < box1[2] and box1[1] < box2[3] and box2[1] < box1[3]):
+            return False
+        
+        mask1, mask2 = self._mask(), other._mask()
+        if mask1 is None:
+            if mask2 is None:
+                return True
+            mask1, mask2, box1, box2 = mask2, mask1, box2, box1
+        
+        # Measure the other box in the pixels of the first mask
+        scalex = mask1.width/(box1[2]-box1[0])
+        scaley = mask1.height/(box1[3]-box1[1])
+        width  = max(1,int(round((box2[2]-box2[0])*scalex)))
+        height = max(1,int(round((box2[3]-box2[1])*scaley)))
+        if mask2 is None:
+            from .gmask import GMask
+            mask2 = GMask.solid(width,height)
+        else:
+            mask2 = mask2.resample(width,height)
+        dx = int(round((box2[0]-box1[0])*scalex))
+        dy = int(round((box2[1]-box1[1])*scaley))
+        return mask1.overlaps(mask2,dx,dy)
+    
     def transform(self,point):
         """
         Transforms the point to the local coordinate system
@@ -584,43 +758,91 @@ class GObject(object):
             p = self.inverse._transform(point[0],point[2])
             return Point2(p[0],p[1])
     
-    def draw(self, view):
+    def draw(self, view, layer=None):
         """
         Draws this shape in the provide view.
         
         Ideally, the view should be the one provided by :class:`GameApp`.
         
+        Nothing is drawn if this object is not ``visible``, or if the view is culling
+        and the bounding box of this object is off screen.
+        
+        If ``layer`` is None, the object is drawn on top of everything drawn before it.
+        Otherwise it is queued in the given layer, and the view sorts the queue at the 
+        end of the animation frame.  Objects drawn without a layer are in layer 0.  See
+        :class:`GView` for more information.
+        
         :param view: view to draw to
         :type view:  :class:`GView`
+        
+        :param layer: the drawing layer (or None to draw immediately)
+        :type layer:  ``int`` or ``None``
         """
+        if not self._visible or (self._CULL and view._culls(self)):
+            return
+        if not layer is None:
+            assert type(layer) == int, '%s is not a valid layer' % repr(layer)
+            view._submit(self,layer)
+            return
         try:
             view.draw(self._cache)
         except:
             raise IOError('Cannot draw %s since it was not initialized properly' % repr(self))
     
     # HIDDEN METHODS
+    def _state(self):
+        """
+        Returns the drawing state of this object as a pair (texture,color).
+        
+        The render queue of :class:`GView` sorts by this pair, so that objects with the
+        same texture and color are drawn together.  The texture is an int id (0 for no
+        texture) and the color is a tuple.
+        """
+        return (0,() if self._fillcolor is None else tuple(self._fillcolor.rgba))
+    
+    def _mask(self):
+        """
+        Returns the collision mask of this object, or None if it is a solid box.
+        
+        The mask must match the object as drawn, including any flip by a negative
+        scale.  Objects with a mask should return None while they are rotated.
+        """
+        return None
+    
     def _reset(self):
         """
         Resets the drawing cache.
         """
+        self._box = None
         self._cache = InstructionGroup()
         self._cache.add(PushMatrix())
+        self._trans = Translate(self._x,self._y,0)
         self._cache.add(self._trans)
-        self._cache.add(self._rotate)
-        self._cache.add(self._scale)
+        
+        # Identity rotations and scales are omitted entirely
+        if self._angle != 0.0:
+            self._rotate = Rotate(angle=self._angle,axis=(0,0,1))
+            self._cache.add(self._rotate)
+        else:
+            self._rotate = None
+        if self._sx != 1.0 or self._sy != 1.0:
+            self._scale = Scale(self._sx,self._sy,1)
+            self._cache.add(self._scale)
+        else:
+            self._scale = None
     
     def _build_matrix(self):
         """
         Builds the transform matrices after a settings change.
         """
         self._matrix = Matrix()
-        self._matrix.translate(self._trans.x,self._trans.y)
-        self._matrix.rotate(self._rotate.angle)
-        self._matrix.scale(self._scale.x,self._scale.y)
+        self._matrix.translate(self._x,self._y)
+        self._matrix.rotate(self._angle)
+        self._matrix.scale(self._sx,self._sy)
         self._invrse = Matrix()
-        self._invrse.scale(1.0/self._scale.x,1.0/self._scale.y)
-        self._invrse.rotate(-self._rotate.angle)
-        self._invrse.translate(-self._trans.x,-self._trans.y)
+        self._invrse.scale(1.0/self._sx,1.0/self._sy)
+        self._invrse.rotate(-self._angle)
+        self._invrse.translate(-self._x,-self._y)
         self._mtrue = True
 
 
@@ -641,7 +863,12 @@ class GScene(GObject):
     read-only.  These values are computed from the list of objects stored in the scene.
     
     All objects stored in a ``GScene`` are drawn as if the point (x,y) is the origin.
+    
+    A scene is never culled by the view, since its children may move without the scene
+    knowing about it.
     """
+    __slots__ = ('_children',)
+    _CULL = False
     
     # MUTABLE PROPERTIES
     @property
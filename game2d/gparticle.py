@@ -0,0 +1,305 @@
+"""
+A particle system for explosions and debris.
+
+This module provides a single drawable that contains thousands of small particles.
+Each particle has a position, velocity, lifetime and color, but the particles are not
+objects.  They live in preallocated NumPy arrays and are moved all at once, and the
+whole system is drawn as a single Kivy ``Mesh``.  Hence a system with thousands of
+particles costs about as much to draw as one sprite.
+"""
+import numpy as np
+from kivy.graphics import *
+from kivy.graphics.instructions import *
+from .gobject import GObject
+
+
+# The vertex shader, which adds a per-vertex color to the standard Kivy shader
+_VERTEX_SHADER = """
+$HEADER$
+attribute vec4 vColor;
+
+void main(void) {
+    frag_color = vColor*color*vec4(1.0,1.0,1.0,opacity);
+    gl_Position = projection_mat*modelview_mat*vec4(vPosition.xy,0.0,1.0);
+}
+"""
+
+# The fragment shader, which just uses the interpolated vertex color
+_FRAGMENT_SHADER = """
+$HEADER$
+
+void main(void) {
+    gl_FragColor = frag_color;
+}
+"""
+
+# The mesh vertex format: a position and an RGBA color
+_FORMAT = [(b'vPosition', 2, 'float'), (b'vColor', 4, 'float')]
+
+# The corners of a particle quad, as multiples of the half size
+_CORNERS = np.array([[-1,-1],[1,-1],[1,1],[-1,1]],dtype=np.float32)
+
+
+class GParticleSystem(GObject):
+    """
+    A class representing a collection of particles drawn as a single mesh.
+    
+    A particle system holds up to ``capacity`` particles.  New particles are created with
+    :meth:`emit` and they are stored in a ring buffer, so once the system is full each new
+    particle replaces the oldest one.  No memory is allocated after the system is made.
+    
+    Each particle is a small square of side ``size``, drawn in its own color.  The color
+    fades out as the particle reaches the end of its life.  You must call :meth:`update`
+    every animation frame to move the particles.
+    
+    As with :class:`GScene`, the particle positions are relative to the attributes ``x``
+    and ``y``, so moving the system moves all of the particles.  The ``fillcolor`` (white
+    by default) tints every particle.
+    """
+    __slots__ = ('_capacity', '_size', '_gravity', '_drag', '_head', '_pos', '_vel', '_life',
+                 '_span', '_color', '_verts', '_mesh', '_context', '_rng')
+    
+    # The particles may be anywhere, so the system is never culled
+    _CULL = False
+    
+    # MUTABLE PROPERTIES
+    @property
+    def size(self):
+        """
+        The side length of each particle.
+        
+        **Invariant**: Value must be an ``int`` or ``float`` > 0.
+        """
+        return self._size
+    
+    @size.setter
+    def size(self,value):
+        assert type(value) in [int,float] and value > 0, '%s is not a valid size' % repr(value)
+        self._size = float(value)
+    
+    @property
+    def gravity(self):
+        """
+        The acceleration applied to every particle, as a pair (ax,ay).
+        
+        **Invariant**: Value must be a pair of numbers.
+        """
+        return (float(self._gravity[0]),float(self._gravity[1]))
+    
+    @gravity.setter
+    def gravity(self,value):
+        assert type(value) in [tuple,list] and len(value) == 2, '%s is not a valid acceleration' % repr(value)
+        self._gravity = np.array(value,dtype=np.float32)
+    
+    @property
+    def drag(self):
+        """
+        The fraction of its velocity each particle loses per second.
+        
+        **Invariant**: Value must be an ``int`` or ``float`` in the range 0..1.
+        """
+        return self._drag
+    
+    @drag.setter
+    def drag(self,value):
+        assert type(value) in [int,float] and 0 <= value <= 1, '%s is not a valid drag' % repr(value)
+        self._drag = float(value)
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def capacity(self):
+        """
+        The maximum number of particles in this system.
+        
+        **Immutable**: This value is set by the constructor.
+        
+        **Invariant**: Value must be an ``int`` > 0.
+        """
+        return self._capacity
+    
+    @property
+    def count(self):
+        """
+        The number of particles that are still alive.
+        
+        **Immutable**: This value cannot be altered.
+        
+        **Invariant**: Value must be an ``int`` >= 0.
+        """
+        return int(np.count_nonzero(self._life > 0))
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,**keywords):
+        """
+        Creates a new, empty particle system.
+        
+        To use the constructor for this class, you should provide it with a list of
+        keyword arguments that initialize various attributes.  For example, to make a
+        system of up to 2000 particles that fall down the screen, use the constructor::
+            
+            GParticleSystem(capacity=2000,size=3,gravity=(0,-200))
+        
+        This class supports the same keywords as :class:`GObject`, as well as the
+        keywords ``capacity``, ``size``, ``gravity`` and ``drag``.  The optional keyword
+        ``random`` is a :class:`GRandom` to draw the particle spread from.
+        
+        :param keywords: dictionary of keyword arguments
+        :type keywords:  keys are attribute names
+        """
+        self._defined = False
+        capacity = keywords['capacity'] if 'capacity' in keywords else 1024
+        assert type(capacity) == int and capacity > 0, '%s is not a valid capacity' % repr(capacity)
+        # Mesh indices are 16 bit, and each particle has 4 vertices
+        assert capacity <= 16384, 'capacity %s is larger than 16384' % repr(capacity)
+        self._capacity = capacity
+        self.size = keywords['size'] if 'size' in keywords else 2
+        self.gravity = keywords['gravity'] if 'gravity' in keywords else (0,0)
+        self.drag = keywords['drag'] if 'drag' in keywords else 0
+        self._rng = keywords['random'] if 'random' in keywords else None
+        if not 'fillcolor' in keywords:
+            keywords['fillcolor'] = (1,1,1,1)
+        
+        # The particle arrays
+        self._head  = 0
+        self._pos   = np.zeros((capacity,2),dtype=np.float32)
+        self._vel   = np.zeros((capacity,2),dtype=np.float32)
+        self._life  = np.zeros(capacity,dtype=np.float32)
+        self._span  = np.ones(capacity,dtype=np.float32)
+        self._color = np.zeros((capacity,4),dtype=np.float32)
+        self._verts = np.zeros((capacity,4,6),dtype=np.float32)
+        self._mesh  = None
+        self._context = None
+        
+        GObject.__init__(self,**keywords)
+        self._reset()
+        self._defined = True
+    
+    
+    # PUBLIC METHODS
+    def emit(self,count,x=0,y=0,speed=(50,150),angle=(0,360),life=(0.5,1.0),color=(1,1,1,1)):
+        """
+        Creates count new particles at the given point.
+        
+        The particles fly off in random directions in the range ``angle`` (in degrees),
+        with random speeds in the range ``speed`` and random lifetimes (in seconds) in
+        the range ``life``.  For example, to make an explosion of 200 orange particles
+        at the point (100,50), use the method call::
+            
+            particles.emit(200,100,50,color=(1,0.6,0,1))
+        
+        :param count: The number of particles
+        :type count:  ``int`` > 0
+        
+        :param x: The horizontal coordinate of the particle source
+        :type x:  ``int`` or ``float``
+        
+        :param y: The vertical coordinate of the particle source
+        :type y:  ``int`` or ``float``
+        
+        :param speed: The range of particle speeds
+        :type speed:  a pair of numbers
+        
+        :param angle: The range of particle directions in degrees
+        :type angle:  a pair of numbers
+        
+        :param life: The range of particle lifetimes in seconds
+        :type life:  a pair of numbers > 0
+        
+        :param color: The particle color
+        :type color:  a 4-element list of floats between 0 and 1
+        """
+        assert type(count) == int and count > 0, '%s is not a valid count' % repr(count)
+        count = min(count,self._capacity)
+        index = (self._head+np.arange(count)) % self._capacity
+        self._head = (self._head+count) % self._capacity
+        
+        draws = self._draw_random(3*count).reshape(3,count)
+        theta = np.radians(angle[0]+(angle[1]-angle[0])*draws[0])
+        rate  = speed[0]+(speed[1]-speed[0])*draws[1]
+        span  = life[0]+(life[1]-life[0])*draws[2]
+        
+        self._pos[index] = (x,y)
+        self._vel[index,0] = rate*np.cos(theta)
+        self._vel[index,1] = rate*np.sin(theta)
+        self._life[index] = span
+        self._span[index] = span
+        self._color[index] = color
+    
+    def update(self,dt):
+        """
+        Moves every particle forward in time by dt seconds.
+        
+        This method should be called once every animation frame.  Particles that reach
+        the end of their life are hidden, and their slots are reused by :meth:`emit`.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        alive = self._life > 0
+        if not alive.any():
+            return
+        self._vel[alive] += self._gravity*dt
+        if self._drag:
+            self._vel[alive] *= max(0.0,1.0-self._drag*dt)
+        self._pos[alive] += self._vel[alive]*dt
+        self._life[alive] -= dt
+        self._refresh()
+    
+    def clear(self):
+        """
+        Removes every particle from this system.
+        """
+        self._life[:] = 0
+        self._refresh()
+    
+    
+    # HIDDEN METHODS
+    def _draw_random(self,size):
+        """
+        Returns an array of size random floats in [0,1)
+        
+        :param size: The number of values
+        :type size:  ``int`` >= 0
+        """
+        if self._rng is None:
+            self._rng = np.random.default_rng()
+        if isinstance(self._rng,np.random.Generator):
+            return self._rng.random(size)
+        return self._rng.randoms(size)
+    
+    def _refresh(self):
+        """
+        Writes the particle quads into the mesh.
+        
+        Dead particles become zero-size quads, so the mesh never changes size.
+        """
+        fade = np.clip(self._life/self._span,0.0,1.0)
+        half = np.where(self._life > 0,self._size/2.0,0.0).astype(np.float32)
+        self._verts[:,:,0:2] = self._pos[:,None,:]+_CORNERS[None,:,:]*half[:,None,None]
+        self._verts[:,:,2:6] = self._color[:,None,:]
+        self._verts[:,:,5] *= fade[:,None]
+        if not self._mesh is None:
+            try:
+                self._mesh.vertices = memoryview(self._verts.reshape(-1))
+            except:
+                self._mesh.vertices = self._verts.reshape(-1).tolist()
+    
+    def _reset(self):
+        """
+        Resets the drawing cache.
+        """
+        GObject._reset(self)
+        quads = np.arange(self._capacity,dtype=np.int64)[:,None]*4
+        indices = (quads+np.array([0,1,2,2,3,0])).reshape(-1).tolist()
+        
+        self._context = RenderContext(use_parent_projection=True,use_parent_modelview=True)
+        self._context.shader.vs = _VERTEX_SHADER
+        self._context.shader.fs = _FRAGMENT_SHADER
+        self._mesh = Mesh(fmt=_FORMAT,mode='triangles',indices=indices)
+        self._refresh()
+        self._context.add(self._fillcolor)
+        self._context.add(self._mesh)
+        self._cache.add(self._context)
+        self._cache.add(PopMatrix())
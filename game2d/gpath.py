@@ -103,6 +103,8 @@ class GPath(GObject):
     are 0.  However, if they are nonzero, then Python will add them to all of the points
     in the path, shifting the path accordingly.
     """
+    __slots__ = ('_points', '_linewidth')
+    _SNAPSHOT = ('points', 'linewidth')+GObject._SNAPSHOT
     
     # MUTABLE PROPERTIES
     @property
@@ -280,6 +282,7 @@ class GTriangle(GPath):
     will add them to the triangle vertices.  Similarly, the attributes `width` and 
     `height` are immutable, and are computed directly from the points
     """
+    __slots__ = ()
     
     # MUTABLE PROPERTIES
     @property
@@ -397,6 +400,7 @@ class GPolygon(GPath):
     As with :class:`GPath`, the attributes ``width`` and ``height`` are immutable, and 
     are computed directly from the points
     """
+    __slots__ = ('_source', '_source_width', '_source_height', '_mesh', '_verts')
     
     # MUTABLE PROPERTIES
     @property
@@ -0,0 +1,154 @@
+"""
+Recording views for 2D game support.
+
+A game that runs without a window (such as a simulation or a bot in training) still
+needs to know what would be on the screen.  This module provides a stand-in for
+:class:`GView` that draws nothing.  Instead, it records every object drawn to it, in
+the order that :class:`GView` would draw them.  The recorded objects can then be
+turned into features, such as the observations of a bot.
+"""
+
+
+# #mark -
+class GRecorder(object):
+    """
+    A class representing a view that records objects instead of drawing them.
+    
+    Pass this object to the ``draw`` method of a :class:`GObject` (or to a method that
+    draws a whole model, like ``waveDraw``) in place of the view of a :class:`GameApp`.
+    Just like :class:`GView`, objects completely outside of the ``bounds`` are culled,
+    and objects drawn in a layer are sorted by layer, texture and color.  The attribute
+    ``objects`` has the objects that were drawn, bottom to top.
+    
+    Objects that only hand a view their drawing instructions, such as a
+    :class:`GScene` or a :class:`GParticleSystem`, cannot be recorded, and are skipped.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def culling(self):
+        """
+        Whether objects that are completely off screen are skipped.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._culling
+    
+    @culling.setter
+    def culling(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._culling = value
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def bounds(self):
+        """
+        The visible area of this view as a tuple (left,bottom,right,top).
+        
+        **Invariant**: Must be a tuple of four numbers.
+        """
+        return self._bounds
+    
+    @property
+    def culled(self):
+        """
+        The number of objects culled since the view was last cleared.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._culled
+    
+    @property
+    def objects(self):
+        """
+        The objects drawn since the view was last cleared, bottom to top.
+        
+        **Invariant**: Must be a list of :class:`GObject` (possibly empty).
+        """
+        queue = sorted(self._queue,key=lambda entry: entry[:4])
+        below = [entry[4] for entry in queue if entry[0] < 0]
+        above = [entry[4] for entry in queue if entry[0] >= 0]
+        return below+self._frame+above
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,width,height):
+        """
+        Creates a new recording view of the given size.
+        
+        :param width: The width of the view
+        :type width:  ``int`` or ``float`` > 0
+        
+        :param height: The height of the view
+        :type height:  ``int`` or ``float`` > 0
+        """
+        assert type(width) in [int,float] and width > 0, '%s is not a valid width' % repr(width)
+        assert type(height) in [int,float] and height > 0, '%s is not a valid height' % repr(height)
+        self._bounds = (0,0,width,height)
+        self._culling = True
+        self._frame = []
+        self._queue = []
+        self._pending = None
+        self._culled = 0
+    
+    
+    # PUBLIC METHODS
+    def draw(self,cmd):
+        """
+        Records the object whose drawing instructions are given.
+        
+        Instructions that do not belong to the object being drawn are ignored.
+        
+        :param cmd: the command to draw
+        :type cmd:  A Kivy graphics command
+        """
+        if not self._pending is None and self._pending._cache is cmd:
+            self._frame.append(self._pending)
+        self._pending = None
+    
+    def clear(self):
+        """
+        Clears the recorded objects.
+        """
+        self._frame = []
+        self._queue = []
+        self._pending = None
+        self._culled = 0
+    
+    
+    # HIDDEN METHODS
+    def _culls(self,obj):
+        """
+        Checks whether obj is completely outside of this view, counting it if so.
+        
+        An object that is not culled is remembered until its instructions are drawn.
+        
+        :param obj: The object to draw
+        :type obj:  :class:`GObject`
+        
+        :return: True if obj should be culled (skipped) when drawn
+        :rtype:  ``bool``
+        """
+        if self._culling:
+            box = obj.bbox
+            view = self._bounds
+            if box[2] < view[0] or box[0] > view[2] or box[3] < view[1] or box[1] > view[3]:
+                self._culled += 1
+                return True
+        self._pending = obj
+        return False
+    
+    def _submit(self,obj,layer):
+        """
+        Adds an object to the render queue.
+        
+        :param obj: The object to draw
+        :type obj:  :class:`GObject`
+        
+        :param layer: The drawing layer
+        :type layer:  ``int``
+        """
+        self._pending = None
+        texture, color = obj._state()
+        self._queue.append((layer,texture,color,len(self._queue),obj))
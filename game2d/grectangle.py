@@ -14,6 +14,7 @@ from kivy.uix.label import Label
 from kivy.uix.image import Image
 from .gobject import GObject
 from .app import GameApp
+from .gtrace import traced
 
 class GRectangle(GObject):
     """
@@ -28,6 +29,8 @@ class GRectangle(GObject):
     The only new property for this class is ``linewidth``, which controls the width of
     the border around the rectangle.  For all other properties, see the documentation
     for :class:`GObject`."""
+    __slots__ = ('_linewidth',)
+    _SNAPSHOT = ('width', 'height', 'linewidth')+GObject._SNAPSHOT
     
     # MUTABLE PROPERTIES 
     @property
@@ -111,6 +114,7 @@ class GEllipse(GRectangle):
     This class has exactly the same properties as :class:`GRectangle`.  See the 
     documentation of that class and :class:`GObject` for a complete list of attributes.
     """
+    __slots__ = ()
     
     # BUILT-IN METHODS
     def __init__(self,**keywords):
@@ -150,7 +154,7 @@ class GEllipse(GRectangle):
         
         rx = self.width/2.0
         ry = self.height/2.0
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             dx = (point[0]-self.x)*(point[0]-self.x)/(rx*rx)
             dy = (point[1]-self.y)*(point[1]-self.y)/(ry*ry)
         else:
@@ -204,6 +208,8 @@ class GImage(GRectangle):
     If the image supports transparency, then this object can be used to represent irregular 
     shapes.  However, the :meth:`contains` method still treats this shape as a  rectangle.
     """
+    __slots__ = ('_source', '_texture')
+    _SNAPSHOT = ('source',)+GRectangle._SNAPSHOT
     
     # MUTABLE PROPERTIES
     @property
@@ -249,6 +255,27 @@ class GImage(GRectangle):
     
     
     # HIDDEN METHODS
+    def _state(self):
+        """
+        Returns the drawing state of this object as a pair (texture,color).
+        
+        Images from the same atlas page share a texture id, so they sort together.
+        """
+        texture = 0 if self._texture is None else self._texture.id
+        return (texture,() if self._fillcolor is None else tuple(self._fillcolor.rgba))
+    
+    def _mask(self):
+        """
+        Returns the collision mask of this image, flipped to match the scale.
+        """
+        if self._source is None or self._angle != 0.0:
+            return None
+        masks = GameApp.load_mask(self.source)
+        if masks is None:
+            return None
+        mask = masks[0]
+        return mask.resample(mask.width,mask.height,self._sx < 0,self._sy < 0)
+    
     def _reset(self):
         """
         Resets the drawing cache.
@@ -297,6 +324,8 @@ class GLabel(GRectangle):
     default Kivy font.  The `bold` attribute only works for the default Kivy font; for 
     other fonts you will need the .ttf file for the bold version of that font.  See the
     provided `ComicSans.ttf` and `ComicSansBold.ttf` for an example."""
+    __slots__ = ('_label', '_fsize', '_halign', '_valign', '_hanchor', '_vanchor', '_ha', '_hv')
+    _SNAPSHOT = ('text',)+GObject._SNAPSHOT
     
     # MUTABLE PROPERTIES
     @property
@@ -421,13 +450,16 @@ class GLabel(GRectangle):
         The horizontal coordinate of the object center.
         
         **Invariant**: Must be an int or float."""
-        return self._trans.x
+        return self._x
     
     @x.setter
     def x(self,value):
         assert type(value) in [int,float], 'value %s is not a number' % repr(value)
-        self._trans.x = float(value)
+        self._x = float(value)
+        if not self._trans is None:
+            self._trans.x = self._x
         self._mtrue = False
+        self._box = None
         self._hanchor = 'center'
         self._ha = value
     
@@ -437,13 +469,16 @@ class GLabel(GRectangle):
         The vertical coordinate of the object center..
         
         **Invariant**: Must be an int or float."""
-        return self._trans.y
+        return self._y
     
     @y.setter
     def y(self,value):
         assert type(value) in [int,float], 'value %s is not a number' % repr(value)
-        self._trans.y = float(value)
+        self._y = float(value)
+        if not self._trans is None:
+            self._trans.y = self._y
         self._mtrue = False
+        self._box = None
         self._vanchor = 'center'
         self._hv = value
     
@@ -462,7 +497,7 @@ class GLabel(GRectangle):
         
         **Invariant**: Must be an int or float.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.x-self.width/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[0]
@@ -494,7 +529,7 @@ class GLabel(GRectangle):
         
         **Invariant**: Must be an int or float.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.x+self.width/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[0]
@@ -526,7 +561,7 @@ class GLabel(GRectangle):
         
         **Invariant**: Must be an int or float.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.y+self.height/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[1]
@@ -557,7 +592,7 @@ class GLabel(GRectangle):
         **Warning**: Accessing this value on a rotated object may slow down your framerate.
         **Invariant**: Must be an int or float.
         """
-        if self._rotate.angle == 0.0:
+        if self._angle == 0.0:
             return self.y-self.height/2.0
         
         p0 = self.matrix._transform(self.x-self.width/2.0, self.y-self.height/2.0)[1]
@@ -634,6 +669,7 @@ class GLabel(GRectangle):
         if self._defined:
             self._reset()
     
+    @traced('GLabel._reset')
     def _reset(self):
         """
         Resets the drawing cache.
@@ -652,15 +688,15 @@ class GLabel(GRectangle):
         
         # Reset the absolute anchor
         if self._hanchor == 'left':
-            self._trans.x = self._ha+self.width/2.0
+            self._x = self._ha+self.width/2.0
         elif self._hanchor == 'right':
-            self._trans.x = self._ha-self.width/2.0
+            self._x = self._ha-self.width/2.0
         
         # Reset the absolute anchor
         if self._vanchor == 'top':
-            self._trans.y = self._hv-self.height/2.0
+            self._y = self._hv-self.height/2.0
         elif self._vanchor == 'bottom':
-            self._trans.y = self._hv+self.height/2.0
+            self._y = self._hv+self.height/2.0
         
         # Reset the label anchor.
         if self.halign == 'left':
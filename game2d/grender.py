@@ -0,0 +1,400 @@
+"""
+Software rendering for 2D game support.
+
+Bots and analytics that run without a window often want a picture of the game, not
+just a list of objects.  This module draws graphics objects into a small NumPy image,
+with no Kivy window or OpenGL context.  The picture is a smaller copy of what the
+:class:`GView` would show, scaled by the same factor in both directions.
+
+Images are decoded once (from the asset cache if possible) and shrunk to the size they
+are drawn at by averaging the pixels they cover.  The shrunk copies are kept, so each
+object is drawn with a single blend of two small arrays.  Objects are drawn in the
+order given, which should be the order of a :class:`GRecorder`.
+
+Only the shapes a game of sprites needs are drawn: rectangles, ellipses, images,
+sprites, bitmaps and labels.  A label is drawn as its background, with the text as a
+faint block of the text color, since the fonts are not available.  Paths, polygons,
+scenes and particle systems are skipped, and rotated objects are drawn unrotated.
+"""
+import os
+import math
+import numpy as np
+from .grectangle import GRectangle, GEllipse, GImage, GLabel
+from .gsprite import GSprite
+from .gbitmap import GBitmap
+
+# The fraction of a label covered by its text, used to shade labels
+LABEL_INK = 0.35
+
+
+def shrink(pixels,width,height):
+    """
+    Returns: the given image resized to width x height, with premultiplied alpha
+    
+    Each pixel of the result is the average of the pixels of the image that it covers,
+    which is what a view shows when the image is drawn smaller than its size.  The
+    colors are multiplied by alpha before averaging, so that transparent pixels do
+    not darken the edges.  An image drawn larger than its size takes the nearest
+    pixel instead.  The result is a float32 array of shape (height,width,4), with
+    values from 0 to 1.
+    
+    Parameter pixels: The image, top row first
+    Precondition: pixels is a uint8 array of shape (rows,cols,4)
+    
+    Parameter width: The width of the result
+    Precondition: width is an int > 0
+    
+    Parameter height: The height of the result
+    Precondition: height is an int > 0
+    """
+    image = pixels.astype(np.float32)/255.0
+    image[:,:,:3] *= image[:,:,3:]
+    for axis, size in ((0,height),(1,width)):
+        count = image.shape[axis]
+        if size <= count:
+            edges = (np.arange(size)*count)//size
+            sums  = np.add.reduceat(image,edges,axis=axis)
+            spans = np.diff(np.append(edges,count)).astype(np.float32)
+            image = sums/(spans[:,None,None] if axis == 0 else spans[None,:,None])
+        else:
+            image = np.take(image,(np.arange(size)*count)//size,axis=axis)
+    return image
+
+
+# #mark -
+class GRenderer(object):
+    """
+    A class representing a software renderer for graphics objects.
+    
+    To render the objects drawn by a model (such as a wave), record them and then
+    render the recording::
+        
+        recorder.clear()
+        wave.waveDraw(recorder)
+        picture = renderer.render(recorder.objects)
+    
+    The result is a uint8 RGB array, top row first, of the size of the view times
+    ``scale``.  A pixel is covered by an object if its center is inside the object,
+    the same rule that OpenGL uses, so objects line up with the pixels of a view
+    of the same size.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def width(self):
+        """
+        The width of a rendered picture in pixels.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return self._width
+    
+    @property
+    def height(self):
+        """
+        The height of a rendered picture in pixels.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return self._height
+    
+    @property
+    def scale(self):
+        """
+        The size of a picture pixel relative to a view unit.
+        
+        **Invariant**: Must be a float > 0.
+        """
+        return self._scale
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,width,height,scale=0.125,background=(0,0,0),folder=None):
+        """
+        Creates a renderer for a view of the given size.
+        
+        :param width: The width of the view
+        :type width:  ``int`` or ``float`` > 0
+        
+        :param height: The height of the view
+        :type height:  ``int`` or ``float`` > 0
+        
+        :param scale: The size of a picture pixel relative to a view unit
+        :type scale:  ``int`` or ``float`` > 0
+        
+        :param background: The color of the empty view, as (r,g,b) from 0 to 1
+        :type background:  ``tuple``
+        
+        :param folder: The folder of images (None for the **Images** folder of the game)
+        :type folder:  ``str`` or ``None``
+        """
+        assert type(scale) in [int,float] and scale > 0, '%s is not a valid scale' % repr(scale)
+        self._scale = float(scale)
+        self._width  = max(1,int(round(width*scale)))
+        self._height = max(1,int(round(height*scale)))
+        self._background = np.array(background[:3],dtype=np.float32)
+        self._folder = folder
+        self._canvas = np.empty((self._height,self._width,3),dtype=np.float32)
+        self._images = {}
+        self._copies = {}
+        self._ovals  = {}
+    
+    
+    # PUBLIC METHODS
+    def render(self,objects,out=None):
+        """
+        Renders the given objects, bottom to top, and returns the picture.
+        
+        :param objects: The objects to draw
+        :type objects:  iterable of :class:`GObject`
+        
+        :param out: The array to write the picture to (None for a new array)
+        :type out:  a uint8 array of shape (height,width,3) or ``None``
+        
+        :return: The picture, top row first
+        :rtype:  a uint8 array of shape (height,width,3)
+        """
+        canvas = self._canvas
+        canvas[:] = self._background
+        for obj in objects:
+            if isinstance(obj,GBitmap):
+                self._draw_bitmap(obj)
+            elif isinstance(obj,(GImage,GSprite)):
+                self._draw_image(obj)
+            elif isinstance(obj,GLabel):
+                self._draw_label(obj)
+            elif isinstance(obj,GEllipse):
+                self._draw_shape(obj,True)
+            elif isinstance(obj,GRectangle):
+                self._draw_shape(obj,False)
+        
+        if out is None:
+            out = np.empty((self._height,self._width,3),dtype=np.uint8)
+        np.multiply(canvas,255,out=canvas)
+        np.add(canvas,0.5,out=canvas)
+        np.copyto(out,canvas,casting='unsafe')
+        return out
+    
+    
+    # HIDDEN METHODS
+    def _span(self,obj):
+        """
+        Returns the picture pixels covered by obj, or None if it is off the picture.
+        
+        A span is a tuple (top,bottom,left,right) of slice bounds, so bottom and right
+        are not included.  The result is a pair of the span clipped to the picture and
+        the unclipped span, which tells which part of a shrunk image is visible.
+        
+        :param obj: The object to cover
+        :type obj:  :class:`GObject`
+        """
+        w = abs(obj._sx)*obj.width/2.0
+        h = abs(obj._sy)*obj.height/2.0
+        s = self._scale
+        left   = int(math.ceil((obj.x-w)*s-0.5))
+        right  = int(math.ceil((obj.x+w)*s-0.5))
+        bottom = self._height-int(math.ceil((obj.y-h)*s-0.5))
+        top    = self._height-int(math.ceil((obj.y+h)*s-0.5))
+        if right <= left or bottom <= top:
+            return None
+        clip = (max(top,0),min(bottom,self._height),max(left,0),min(right,self._width))
+        if clip[1] <= clip[0] or clip[3] <= clip[2]:
+            return None
+        return (clip,(top,bottom,left,right))
+    
+    def _blend(self,span,color,alpha=None):
+        """
+        Blends a color (or an image with premultiplied alpha) into the canvas.
+        
+        :param span: The clipped and unclipped spans, from :meth:`_span`
+        :type span:  ``tuple``
+        
+        :param color: The color, as (r,g,b,a) from 0 to 1
+        :type color:  sequence of four numbers
+        
+        :param alpha: The coverage of each pixel (None for full coverage)
+        :type alpha:  a float32 array of the unclipped size, or ``None``
+        """
+        clip, full = span
+        area = self._canvas[clip[0]:clip[1],clip[2]:clip[3]]
+        rgb = np.asarray(color[:3],dtype=np.float32)
+        if alpha is None:
+            a = color[3]
+            if a >= 1:
+                area[:] = rgb
+            elif a > 0:
+                area *= 1-a
+                area += a*rgb
+            return
+        a = alpha[clip[0]-full[0]:clip[1]-full[0],clip[2]-full[2]:clip[3]-full[2],None]*color[3]
+        area *= 1-a
+        area += a*rgb
+    
+    def _draw_shape(self,obj,oval):
+        """
+        Draws a rectangle or an ellipse.
+        
+        :param obj: The shape to draw
+        :type obj:  :class:`GRectangle`
+        
+        :param oval: Whether the shape is an ellipse
+        :type oval:  ``bool``
+        """
+        color = obj.fillcolor
+        span = None if color is None else self._span(obj)
+        if span is None:
+            return
+        if not oval:
+            self._blend(span,color)
+            return
+        full = span[1]
+        size = (full[1]-full[0],full[3]-full[2])
+        if not size in self._ovals:
+            rows = (np.arange(size[0],dtype=np.float32)+0.5)/size[0]*2-1
+            cols = (np.arange(size[1],dtype=np.float32)+0.5)/size[1]*2-1
+            self._ovals[size] = (rows[:,None]**2+cols[None,:]**2 <= 1).astype(np.float32)
+        self._blend(span,color,self._ovals[size])
+    
+    def _draw_label(self,obj):
+        """
+        Draws a label as its background and a faint block of its text color.
+        
+        :param obj: The label to draw
+        :type obj:  :class:`GLabel`
+        """
+        span = self._span(obj)
+        if span is None:
+            return
+        if not obj.fillcolor is None:
+            self._blend(span,obj.fillcolor)
+        if obj.text and not obj.linecolor is None:
+            color = list(obj.linecolor)
+            self._blend(span,color[:3]+[color[3]*LABEL_INK])
+    
+    def _draw_bitmap(self,obj):
+        """
+        Draws the solid cells of a bitmap.
+        
+        :param obj: The bitmap to draw
+        :type obj:  :class:`GBitmap`
+        """
+        color = obj.fillcolor
+        span = None if color is None else self._span(obj)
+        if span is None:
+            return
+        full = span[1]
+        cells = obj._cells
+        rows = ((np.arange(full[1]-full[0])*cells.shape[0])//(full[1]-full[0]))[::-1]
+        cols = (np.arange(full[3]-full[2])*cells.shape[1])//(full[3]-full[2])
+        self._blend(span,color,cells[rows[:,None],cols[None,:]].astype(np.float32))
+    
+    def _draw_image(self,obj):
+        """
+        Draws an image or the current frame of a sprite, tinted by its fill color.
+        
+        :param obj: The image to draw
+        :type obj:  :class:`GImage` or :class:`GSprite`
+        """
+        span = self._span(obj)
+        if span is None or obj.source is None:
+            return
+        clip, full = span
+        frame = obj.frame if isinstance(obj,GSprite) else 0
+        format = obj._format if isinstance(obj,GSprite) else (1,1)
+        key = (obj.source,format,frame,full[1]-full[0],full[3]-full[2],obj._sx < 0,obj._sy < 0)
+        copy = self._copies.get(key)
+        if copy is None:
+            copy = self._copy(obj.source,format,frame,key[3],key[4],key[5],key[6])
+            if copy is None:
+                return
+            self._copies[key] = copy
+        
+        rows = slice(clip[0]-full[0],clip[1]-full[0])
+        cols = slice(clip[2]-full[2],clip[3]-full[2])
+        colors, clear = copy[0][rows,cols], copy[1][rows,cols]
+        area = self._canvas[clip[0]:clip[1],clip[2]:clip[3]]
+        tint = None if obj._fillcolor is None else obj._fillcolor.rgba
+        if tint is None or min(tint) >= 1:
+            area *= clear
+            area += colors
+        else:
+            area *= 1-(1-clear)*tint[3]
+            area += colors*np.asarray(tint[:3],dtype=np.float32)*tint[3]
+    
+    def _copy(self,source,format,frame,height,width,flipx,flipy):
+        """
+        Returns a shrunk copy of a frame of an image, or None if it cannot be loaded.
+        
+        The frames are cut from the image just as :class:`GSprite` cuts them.  The copy
+        is a pair of arrays, ready to blend: the colors (premultiplied by alpha) and
+        the transparency, 1 minus alpha.
+        
+        :param source: The image file name
+        :type source:  ``str``
+        
+        :param format: The rows and columns of frames in the image
+        :type format:  ``tuple``
+        
+        :param frame: The frame to copy
+        :type frame:  ``int`` >= 0
+        
+        :param height: The height of the copy
+        :type height:  ``int`` > 0
+        
+        :param width: The width of the copy
+        :type width:  ``int`` > 0
+        
+        :param flipx: Whether to mirror the copy left to right
+        :type flipx:  ``bool``
+        
+        :param flipy: Whether to mirror the copy top to bottom
+        :type flipy:  ``bool``
+        """
+        pixels = self._load(source)
+        if pixels is None:
+            return None
+        rows, cols = format
+        fw = pixels.shape[1]/cols
+        fh = pixels.shape[0]/rows
+        row, col = divmod(frame,cols)
+        # GSprite steps down the rows by the frame width, so do the same here
+        x, y = int(col*fw), int(row*fw)
+        region = pixels[y:y+int(fh),x:x+int(fw)]
+        if region.size == 0:
+            return None
+        copy = shrink(region,width,height)
+        if flipx:
+            copy = copy[:,::-1]
+        if flipy:
+            copy = copy[::-1]
+        return (np.ascontiguousarray(copy[:,:,:3]),np.ascontiguousarray(1-copy[:,:,3:]))
+    
+    def _load(self,source):
+        """
+        Returns the decoded pixels of an image file, or None if it cannot be loaded.
+        
+        The pixels are taken from the asset cache of :class:`GameApp` if they are there.
+        Otherwise the file is decoded without a texture, so no window is needed.  An
+        image that cannot be loaded is logged once, and is not drawn.
+        
+        :param source: The image file name
+        :type source:  ``str``
+        """
+        if source in self._images:
+            return self._images[source]
+        from .app import GameApp
+        from .gcache import decode_pixels
+        folder = GameApp.images if self._folder is None else self._folder
+        path = os.path.join(folder,source)
+        pixels = None
+        if not GameApp.ASSETS is None:
+            entry = GameApp.ASSETS.load('rgba',GameApp.ASSETS.digest(path))
+            if not entry is None:
+                pixels = np.asarray(entry[0])
+        if pixels is None:
+            pixels = decode_pixels(path)
+        if pixels is None:
+            from kivy.logger import Logger
+            Logger.warning('GRenderer: Cannot read the image %s' % repr(path))
+        self._images[source] = pixels
+        return pixels
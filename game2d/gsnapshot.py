@@ -0,0 +1,261 @@
+"""
+Save states for 2D game support.
+
+This module provides a way to save the attributes of a game controller (such as a
+subcontroller for a level) and put them back later.  Restoring a snapshot reuses the
+existing :class:`GObject` instances, so it is much faster than building the level
+again.  Snapshots can also be converted to JSON for save states on disk.
+"""
+import json
+from .gobject import GObject
+from .grandom import GRandom
+
+
+# The simple values that are copied directly into a snapshot
+_PLAIN = (type(None), bool, int, float, str)
+
+
+def _encode(value,keep):
+    """
+    Returns: the snapshot encoding of value, or None if value cannot be saved
+    
+    Numbers, strings, lists, tuples, dictionaries, :class:`GObject` and
+    :class:`GRandom` values are saved.  Anything else (sounds, input handlers) is
+    skipped and left alone by a restore.
+    
+    Parameter value: The value to encode
+    Precondition: None
+    
+    Parameter keep: Whether to keep a reference to GObject instances
+    Precondition: keep is a bool
+    """
+    if type(value) in _PLAIN:
+        return {'value': value}
+    elif type(value) in (list, tuple):
+        items = [_encode(x,keep) for x in value]
+        if any(x is None for x in items):
+            return None
+        return {'list': items, 'tuple': type(value) == tuple}
+    elif type(value) == dict:
+        items = {}
+        for key in value:
+            if type(key) != str:
+                return None
+            item = _encode(value[key],keep)
+            if item is None:
+                return None
+            items[key] = item
+        return {'dict': items}
+    elif isinstance(value,GObject):
+        cls = value.__class__
+        result = {'gobject': cls.__module__+'.'+cls.__qualname__, 'state': value.snapshot()}
+        # Subclasses without __slots__ (e.g. game models) may have extra attributes
+        if hasattr(value,'__dict__'):
+            attrs = {}
+            for key in value.__dict__:
+                item = _encode(value.__dict__[key],keep)
+                if not item is None:
+                    attrs[key] = item
+            result['attrs'] = attrs
+        if keep:
+            result['ref'] = value
+        return result
+    elif isinstance(value,GRandom):
+        return {'random': value.snapshot()}
+    return None
+
+
+def _decode(data,current):
+    """
+    Returns: the value stored in data, reusing current where possible
+    
+    A :class:`GObject` is restored into the instance it was saved from, if the
+    snapshot still has a reference to it.  Otherwise it is restored into ``current``,
+    as long as that is an object of the same class.  Only if neither exists is a new
+    object created.
+    
+    Parameter data: The snapshot encoding of a value
+    Precondition: data is a dict returned by _encode
+    
+    Parameter current: The value being replaced
+    Precondition: None
+    """
+    if 'value' in data:
+        return data['value']
+    elif 'list' in data:
+        items = data['list']
+        if not type(current) in (list, tuple):
+            current = ()
+        result = [_decode(items[i],current[i] if i < len(current) else None)
+                  for i in range(len(items))]
+        return tuple(result) if data['tuple'] else result
+    elif 'dict' in data:
+        items = data['dict']
+        if type(current) != dict:
+            current = {}
+        return {key: _decode(items[key],current.get(key)) for key in items}
+    elif 'gobject' in data:
+        obj = data.get('ref')
+        if obj is None:
+            name = current.__class__.__module__+'.'+current.__class__.__qualname__
+            if isinstance(current,GObject) and name == data['gobject']:
+                obj = current
+            else:
+                obj = _make_gobject(data['gobject'],data['state'])
+        obj.restore(data['state'])
+        if 'attrs' in data:
+            for key in data['attrs']:
+                setattr(obj,key,_decode(data['attrs'][key],getattr(obj,key,None)))
+        return obj
+    elif 'random' in data:
+        if not isinstance(current,GRandom):
+            current = GRandom()
+        current.restore(data['random'])
+        return current
+    return current
+
+
+def _make_gobject(name,state):
+    """
+    Returns: a new GObject of the given class, made from its saved state
+    
+    A subclass made by a game (such as a model) may have a constructor that does not
+    take the keywords of a GObject.  So the object is made with ``__new__``, and is
+    initialized by the constructor of the nearest class of this package instead.  The
+    extra attributes of the subclass are then filled in by the restore.
+    
+    Parameter name: The qualified class name
+    Precondition: name is a string module.class for a GObject subclass
+    
+    Parameter state: The saved object state
+    Precondition: state is a dict returned by GObject.snapshot
+    """
+    import importlib
+    module, _, qualname = name.rpartition('.')
+    cls = importlib.import_module(module)
+    for part in qualname.split('.'):
+        cls = getattr(cls,part)
+    assert isinstance(cls,type) and issubclass(cls,GObject), '%s is not a GObject class' % repr(name)
+    
+    base = GObject
+    for parent in cls.__mro__:
+        if parent.__module__.rpartition('.')[0] == __package__:
+            base = parent
+            break
+    # JSON turns tuples (such as the format of a sprite) into lists
+    keywords = {key: tuple(value) if type(value) == list else value for (key, value) in state.items()}
+    result = cls.__new__(cls)
+    base.__init__(result,**keywords)
+    return result
+
+
+def _strip(data):
+    """
+    Returns: a copy of data without any GObject references
+    
+    Parameter data: The snapshot encoding of a value
+    Precondition: data is a dict returned by _encode
+    """
+    if 'list' in data:
+        return {'list': [_strip(x) for x in data['list']], 'tuple': data['tuple']}
+    elif 'dict' in data:
+        return {'dict': {key: _strip(value) for (key, value) in data['dict'].items()}}
+    elif 'gobject' in data:
+        result = {'gobject': data['gobject'], 'state': data['state']}
+        if 'attrs' in data:
+            result['attrs'] = {key: _strip(value) for (key, value) in data['attrs'].items()}
+        return result
+    return data
+
+
+class GSnapshot(object):
+    """
+    A class representing the saved state of an object.
+    
+    A snapshot saves the attributes of an object (typically a controller such as a
+    level or a wave) at the moment it is made.  It records numbers, strings, lists,
+    dictionaries, random streams and graphics objects.  For each :class:`GObject` it
+    saves its state along with a reference to the object itself.  That way, restoring
+    the snapshot puts the very same objects back into the attributes, without creating
+    any new Kivy instructions.  Attributes of any other type (such as sounds) are not
+    part of the snapshot, and restoring leaves them alone.
+    
+    Snapshots loaded from JSON have no object references.  Restoring one of these reuses
+    the objects currently stored in the attributes wherever their classes match.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def attributes(self):
+        """
+        The names of the attributes saved in this snapshot.
+        
+        **Immutable**: This value cannot be altered.
+        
+        **Invariant**: Must be a tuple of strings (possibly empty)
+        """
+        return tuple(self._data.keys())
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,obj,attributes=None):
+        """
+        Creates a snapshot of the given object.
+        
+        If ``attributes`` is None, the snapshot saves every attribute of ``obj`` that
+        it knows how to save.  Otherwise it saves only the named attributes.
+        
+        :param obj: The object to save
+        :type obj:  any object with attributes
+        
+        :param attributes: The attributes to save
+        :type attributes:  ``None`` or a sequence of ``str``
+        """
+        if attributes is None:
+            attributes = [key for key in vars(obj)]
+        self._data = {}
+        for key in attributes:
+            data = _encode(getattr(obj,key),True)
+            if not data is None:
+                self._data[key] = data
+    
+    
+    # PUBLIC METHODS
+    def restore(self,obj):
+        """
+        Puts the saved attributes back into the given object.
+        
+        Graphics objects are reused wherever possible, so restoring a snapshot of a
+        level does not rebuild its sprites, labels or sounds.
+        
+        :param obj: The object to restore
+        :type obj:  the object saved, or one of the same class
+        """
+        for key in self._data:
+            setattr(obj,key,_decode(self._data[key],getattr(obj,key,None)))
+    
+    def dumps(self):
+        """
+        Returns this snapshot as a JSON string.
+        
+        The JSON form has no object references.  See :meth:`loads`.
+        
+        :return: The JSON encoding of this snapshot
+        :rtype:  ``str``
+        """
+        return json.dumps({key: _strip(data) for (key, data) in self._data.items()})
+    
+    @classmethod
+    def loads(cls,text):
+        """
+        Returns the snapshot stored in the JSON string ``text``
+        
+        :param text: The JSON encoding of a snapshot
+        :type text:  ``str``
+        
+        :return: The snapshot for the given string
+        :rtype:  :class:`GSnapshot`
+        """
+        result = cls.__new__(cls)
+        result._data = json.loads(text)
+        return result
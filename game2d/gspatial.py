@@ -0,0 +1,193 @@
+"""
+A spatial index for 2D game support.
+
+The view already skips objects that are off screen, but it still has to look at each
+object to find that out.  For a level with many objects that rarely move (such as a
+large scrolling map), this module keeps the objects in a uniform grid of cells.  Only
+the objects in the cells that overlap the screen are visited when drawing.
+"""
+
+
+class GSpatialGrid(object):
+    """
+    A class representing a uniform grid of graphics objects.
+    
+    Each object is stored in every grid cell that its bounding box (the attribute
+    ``bbox``) overlaps.  A query only visits the cells that overlap the query box, so
+    its cost depends on what is near the box, not on how many objects there are.
+    
+    The grid does not notice when an object moves.  Call :meth:`update` after moving an
+    object, which only does work if the object moved into different cells.  Objects
+    are always returned in the order they were added, so drawing through the grid
+    keeps the usual draw order.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def cell(self):
+        """
+        The side length of a grid cell.
+        
+        **Invariant**: Must be an int or float > 0.
+        """
+        return self._cell
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,cell=64):
+        """
+        Creates a new, empty grid.
+        
+        The cell size should be about the size of a typical object.
+        
+        :param cell: The side length of a grid cell
+        :type cell:  ``int`` or ``float`` > 0
+        """
+        assert type(cell) in [int,float] and cell > 0, '%s is not a valid cell size' % repr(cell)
+        self._cell = cell
+        self._cells = {}
+        self._entries = {}      # Each entry is [order, cell range]
+        self._count = 0
+    
+    def __len__(self):
+        """
+        :return: The number of objects in this grid.
+        :rtype:  ``int`` >= 0
+        """
+        return len(self._entries)
+    
+    def __contains__(self,obj):
+        """
+        :return: True if obj is in this grid.
+        :rtype:  ``bool``
+        """
+        return obj in self._entries
+    
+    
+    # PUBLIC METHODS
+    def add(self,obj):
+        """
+        Adds an object to this grid.
+        
+        Adding an object that is already in the grid just updates it.
+        
+        :param obj: The object to add
+        :type obj:  :class:`GObject`
+        """
+        if obj in self._entries:
+            self.update(obj)
+            return
+        span = self._span(obj.bbox)
+        self._entries[obj] = [self._count,span]
+        self._count += 1
+        self._insert(obj,span)
+    
+    def remove(self,obj):
+        """
+        Removes an object from this grid, if it is there.
+        
+        :param obj: The object to remove
+        :type obj:  :class:`GObject`
+        """
+        entry = self._entries.pop(obj,None)
+        if not entry is None:
+            self._delete(obj,entry[1])
+    
+    def update(self,obj):
+        """
+        Moves an object to the cells for its current bounding box.
+        
+        :param obj: The object that moved
+        :type obj:  :class:`GObject` in this grid
+        """
+        entry = self._entries[obj]
+        span = self._span(obj.bbox)
+        if span != entry[1]:
+            self._delete(obj,entry[1])
+            self._insert(obj,span)
+            entry[1] = span
+    
+    def clear(self):
+        """
+        Removes every object from this grid.
+        """
+        self._cells = {}
+        self._entries = {}
+    
+    def query(self,box):
+        """
+        Returns the objects whose bounding boxes may overlap the given box.
+        
+        The result is conservative: every object that overlaps the box is returned, but
+        so may some objects that are just outside of it.
+        
+        :param box: The query box as (left,bottom,right,top)
+        :type box:  a tuple of four numbers
+        
+        :return: The objects near the box, in the order they were added
+        :rtype:  ``list`` of :class:`GObject`
+        """
+        found = {}
+        x0, y0, x1, y1 = self._span(box)
+        for cx in range(x0,x1+1):
+            for cy in range(y0,y1+1):
+                cell = self._cells.get((cx,cy))
+                if cell:
+                    found.update(cell)
+        return sorted(found,key=lambda obj: self._entries[obj][0])
+    
+    def draw(self,view):
+        """
+        Draws the objects in this grid that are on screen.
+        
+        :param view: view to draw to
+        :type view:  :class:`GView`
+        """
+        for obj in self.query(view.bounds):
+            obj.draw(view)
+    
+    
+    # HIDDEN METHODS
+    def _span(self,box):
+        """
+        Returns the range of cells (x0,y0,x1,y1) covered by the given box.
+        
+        :param box: The box as (left,bottom,right,top)
+        :type box:  a tuple of four numbers
+        """
+        size = self._cell
+        return (int(box[0]//size),int(box[1]//size),int(box[2]//size),int(box[3]//size))
+    
+    def _insert(self,obj,span):
+        """
+        Adds obj to every cell in the given range.
+        
+        :param obj: The object to add
+        :type obj:  :class:`GObject`
+        
+        :param span: The range of cells
+        :type span:  a tuple (x0,y0,x1,y1) of ints
+        """
+        for cx in range(span[0],span[2]+1):
+            for cy in range(span[1],span[3]+1):
+                key = (cx,cy)
+                if not key in self._cells:
+                    self._cells[key] = {}
+                self._cells[key][obj] = None
+    
+    def _delete(self,obj,span):
+        """
+        Removes obj from every cell in the given range.
+        
+        :param obj: The object to remove
+        :type obj:  :class:`GObject`
+        
+        :param span: The range of cells
+        :type span:  a tuple (x0,y0,x1,y1) of ints
+        """
+        for cx in range(span[0],span[2]+1):
+            for cy in range(span[1],span[3]+1):
+                cell = self._cells[(cx,cy)]
+                del cell[obj]
+                if not cell:
+                    del self._cells[(cx,cy)]
@@ -33,7 +33,11 @@ class GSprite(GRectangle):
     
     If the image supports transparency, then this object can be used to represent irregular 
     shapes.  However, the :meth:`contains` method still treats this shape as a  rectangle.
+    The method :meth:`collides` does not; it compares the solid pixels of the current
+    frame.
     """
+    __slots__ = ('_source', '_format', '_frame', '_images', '_bounds', '_texture')
+    _SNAPSHOT = ('source', 'format', 'frame')+GRectangle._SNAPSHOT
     
     # MUTABLE PROPERTIES
     @property
@@ -44,7 +48,7 @@ class GSprite(GRectangle):
         **invariant**. Value is a string refering to a valid file.
         """
         return self._source
-
+    
     @source.setter
     def source(self,value):
         assert value is None or GameApp.is_image(value), '%s is not an image file' % repr(value)
@@ -52,6 +56,25 @@ class GSprite(GRectangle):
         if self._defined:
             self._reset()
     
+    @property
+    def format(self):
+        """
+        The grid size (rows,columns) of the frames in this filmstrip
+        
+        Changing the format starts the filmstrip over at frame 0.
+        
+        **invariant**. Value is a 2-element tuple of ints > 0.
+        """
+        return self._format
+    
+    @format.setter
+    def format(self,value):
+        self._setFormat(value)
+        self._frame  = 0
+        self._images = [None]*self.count
+        if self._defined:
+            self._reset()
+    
     @property
     def count(self):
         """
@@ -110,6 +133,43 @@ class GSprite(GRectangle):
         self._defined = True
     
     # HIDDEN METHODS
+    def _state(self):
+        """
+        Returns the drawing state of this object as a pair (texture,color).
+        
+        All frames of a filmstrip share the texture id of the strip (or its atlas page).
+        """
+        texture = 0 if self._texture is None else self._texture.id
+        return (texture,() if self._fillcolor is None else tuple(self._fillcolor.rgba))
+    
+    def _mask(self):
+        """
+        Returns the collision mask of the current frame, flipped to match the scale.
+        """
+        if self._source is None or self._angle != 0.0:
+            return None
+        masks = GameApp.load_mask(self.source,self._format)
+        if masks is None:
+            return None
+        mask = masks[self._frame]
+        return mask.resample(mask.width,mask.height,self._sx < 0,self._sy < 0)
+    
+    def _swap(self,value):
+        """
+        Changes the current frame without any checks.
+        
+        This is the fast path used by :class:`GAnimator`.  It only swaps the texture of 
+        the sprite rectangle, and does nothing if the frame is unchanged.
+        
+        Parameter value: The new frame
+        Precondition: value is an int 0..count-1
+        """
+        if value != self._frame:
+            self._frame = value
+            if self._bounds:
+                self._texture = self._images[value]
+                self._bounds.texture = self._texture
+    
     def _setFormat(self,value):
         """
         Sets the grid size of this filmstrip.
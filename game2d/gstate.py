@@ -0,0 +1,248 @@
+"""
+Game states for 2D game support.
+
+Most games move between a handful of states, such as a title screen, normal play and a
+pause menu.  This module lets a game declare each state once, with the functions to
+call when the state is entered and left, and to update and draw it every frame.  The
+state machine then only runs the functions of the current state, so a game does not
+have to test its state again and again every animation frame.
+"""
+
+
+# #mark -
+class GState(object):
+    """
+    A class representing a single game state.
+    
+    A state has four hooks.  The method :meth:`on_enter` is called when the machine
+    changes to this state, and :meth:`on_exit` when it changes away from it.  These
+    are the places to build the objects (such as messages) that only this state uses,
+    and to let go of them again.  The methods :meth:`update` and :meth:`draw` are
+    called every animation frame while this is the current state.
+    
+    The hooks call the functions given to the constructor, if any, so a state can be
+    declared without making a subclass.  A subclass may override the hooks instead.
+    
+    A state that does not change unless the player presses a key should be marked as
+    ``static``.  See the attribute ``static`` of :class:`GameApp`.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def name(self):
+        """
+        The name of this state in its state machine.
+        
+        **Invariant**: Must be a hashable value (such as an int or a string).
+        """
+        return self._name
+    
+    @property
+    def static(self):
+        """
+        Whether this state only changes when the player does something.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._static
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,name,update=None,draw=None,enter=None,exit=None,static=False):
+        """
+        Creates a new game state.
+        
+        For example, a pause menu that shows a message and waits for the player to
+        press a key might be declared as::
+            
+            GState(STATE_PAUSED,update=self.pausedUpdate,draw=self.pausedDraw,
+                   enter=self.pausedText,static=True)
+        
+        :param name: The state name
+        :type name:  a hashable value
+        
+        :param update: The function to animate a frame of this state
+        :type update:  a function taking the frame time dt, or ``None``
+        
+        :param draw: The function to draw this state
+        :type draw:  a function taking a :class:`GView`, or ``None``
+        
+        :param enter: The function to call when this state is entered
+        :type enter:  a function of no arguments or ``None``
+        
+        :param exit: The function to call when this state is left
+        :type exit:  a function of no arguments or ``None``
+        
+        :param static: Whether this state only changes on input
+        :type static:  ``bool``
+        """
+        for hook in (update,draw,enter,exit):
+            assert hook is None or callable(hook), '%s is not a function' % repr(hook)
+        assert type(static) == bool, '%s is not a bool' % repr(static)
+        self._name = name
+        self._update = update
+        self._draw = draw
+        self._enter = enter
+        self._exit = exit
+        self._static = static
+    
+    
+    # PUBLIC METHODS
+    def on_enter(self):
+        """
+        Called when the state machine changes to this state.
+        """
+        if not self._enter is None:
+            self._enter()
+    
+    def on_exit(self):
+        """
+        Called when the state machine changes away from this state.
+        """
+        if not self._exit is None:
+            self._exit()
+    
+    def update(self,dt):
+        """
+        Animates this state for a single frame.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        if not self._update is None:
+            self._update(dt)
+    
+    def draw(self,view):
+        """
+        Draws this state.
+        
+        :param view: view to draw to
+        :type view:  :class:`GView`
+        """
+        if not self._draw is None:
+            self._draw(view)
+
+
+# #mark -
+class GStateMachine(object):
+    """
+    A class representing a machine of game states.
+    
+    The states are stored by name, so changing to a state takes a single lookup, and
+    :meth:`update` and :meth:`draw` go straight to the current state.  Changing state
+    is done by assigning to the attribute ``state``::
+        
+        machine.state = STATE_ACTIVE
+    
+    This calls :meth:`GState.on_exit` of the current state and then
+    :meth:`GState.on_enter` of the new one, right away.  Hence a state may change
+    again in its enter hook (for a state that only sets something up and then moves
+    on).  A change during :meth:`update` takes effect at once, so the frame is drawn
+    in the new state, but the rest of the update function still runs.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def state(self):
+        """
+        The name of the current state.
+        
+        Assigning to this attribute changes the state, even if it is the same state.
+        It is None only before the first state is entered.
+        
+        **Invariant**: Must be the name of a state in this machine, or None.
+        """
+        return None if self._current is None else self._current.name
+    
+    @state.setter
+    def state(self,value):
+        assert value in self._states, '%s is not a state' % repr(value)
+        if not self._current is None:
+            self._current.on_exit()
+        self._current = self._states[value]
+        self._current.on_enter()
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def current(self):
+        """
+        The current state object.
+        
+        **Invariant**: Must be a :class:`GState` or None.
+        """
+        return self._current
+    
+    @property
+    def static(self):
+        """
+        Whether the current state is static.
+        
+        **Invariant**: Must be a bool.
+        """
+        return not self._current is None and self._current.static
+    
+    @property
+    def states(self):
+        """
+        The names of the states in this machine, in the order they were added.
+        
+        **Invariant**: Must be a tuple.
+        """
+        return tuple(self._states.keys())
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,*states):
+        """
+        Creates a state machine with the given states.
+        
+        The machine has no current state until one is assigned to ``state``.
+        
+        :param states: The states of this machine
+        :type states:  :class:`GState` objects with different names
+        """
+        self._states = {}
+        self._current = None
+        for state in states:
+            self.add(state)
+    
+    def __contains__(self,name):
+        """
+        :return: True if this machine has a state called ``name``
+        :rtype:  ``bool``
+        """
+        return name in self._states
+    
+    
+    # PUBLIC METHODS
+    def add(self,state):
+        """
+        Adds a state to this machine.
+        
+        :param state: The state to add
+        :type state:  :class:`GState` with a name not already in this machine
+        """
+        assert isinstance(state,GState), '%s is not a GState' % repr(state)
+        assert not state.name in self._states, 'state %s already exists' % repr(state.name)
+        self._states[state.name] = state
+    
+    def update(self,dt):
+        """
+        Animates the current state for a single frame.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        if not self._current is None:
+            self._current.update(dt)
+    
+    def draw(self,view):
+        """
+        Draws the current state.
+        
+        :param view: view to draw to
+        :type view:  :class:`GView`
+        """
+        if not self._current is None:
+            self._current.draw(view)
@@ -0,0 +1,300 @@
+"""
+Frame tracing for 2D game support.
+
+A frame that takes too long is hard to explain with a profiler, which averages over
+thousands of good frames.  This module records scoped spans instead: the name, start
+and stop time (from ``time.perf_counter_ns``) of each piece of work, along with the
+animation frame it belongs to.  The spans are written into a ring buffer that is
+allocated once, so tracing does not make garbage, and the oldest spans are overwritten
+when it fills up.
+
+The spans of the last few frames can be exported as a Chrome trace (JSON), which can
+be opened in ``chrome://tracing`` or https://ui.perfetto.dev.  Each frame shows as a
+bar, with the work done in that frame nested underneath it.
+
+There is a single tracer, ``TRACER``, which is also the attribute ``tracer`` of
+:class:`GameApp`.  It is off until it is enabled, either in code or with the trace
+key of the game (F12 by default).  When it is off, a span costs one method call and
+allocates nothing.
+"""
+import json
+import time
+
+# The default number of spans in the ring buffer
+TRACE_SIZE = 1 << 16
+
+
+# #mark -
+class _GNoSpan(object):
+    """
+    A span that does nothing, used while the tracer is off.
+    
+    There is only one of these, so turning tracing off makes no garbage at all.
+    """
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self,type,value,traceback):
+        return False
+
+
+_NOSPAN = _GNoSpan()
+
+
+# #mark -
+class _GSpan(object):
+    """
+    A span that records its start and stop time in a tracer.
+    """
+    __slots__ = ('_tracer', '_name', '_start')
+    
+    def __init__(self,tracer,name):
+        self._tracer = tracer
+        self._name = name
+        self._start = 0
+    
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self,type,value,traceback):
+        self._tracer.record(self._name,self._start)
+        return False
+
+
+# #mark -
+class GTracer(object):
+    """
+    A class representing a ring buffer of timed spans.
+    
+    The simplest way to time a piece of code is with a span::
+        
+        with TRACER.span('Wave.alienMove'):
+            self.alienMove(dt)
+    
+    The function :func:`traced` does the same for every call of a function.  Code that
+    runs many times a frame can skip the span object, and test ``enabled`` itself::
+        
+        if TRACER.enabled:
+            start = time.perf_counter_ns()
+        ...
+        if TRACER.enabled:
+            TRACER.record('GLabel._reset',start)
+    
+    The spans are stored in parallel lists that are allocated in the constructor.
+    Names are stored as small ints, and turned back into strings on export.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def enabled(self):
+        """
+        Whether spans are being recorded.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._enabled
+    
+    @enabled.setter
+    def enabled(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._enabled = value
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def capacity(self):
+        """
+        The number of spans in the ring buffer.
+        
+        **Invariant**: Must be an int > 0.
+        """
+        return len(self._starts)
+    
+    @property
+    def count(self):
+        """
+        The number of spans currently in the ring buffer.
+        
+        **Invariant**: Must be an int between 0 and capacity.
+        """
+        return min(self._next,len(self._starts))
+    
+    @property
+    def frame(self):
+        """
+        The number of the current animation frame.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._frame
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self,capacity=TRACE_SIZE):
+        """
+        Creates a tracer with a ring buffer of the given size.
+        
+        The tracer is off when it is created.
+        
+        :param capacity: The number of spans in the ring buffer
+        :type capacity:  ``int`` > 0
+        """
+        assert type(capacity) == int and capacity > 0, '%s is not a valid capacity' % repr(capacity)
+        self._enabled = False
+        self._frame = 0
+        self._names = []
+        self._ids = {}
+        self._spans  = [0]*capacity
+        self._starts = [0]*capacity
+        self._stops  = [0]*capacity
+        self._frames = [0]*capacity
+        self._next = 0
+    
+    
+    # PUBLIC METHODS
+    def span(self,name):
+        """
+        Returns a context manager that records the time spent in its block.
+        
+        If the tracer is off, the result records nothing.
+        
+        :param name: The span name
+        :type name:  ``str``
+        
+        :return: The span
+        :rtype:  a context manager
+        """
+        if not self._enabled:
+            return _NOSPAN
+        return _GSpan(self,name)
+    
+    def record(self,name,start,stop=None):
+        """
+        Records a span that has already happened.
+        
+        :param name: The span name
+        :type name:  ``str``
+        
+        :param start: The start of the span, from ``time.perf_counter_ns``
+        :type start:  ``int``
+        
+        :param stop: The end of the span (None for now)
+        :type stop:  ``int`` or ``None``
+        """
+        if stop is None:
+            stop = time.perf_counter_ns()
+        id = self._ids.get(name)
+        if id is None:
+            id = len(self._names)
+            self._ids[name] = id
+            self._names.append(name)
+        
+        slot = self._next % len(self._starts)
+        self._spans[slot]  = id
+        self._starts[slot] = start
+        self._stops[slot]  = stop
+        self._frames[slot] = self._frame
+        self._next += 1
+    
+    def advance(self):
+        """
+        Starts a new animation frame.
+        
+        This method is called for you by :class:`GameApp` at the start of each frame.
+        """
+        self._frame += 1
+    
+    def clear(self):
+        """
+        Removes every span from the ring buffer.
+        """
+        self._next = 0
+    
+    def spans(self,frames=None):
+        """
+        Returns the spans in the ring buffer, oldest first.
+        
+        Each span is a tuple (name,start,stop,frame), with times in nanoseconds.
+        
+        :param frames: The number of most recent frames to return (None for all)
+        :type frames:  ``int`` > 0 or ``None``
+        
+        :return: The spans
+        :rtype:  ``list`` of ``tuple``
+        """
+        size  = len(self._starts)
+        count = min(self._next,size)
+        first = self._next-count
+        oldest = 0 if frames is None else self._frame-frames+1
+        result = []
+        for pos in range(first,self._next):
+            slot = pos % size
+            if self._frames[slot] >= oldest:
+                result.append((self._names[self._spans[slot]],self._starts[slot],
+                               self._stops[slot],self._frames[slot]))
+        return result
+    
+    def export(self,path,frames=None):
+        """
+        Writes the spans in the ring buffer to a file as a Chrome trace.
+        
+        Each span is a complete ("X") event, with the frame number as an argument.  The
+        times are in microseconds, measured from the first span written.
+        
+        :param path: The file to write
+        :type path:  ``str``
+        
+        :param frames: The number of most recent frames to write (None for all)
+        :type frames:  ``int`` > 0 or ``None``
+        
+        :return: The number of spans written
+        :rtype:  ``int``
+        """
+        spans = self.spans(frames)
+        origin = min([span[1] for span in spans],default=0)
+        events = [{'name': name, 'cat': name.partition('.')[0], 'ph': 'X',
+                   'ts': (start-origin)/1000.0, 'dur': (stop-start)/1000.0,
+                   'pid': 1, 'tid': 1, 'args': {'frame': frame}}
+                  for (name, start, stop, frame) in spans]
+        with open(path,'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},file)
+        return len(events)
+
+
+# The tracer shared by the whole game
+TRACER = GTracer()
+
+
+def traced(name=None):
+    """
+    Returns: a decorator that records a span for every call of a function
+    
+    For example, to see how long the aliens take to move every frame, use::
+        
+        @traced('Wave.alienMove')
+        def alienMove(self,dt):
+            ...
+    
+    While tracing is off, the only cost of the decorator is one extra function call.
+    
+    Parameter name: The span name (None for the qualified name of the function)
+    Precondition: name is a string or None
+    """
+    def decorate(function):
+        import functools
+        label = function.__qualname__ if name is None else name
+        
+        @functools.wraps(function)
+        def wrapper(*args,**keywords):
+            if not TRACER._enabled:
+                return function(*args,**keywords)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args,**keywords)
+            finally:
+                TRACER.record(label,start)
+        return wrapper
+    return decorate
@@ -0,0 +1,315 @@
+"""
+Tweening support for animating the attributes of graphics objects.
+
+A tween moves an attribute of a :class:`GObject` (such as ``x``, ``y``, ``angle``,
+``scale`` or a color) from its current value to a target value over a period of time,
+following an easing curve.  All active tweens are stored together in NumPy arrays and
+evaluated in a single vectorized pass each animation frame.  The tweener provided by
+the ``tweener`` attribute of :class:`GameApp` is advanced for you at the start of every
+animation frame.
+"""
+import numpy as np
+
+
+def _ease_in_back(u):
+    """
+    Returns: the in-back easing curve at u (overshoots backwards at the start)
+    """
+    return u*u*(2.70158*u-1.70158)
+
+
+def _ease_out_back(u):
+    """
+    Returns: the out-back easing curve at u (overshoots the target at the end)
+    """
+    v = u-1
+    return 1+v*v*(2.70158*v+1.70158)
+
+
+# The supported easing curves, as vectorized functions on [0,1]
+EASINGS = {
+    'linear':      lambda u: u,
+    'in_quad':     lambda u: u*u,
+    'out_quad':    lambda u: u*(2-u),
+    'in_out_quad': lambda u: np.where(u < 0.5, 2*u*u, 1-2*(1-u)*(1-u)),
+    'in_cubic':    lambda u: u*u*u,
+    'out_cubic':   lambda u: 1-(1-u)**3,
+    'in_out_cubic':lambda u: np.where(u < 0.5, 4*u*u*u, 1-4*(1-u)**3),
+    'in_sine':     lambda u: 1-np.cos(u*np.pi/2),
+    'out_sine':    lambda u: np.sin(u*np.pi/2),
+    'in_out_sine': lambda u: (1-np.cos(u*np.pi))/2,
+    'in_back':     _ease_in_back,
+    'out_back':    _ease_out_back,
+}
+
+# The easing names, indexed by the easing ids stored in the tween arrays
+_EASING_NAMES = tuple(EASINGS.keys())
+
+# The attributes that hold colors (4 components) rather than a single number
+_COLORS = ('fillcolor', 'linecolor')
+
+# The initial number of tween slots
+_CAPACITY = 64
+
+
+class GTweener(object):
+    """
+    A class representing a collection of active tweens.
+    
+    The tweens are stored as a struct of arrays: the start values, end values, start
+    times, durations and easing curves of every tween live in parallel NumPy arrays.
+    Each call to :meth:`update` computes the current value of every tween at once and
+    then writes the results back to the objects.  Finished tweens are removed, and
+    their callbacks (if any) are called.
+    
+    Starting a new tween on an attribute that is already being tweened replaces the
+    old tween.
+    
+    You should not need to make a tweener.  Use the one in the ``tweener`` attribute
+    of :class:`GameApp`.
+    """
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def time(self):
+        """
+        The time of the tween clock in seconds.
+        
+        **Invariant**: Must be a float >= 0.
+        """
+        return self._time
+    
+    @property
+    def active(self):
+        """
+        The number of tweens currently running.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return len(self._slots)
+    
+    
+    # BUILT-IN METHODS
+    def __init__(self):
+        """
+        Creates a new tweener with no active tweens.
+        """
+        self._time = 0.0
+        self._slots = {}
+        self._free  = []
+        self._allocate(_CAPACITY)
+    
+    
+    # PUBLIC METHODS
+    def tween(self,obj,attr,value,duration,easing='linear',delay=0,callback=None):
+        """
+        Starts moving an attribute of obj to the given value.
+        
+        The tween starts from the value of the attribute when it is created (or, with a
+        delay, when the delay is over).  For example, to slide a label to the center of
+        the screen over half a second, use the method call::
+            
+            tweener.tween(label,'x',GAME_WIDTH/2,0.5,'out_cubic')
+        
+        The attribute ``scale`` is tweened uniformly, and the colors ``fillcolor`` and
+        ``linecolor`` are tweened as 4-element lists.
+        
+        :param obj: The object to animate
+        :type obj:  :class:`GObject`
+        
+        :param attr: The attribute to animate
+        :type attr:  one of 'x', 'y', 'angle', 'scale', 'fillcolor', 'linecolor' (or
+                     any other numeric attribute)
+        
+        :param value: The final value of the attribute
+        :type value:  ``int`` or ``float`` (a 4-element list for colors)
+        
+        :param duration: The length of the tween in seconds
+        :type duration:  ``int`` or ``float`` > 0
+        
+        :param easing: The easing curve
+        :type easing:  a key of ``EASINGS``
+        
+        :param delay: The time in seconds before the tween starts
+        :type delay:  ``int`` or ``float`` >= 0
+        
+        :param callback: The function to call with obj when the tween finishes
+        :type callback:  ``None`` or a function of one argument
+        """
+        assert type(attr) == str, '%s is not an attribute name' % repr(attr)
+        assert type(duration) in [int,float] and duration > 0, '%s is not a valid duration' % repr(duration)
+        assert type(delay) in [int,float] and delay >= 0, '%s is not a valid delay' % repr(delay)
+        assert easing in EASINGS, '%s is not a valid easing' % repr(easing)
+        if attr in _COLORS:
+            assert type(value) in [list,tuple] and len(value) == 4, '%s is not a 4-element color' % repr(value)
+            end = [float(x) for x in value]
+        else:
+            assert type(value) in [int,float], '%s is not a number' % repr(value)
+            end = [float(value)]*4
+        
+        self.cancel(obj,attr)
+        if not self._free:
+            self._allocate(2*len(self._used))
+        slot = self._free.pop()
+        self._slots[(id(obj),attr)] = slot
+        self._targets[slot] = (obj,attr,callback)
+        self._end[slot] = end
+        self._t0[slot] = self._time+delay
+        self._dur[slot] = duration
+        self._ease[slot] = _EASING_NAMES.index(easing)
+        self._used[slot] = True
+        self._started[slot] = False
+        if delay == 0:
+            self._start(slot)
+    
+    def cancel(self,obj,attr=None):
+        """
+        Stops tweening obj, leaving its attributes at their current values.
+        
+        Callbacks are not called for cancelled tweens.
+        
+        :param obj: The object to stop
+        :type obj:  :class:`GObject`
+        
+        :param attr: The attribute to stop (or None for all of them)
+        :type attr:  ``str`` or ``None``
+        """
+        if attr is None:
+            keys = [key for key in self._slots if key[0] == id(obj)]
+        else:
+            keys = [(id(obj),attr)] if (id(obj),attr) in self._slots else []
+        for key in keys:
+            self._release(self._slots.pop(key))
+    
+    def is_tweening(self,obj,attr=None):
+        """
+        Checks whether obj (or one attribute of obj) is being tweened.
+        
+        :param obj: The object to check
+        :type obj:  :class:`GObject`
+        
+        :param attr: The attribute to check (or None for any attribute)
+        :type attr:  ``str`` or ``None``
+        
+        :return: True if the object (attribute) is being tweened
+        :rtype:  ``bool``
+        """
+        if attr is None:
+            return any(key[0] == id(obj) for key in self._slots)
+        return (id(obj),attr) in self._slots
+    
+    def clear(self):
+        """
+        Stops all tweens, without calling any callbacks.
+        """
+        for slot in self._slots.values():
+            self._release(slot)
+        self._slots = {}
+    
+    def update(self,dt):
+        """
+        Advances the tween clock and updates every tweened attribute.
+        
+        This method is called for you by :class:`GameApp` at the start of each animation
+        frame.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        self._time += dt
+        if not self._slots:
+            return
+        
+        live = self._used & (self._t0 <= self._time)
+        # Tweens with a delay read their start value once the delay is over
+        for slot in np.flatnonzero(live & ~self._started):
+            self._start(slot)
+        
+        # One vectorized pass over every running tween
+        u = np.clip((self._time-self._t0)/self._dur,0.0,1.0)
+        eased = np.zeros_like(u)
+        for ease in np.unique(self._ease[live]):
+            mask = live & (self._ease == ease)
+            eased[mask] = EASINGS[_EASING_NAMES[ease]](u[mask])
+        values = self._begin+(self._end-self._begin)*eased[:,None]
+        
+        # Write the results back
+        done = []
+        for slot in np.flatnonzero(live):
+            obj, attr, callback = self._targets[slot]
+            if attr in _COLORS:
+                # Recolor the existing Color instruction rather than rebuild the cache
+                color = getattr(obj,'_'+attr,None)
+                if color is None:
+                    setattr(obj,attr,values[slot].tolist())
+                else:
+                    color.rgba = values[slot].tolist()
+            else:
+                setattr(obj,attr,float(values[slot,0]))
+            if u[slot] >= 1.0:
+                done.append(slot)
+        
+        # Release every finished tween before any callback can start or cancel one
+        finished = [self._targets[slot] for slot in done]
+        for (slot, (obj, attr, callback)) in zip(done,finished):
+            del self._slots[(id(obj),attr)]
+            self._release(slot)
+        for (obj, attr, callback) in finished:
+            if not callback is None:
+                callback(obj)
+    
+    
+    # HIDDEN METHODS
+    def _allocate(self,size):
+        """
+        Grows the tween arrays to hold size tweens.
+        
+        :param size: The new capacity
+        :type size:  ``int`` > current capacity
+        """
+        old = 0 if not hasattr(self,'_used') else len(self._used)
+        def grow(array,shape,dtype):
+            result = np.zeros(shape,dtype=dtype)
+            if old:
+                result[:old] = array
+            return result
+        
+        self._begin   = grow(getattr(self,'_begin',None),(size,4),float)
+        self._end     = grow(getattr(self,'_end',None),(size,4),float)
+        self._t0      = grow(getattr(self,'_t0',None),size,float)
+        self._dur     = grow(getattr(self,'_dur',None),size,float)+(np.arange(size) >= old)
+        self._ease    = grow(getattr(self,'_ease',None),size,np.int8)
+        self._used    = grow(getattr(self,'_used',None),size,bool)
+        self._started = grow(getattr(self,'_started',None),size,bool)
+        self._targets = (self._targets if old else [])+[None]*(size-old)
+        self._free.extend(range(size-1,old-1,-1))
+    
+    def _start(self,slot):
+        """
+        Records the start value of the tween in the given slot.
+        
+        :param slot: The tween slot
+        :type slot:  ``int``
+        """
+        obj, attr, callback = self._targets[slot]
+        value = getattr(obj,attr)
+        if attr in _COLORS:
+            value = [0.0,0.0,0.0,0.0] if value is None else list(value)
+        elif type(value) == tuple:
+            value = [float(value[0])]*4
+        else:
+            value = [float(value)]*4
+        self._begin[slot] = value
+        self._started[slot] = True
+    
+    def _release(self,slot):
+        """
+        Returns the given slot to the free list.
+        
+        :param slot: The tween slot
+        :type slot:  ``int``
+        """
+        self._used[slot] = False
+        self._started[slot] = False
+        self._targets[slot] = None
+        self._free.append(slot)
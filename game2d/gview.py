@@ -15,6 +15,11 @@ from kivy.uix.floatlayout import FloatLayout
 from kivy.metrics import dp
 
 from cornell import Point2
+from .gtrace import TRACER
+import time
+
+# The maximum number of key events recorded in a single animation frame
+EVENT_BUFFER = 64
 
 
 class GInput(object):
@@ -25,6 +30,12 @@ class GInput(object):
     to the user.  To access mouse information, simply access the attribute ``touch``.
     To access keyboard information, use the method :meth:`is_key_down`.
     
+    The input handler also records every key press and release as a timestamped event.
+    The events are grouped by animation frame, so the methods :meth:`was_pressed` and
+    :meth:`was_released` tell you whether a key went down (or up) since the previous
+    frame.  Use these instead of comparing :attr:`key_count` across frames; they never
+    miss or double a press, even when several keys overlap or the frame rate is low.
+    
     **You should never construct an object of this class**.  Creating a new instance
     of this class will not properly hook it up to the keyboard and mouse.  Instead, 
     you should only use the one provided in the `input` attribute of :class:`GameApp`. 
@@ -108,7 +119,7 @@ class GInput(object):
         
         **Invariant**: Must be an int > 0."""
         return self._keycount
-        
+    
     @property
     def keys(self):
         """
@@ -124,6 +135,22 @@ class GInput(object):
         """
         return tuple(k for (k,v) in self._keystate.items() if v)
     
+    @property
+    def events(self):
+        """
+        The key events that arrived during the previous animation frame.
+        
+        Each event is a tuple ``(key, pressed, time)`` where ``pressed`` is True for a 
+        key press and False for a key release, and ``time`` is the ``perf_counter`` 
+        timestamp of the event.  Events are listed in the order they arrived.
+        
+        **Immutable**: This value cannot be altered.
+        
+        **Invariant**: Must be a tuple of event tuples (possibly empty)
+        """
+        front = self._front
+        return tuple((front[0][i],front[1][i],front[2][i]) for i in range(self._fcount))
+    
     
     # BUILT-IN METHODS
     def __init__(self):
@@ -138,12 +165,19 @@ class GInput(object):
         self._view  = None
         self._touch = None
         self._keyboard = None
+        self._wake  = None
         
         self._touch_enabled = True
         self._keyboard_enabled = True
         
         self._keystate = {}
         self._keycount = 0
+        
+        # Double-buffered event queues as parallel (key, pressed, time) lists
+        self._front = ([None]*EVENT_BUFFER,[False]*EVENT_BUFFER,[0.0]*EVENT_BUFFER)
+        self._back  = ([None]*EVENT_BUFFER,[False]*EVENT_BUFFER,[0.0]*EVENT_BUFFER)
+        self._fcount = 0
+        self._bcount = 0
     
     
     # PUBLIC METHODS
@@ -173,6 +207,46 @@ class GInput(object):
         """
         return key in self._keystate and self._keystate[key]
     
+    def was_pressed(self,key):
+        """
+        Checks whether the key was pressed since the previous animation frame.
+        
+        This method is edge-triggered.  It returns True exactly once per press, no matter
+        how long the key is held down.  For example, to start a game when the user
+        presses enter, use the method call::
+            
+            input.was_pressed('enter')
+        
+        :param key: the key to test
+        :type key:  ``str``
+        
+        :return: True if ``key`` was pressed since the previous frame
+        :rtype:  ``bool``
+        """
+        keys, presses = self._front[0], self._front[1]
+        for i in range(self._fcount):
+            if presses[i] and keys[i] == key:
+                return True
+        return False
+    
+    def was_released(self,key):
+        """
+        Checks whether the key was released since the previous animation frame.
+        
+        This method is edge-triggered.  It returns True exactly once per release.
+        
+        :param key: the key to test
+        :type key:  ``str``
+        
+        :return: True if ``key`` was released since the previous frame
+        :rtype:  ``bool``
+        """
+        keys, presses = self._front[0], self._front[1]
+        for i in range(self._fcount):
+            if not presses[i] and keys[i] == key:
+                return True
+        return False
+    
     def is_touch_down(self):
         """
         Checks wether the mouse is currently held down.
@@ -187,17 +261,24 @@ class GInput(object):
     
     
     # HIDDEN METHODS
-    def _register(self,view):
+    def _register(self,view,wake=None):
         """
         Registers the view with this input handler; activating it.
         
         The input handler can only have one view at a time.  If there is an active
         view, it will unregister it first before registering the new one.
         
+        The optional function ``wake`` is called on every key or touch event, so that
+        :class:`GameApp` can resume animation frames it stopped while the game was idle.
+        
         :param view: the view to register.
         :type view:  ``GView``
+        
+        :param wake: the function to call on input
+        :type wake:  a function of no arguments or ``None``
         """
         self._view = view
+        self._wake = wake
         if self.touch_enabled:
             self._enable_touch()
         if self.keyboard_enabled:
@@ -246,6 +327,46 @@ class GInput(object):
         self._keyboard = None
         self._keystate = {}
         self._keycount = 0
+        self._fcount = 0
+        self._bcount = 0
+    
+    def _advance(self):
+        """
+        Makes the events captured since the last call available to the game.
+        
+        This method is called by :class:`GameApp` at the start of every animation frame.
+        It swaps the event buffers, so no allocation takes place.
+        """
+        self._front, self._back = self._back, self._front
+        self._fcount = self._bcount
+        self._bcount = 0
+    
+    def _record(self,key,pressed):
+        """
+        Adds a key event to the queue for the next animation frame.
+        
+        If the queue is full, the event is dropped.
+        
+        :param key: the key name
+        :type key:  ``str``
+        
+        :param pressed: True for a key press, False for a key release
+        :type pressed:  ``bool``
+        """
+        if self._bcount < EVENT_BUFFER:
+            i = self._bcount
+            self._back[0][i] = key
+            self._back[1][i] = pressed
+            self._back[2][i] = time.perf_counter()
+            self._bcount = i+1
+        self._notify()
+    
+    def _notify(self):
+        """
+        Calls the wake function (if any) because an input event arrived.
+        """
+        if not self._wake is None:
+            self._wake()
     
     def _capture_key(self, keyboard, keycode, text, modifiers):
         """
@@ -267,6 +388,7 @@ class GInput(object):
         # Need to handle the case where a release was dropped
         if not k in self._keystate or not self._keystate[k]:
             self._keycount += 1
+            self._record(k,True)
         self._keystate[k] = True
         return True
     
@@ -282,6 +404,7 @@ class GInput(object):
         """
         self._keystate[keycode[1]] = False
         self._keycount -= 1
+        self._record(keycode[1],False)
         return True
     
     def _capture_touch(self,view,touch):
@@ -295,6 +418,7 @@ class GInput(object):
         :type touch:  ``kivy.input.motionevent.TouchEvent``
         """
         self._touch = touch
+        self._notify()
         #self._touch.grab(self)
     
     def _release_touch(self,view,touch):
@@ -308,6 +432,90 @@ class GInput(object):
         :type touch:  ``kivy.input.motionevent.TouchEvent``
         """
         self._touch = None
+        self._notify()
+
+
+# #mark -
+class GScriptedInput(GInput):
+    """
+    A class representing an input handler driven by a script instead of a keyboard.
+    
+    This input handler is never registered with a view.  Instead, a program (such as a
+    scripted player or a simulation) decides which keys are held down each frame with
+    the method :meth:`hold`.  It supports all of the queries of :class:`GInput`, 
+    including the edge-triggered :meth:`was_pressed` and :meth:`was_released`, so it 
+    can be passed anywhere the game expects the ``input`` attribute of :class:`GameApp`.
+    """
+    
+    def __init__(self):
+        """
+        Creates a new scripted input handler with no keys held down
+        """
+        GInput.__init__(self)
+        self._held = False
+    
+    # PUBLIC METHODS
+    def press(self,key):
+        """
+        Presses the given key, queueing the event for the next frame.
+        
+        Pressing a key that is already held down has no effect.
+        
+        :param key: the key to press
+        :type key:  ``str``
+        """
+        if not self.is_key_down(key):
+            self._capture_key(None,(0,key),key,[])
+    
+    def release(self,key):
+        """
+        Releases the given key, queueing the event for the next frame.
+        
+        Releasing a key that is not held down has no effect.
+        
+        :param key: the key to release
+        :type key:  ``str``
+        """
+        if self.is_key_down(key):
+            self._release_key(None,(0,key))
+    
+    def hold(self,keys):
+        """
+        Starts a new frame in which exactly the given keys are held down.
+        
+        Keys not in ``keys`` are released and new keys are pressed, and then the queued
+        events become the events of this frame.  Call this once per animation frame,
+        before the game updates.  If the game is a :class:`GameApp`, its own advance to
+        the next frame is then skipped, so the events of this frame are not lost.
+        
+        :param keys: the keys held down this frame
+        :type keys:  iterable of ``str``
+        
+        :return: the number of keys newly pressed this frame
+        :rtype:  ``int`` >= 0
+        """
+        keys = set(keys)
+        pressed = 0
+        for key in self.keys:
+            if not key in keys:
+                self.release(key)
+        for key in keys:
+            if not self.is_key_down(key):
+                self.press(key)
+                pressed += 1
+        GInput._advance(self)
+        self._held = True
+        return pressed
+    
+    # HIDDEN METHODS
+    def _advance(self):
+        """
+        Makes the queued events available, unless :meth:`hold` already started this frame.
+        """
+        if self._held:
+            self._held = False
+        else:
+            GInput._advance(self)
 
 
 # #mark -
@@ -323,8 +531,57 @@ class GView(FloatLayout):
     of this class will not properly display it on the screen.  Instead, you should 
     only use the one provided in the `view` attribute of :class:`GameApp`. 
     See the documentation of that class for more information.
+    
+    By default the view culls objects: an object whose bounding box is completely off 
+    screen is not drawn at all.  Hence drawing an object that has left the screen 
+    (such as a bolt that has not yet been removed) costs almost nothing.
+    
+    Objects may also be drawn in a layer, as in ``obj.draw(view,2)``.  These objects are
+    queued, and the queue is drawn at the end of the animation frame.  Lower layers are
+    drawn first.  Objects drawn without a layer are in layer 0, before any queued 
+    objects in layer 0.  Within a layer, the queue is sorted by texture and color so
+    that objects with the same drawing state are drawn together.  Hence objects in the 
+    same layer should not overlap, unless their order does not matter.
     """
     
+    # MUTABLE PROPERTIES
+    @property
+    def culling(self):
+        """
+        Whether objects that are completely off screen are skipped.
+        
+        **Invariant**: Must be a bool.
+        """
+        return self._culling
+    
+    @culling.setter
+    def culling(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._culling = value
+    
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def bounds(self):
+        """
+        The visible area of this view as a tuple (left,bottom,right,top).
+        
+        The area is measured in the same coordinates as the objects drawn.
+        
+        **Invariant**: Must be a tuple of four numbers.
+        """
+        return self._bounds
+    
+    @property
+    def culled(self):
+        """
+        The number of objects culled since the view was last cleared.
+        
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._culled
+    
+    
     # BUILT-IN METHODS
     def __init__(self):
         """
@@ -337,6 +594,11 @@ class GView(FloatLayout):
         """
         FloatLayout.__init__(self)
         self._frame = InstructionGroup()
+        self._below = InstructionGroup()
+        self._above = InstructionGroup()
+        self._queue = []
+        self._culling = True
+        self._culled = 0
         self.bind(pos=self._reset)
         self.bind(size=self._reset)
         self._reset()
@@ -362,7 +624,12 @@ class GView(FloatLayout):
         This method is called for you automatically at the start of the animation
         frame.  That way, you are not drawing images on top of one another.
         """
-        self._frame.clear()
+        with TRACER.span('GView.clear'):
+            self._frame.clear()
+            self._below.clear()
+            self._above.clear()
+            self._queue = []
+            self._culled = 0
     
     
     # HIDDEN METHODS
@@ -370,9 +637,62 @@ class GView(FloatLayout):
         """
         Resets the view canvas in response to a resizing event
         """
+        # The objects are drawn in dp units, not pixels
+        unit = dp(1)
+        self._bounds = (self.x/unit,self.y/unit,self.right/unit,self.top/unit)
+        
         self.canvas.clear()
         self.canvas.add(Color(1,1,1))
         self.canvas.add(Rectangle(pos=self.pos,size=self.size))
         # Work-around for Retina Macs
         self.canvas.add(Scale(dp(1),dp(1),dp(1)))
+        self.canvas.add(self._below)
         self.canvas.add(self._frame)
+        self.canvas.add(self._above)
+    
+    def _culls(self,obj):
+        """
+        Checks whether obj is completely outside of this view, counting it if so.
+        
+        :param obj: The object to draw
+        :type obj:  :class:`GObject`
+        
+        :return: True if obj should be culled (skipped) when drawn
+        :rtype:  ``bool``
+        """
+        if not self._culling:
+            return False
+        box = obj.bbox
+        view = self._bounds
+        if box[2] < view[0] or box[0] > view[2] or box[3] < view[1] or box[1] > view[3]:
+            self._culled += 1
+            return True
+        return False
+    
+    def _submit(self,obj,layer):
+        """
+        Adds an object to the render queue.
+        
+        :param obj: The object to draw
+        :type obj:  :class:`GObject`
+        
+        :param layer: The drawing layer
+        :type layer:  ``int``
+        """
+        texture, color = obj._state()
+        self._queue.append((layer,texture,color,len(self._queue),obj._cache))
+    
+    def _flush(self):
+        """
+        Sorts the render queue and adds it to the frame.
+        
+        This method is called for you by :class:`GameApp` at the end of each animation
+        frame.  The submission order breaks any ties, so the sort is stable.
+        """
+        if not self._queue:
+            return
+        with TRACER.span('GView._flush'):
+            self._queue.sort(key=lambda entry: entry[:4])
+            for entry in self._queue:
+                (self._below if entry[0] < 0 else self._above).add(entry[4])
+            self._queue = []
@@ -10,6 +10,18 @@ from kivy.core.audio import SoundLoader
 from .app import GameApp
 
 
+def _level(bus):
+    """
+    Returns: the gain of the given mixer bus, or 1 if there is no mixer
+    
+    Parameter bus: The bus name
+    Precondition: bus is a string
+    """
+    if GameApp.MIXER is None:
+        return 1.0
+    return GameApp.MIXER.level(bus)
+
+
 class Sound(object):
     """
     A class representing a sound object that can be played.
@@ -32,17 +44,35 @@ class Sound(object):
         """
         The current sound volume.
         
-        1 means full volume, 0 means mute.  The default value is 1.
+        1 means full volume, 0 means mute.  The default value is 1.  The sound is
+        played at this volume times the gain of its ``bus`` in the mixer.
         
         **Invariant**: Must float in the range 0..1.
         """
-        return self._sound.volume
+        return self._volume
     
     @volume.setter
     def volume(self,value):
         assert type(value) in [int, float] and value >= 0 and value <= 1, \
             'value %s is not a valid volume' % repr(value)
-        self._sound.volume = value
+        self._volume = value
+        self._sound.volume = value*_level(self._bus)
+    
+    @property
+    def bus(self):
+        """
+        The name of the mixer bus for this sound.
+        
+        The default bus is 'sfx'.  See the class :class:`GMixer` for more information.
+        
+        **Invariant**: Must be a string.
+        """
+        return self._bus
+    
+    @bus.setter
+    def bus(self,value):
+        assert type(value) == str, 'value %s is not a bus name' % repr(value)
+        self._bus = value
     
     # IMMUTABLE PROPERTIES
     @property
@@ -68,12 +98,15 @@ class Sound(object):
         """ 
         return self._sound.state == 'play'
     
-    def __init__(self,source):
+    def __init__(self,source,bus='sfx'):
         """
         Creates a new sound from a file.
         
         :param source: The string providing the name of a sound file
         :type source:  ``str``
+        
+        :param bus: The name of the mixer bus for this sound
+        :type bus:  ``str``
         """
         from .app import GameApp
         assert GameApp.is_sound(source), 'source %s is not a sound file' % repr(source)
@@ -81,16 +114,27 @@ class Sound(object):
         self._sound  = SoundLoader.load(source)
         if self._sound is None:
             raise IOError('Module game2d cannot read the file %s' % repr(source))
+        self._volume = self._sound.volume
+        self.bus = bus
     
     def play(self,loop=False):
         """
         Plays this sound.
         
-        The sound will play until completion, or interrupted by the user.
+        The sound will play until completion, or interrupted by the user.  If its bus
+        in the mixer has already reached its limit of voices, or of sounds started this
+        animation frame, the sound is not played.
         
         :param loop: Whether or not to loop the sound
         :type loop:  ``bool``
         """
+        from .app import GameApp
+        mixer = GameApp.MIXER
+        if not mixer is None:
+            level = mixer._start(self)
+            if level is None:
+                return
+            self._sound.volume = self._volume*level
         self._sound.loop = loop
         self._sound.play()
 
@@ -179,3 +223,475 @@ class SoundLibrary(object):
         :rtype:  ``iterable``
         """
         return self._data.keys()
+
+
+# #mark -
+class _Bus(object):
+    """
+    The settings and the active voices of a single mixer bus.
+    """
+    __slots__ = ('gain', 'voices', 'starts', 'active', 'frame', 'count')
+    
+    def __init__(self,gain,voices,starts):
+        """
+        Creates a bus with the given gain and limits.
+        """
+        self.gain = gain
+        self.voices = voices
+        self.starts = starts
+        self.active = []
+        self.frame = -1
+        self.count = 0
+
+
+class GMixer(object):
+    """
+    A class representing a mixer of named sound buses.
+    
+    Every :class:`Sound` belongs to a bus, given by its attribute ``bus``.  The mixer
+    starts with the buses 'music', 'sfx' (sound effects, the default) and 'ui'.  Each
+    bus has a gain, and the sound volume is multiplied by the gain of its bus and the
+    ``master`` gain of the mixer.
+    
+    Changing a gain, or muting the mixer, only changes a number.  It does not visit or
+    reload any sounds.  Sounds pick up the new gain the next time they are played, and
+    the music player picks it up on the next animation frame.  Effects that are already
+    playing finish at their old volume.
+    
+    A bus may also limit the number of sounds playing at once (``voices``) and the number
+    of sounds started in one animation frame (``starts``).  A sound played past either
+    limit is skipped, so heavy firing cannot swamp the audio backend.
+    
+    You should not need to make a mixer.  Use the one in the ``mixer`` attribute of
+    :class:`GameApp`.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def master(self):
+        """
+        The gain applied to every bus.
+        
+        **Invariant**: Must be a float in the range 0..1.
+        """
+        return self._master
+    
+    @master.setter
+    def master(self,value):
+        assert type(value) in [int, float] and value >= 0 and value <= 1, \
+            'value %s is not a valid gain' % repr(value)
+        self._master = value
+    
+    @property
+    def muted(self):
+        """
+        Whether every bus is silenced.
+        
+        Muting keeps the gains, so unmuting restores the previous volumes.
+        
+        **Invariant**: Must be a boolean.
+        """
+        return self._muted
+    
+    @muted.setter
+    def muted(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._muted = value
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def buses(self):
+        """
+        The names of the mixer buses.
+        
+        **Immutable**: This value cannot be changed.  You should use the :meth:`add` 
+        method to alter its value.
+        
+        **Invariant**: Must be a tuple of strings.
+        """
+        return tuple(self._buses.keys())
+    
+    def __init__(self):
+        """
+        Creates a new mixer with the buses 'music', 'sfx' and 'ui'.
+        """
+        self._master = 1.0
+        self._muted = False
+        self._frame = 0
+        self._buses = {}
+        self.add('music',voices=2)
+        self.add('sfx',voices=16,starts=4)
+        self.add('ui',voices=4,starts=2)
+    
+    def add(self,name,gain=1,voices=None,starts=None):
+        """
+        Adds a bus to this mixer, replacing any bus with the same name.
+        
+        :param name: The bus name
+        :type name:  ``str``
+        
+        :param gain: The bus gain
+        :type gain:  ``int`` or ``float`` in the range 0..1
+        
+        :param voices: The most sounds that may play at once (None for no limit)
+        :type voices:  ``int`` > 0 or ``None``
+        
+        :param starts: The most sounds that may start in a frame (None for no limit)
+        :type starts:  ``int`` > 0 or ``None``
+        """
+        assert type(name) == str, 'name %s is not a string' % repr(name)
+        assert type(gain) in [int, float] and gain >= 0 and gain <= 1, 'gain %s is not valid' % repr(gain)
+        assert voices is None or (type(voices) == int and voices > 0), 'voices %s is not valid' % repr(voices)
+        assert starts is None or (type(starts) == int and starts > 0), 'starts %s is not valid' % repr(starts)
+        self._buses[name] = _Bus(gain,voices,starts)
+    
+    def gain(self,bus):
+        """
+        Returns the gain of the given bus.
+        
+        :param bus: The bus name
+        :type bus:  ``str``
+        
+        :return: The bus gain
+        :rtype:  ``float`` in the range 0..1
+        """
+        assert bus in self._buses, '%s is not a mixer bus' % repr(bus)
+        return self._buses[bus].gain
+    
+    def set_gain(self,bus,value):
+        """
+        Sets the gain of the given bus.
+        
+        :param bus: The bus name
+        :type bus:  ``str``
+        
+        :param value: The new bus gain
+        :type value:  ``int`` or ``float`` in the range 0..1
+        """
+        assert bus in self._buses, '%s is not a mixer bus' % repr(bus)
+        assert type(value) in [int, float] and value >= 0 and value <= 1, \
+            'value %s is not a valid gain' % repr(value)
+        self._buses[bus].gain = value
+    
+    def level(self,bus):
+        """
+        Returns the total gain of the given bus, including the master gain and mute.
+        
+        :param bus: The bus name
+        :type bus:  ``str``
+        
+        :return: The gain applied to sounds on the bus
+        :rtype:  ``float`` in the range 0..1
+        """
+        assert bus in self._buses, '%s is not a mixer bus' % repr(bus)
+        if self._muted:
+            return 0.0
+        return self._master*self._buses[bus].gain
+    
+    def playing(self,bus):
+        """
+        Returns the number of sounds playing on the given bus.
+        
+        Only buses with a ``voices`` limit keep track of their sounds.  The result is
+        always 0 for any other bus.
+        
+        :param bus: The bus name
+        :type bus:  ``str``
+        
+        :return: The number of sounds playing
+        :rtype:  ``int`` >= 0
+        """
+        assert bus in self._buses, '%s is not a mixer bus' % repr(bus)
+        entry = self._buses[bus]
+        entry.active = [sound for sound in entry.active if sound.playing]
+        return len(entry.active)
+    
+    def update(self,dt):
+        """
+        Starts a new animation frame for the ``starts`` limits.
+        
+        This method is called for you by :class:`GameApp` every animation frame.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        self._frame += 1
+    
+    # HIDDEN METHODS
+    def _start(self,sound):
+        """
+        Returns the gain for a sound about to be played, or None if it must be skipped.
+        
+        :param sound: The sound to play
+        :type sound:  :class:`Sound`
+        """
+        assert sound.bus in self._buses, '%s is not a mixer bus' % repr(sound.bus)
+        bus = self._buses[sound.bus]
+        if not bus.starts is None:
+            # The count is reset lazily on the first start of each frame
+            if bus.frame != self._frame:
+                bus.frame = self._frame
+                bus.count = 0
+            if bus.count >= bus.starts:
+                return None
+        
+        if not bus.voices is None and not sound in bus.active:
+            if len(bus.active) >= bus.voices:
+                bus.active = [other for other in bus.active if other.playing]
+                if len(bus.active) >= bus.voices:
+                    return None
+            bus.active.append(sound)
+        
+        if not bus.starts is None:
+            bus.count += 1
+        return self.level(sound.bus)
+
+
+# #mark -
+class GMusic(object):
+    """
+    A class representing a player for background music.
+    
+    Unlike :class:`Sound`, the music player never makes the game wait for a track.  A
+    new track is loaded on a background thread, and it only starts once it is ready.
+    The player then crossfades from the old track to the new one over the given time,
+    and unloads the old track when it is silent.  Hence at most two tracks are ever
+    loaded, however many tracks the game switches between.
+    
+    The tracks are played by the Kivy audio provider, which decodes compressed music
+    (such as MP3s) in small chunks as it plays when it supports streaming.
+    
+    You should not need to make a music player.  Use the one in the ``music`` attribute
+    of :class:`GameApp`, which is updated for you every animation frame.
+    """
+    
+    # MUTABLE PROPERTIES
+    @property
+    def volume(self):
+        """
+        The current music volume.
+        
+        1 means full volume, 0 means mute.  The default value is 1.  This is applied on
+        top of any crossfade in progress, and of the gain of the 'music' bus.
+        
+        **Invariant**: Must float in the range 0..1.
+        """
+        return self._volume
+    
+    @volume.setter
+    def volume(self,value):
+        assert type(value) in [int, float] and value >= 0 and value <= 1, \
+            'value %s is not a valid volume' % repr(value)
+        self._volume = value
+        self._apply()
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def source(self):
+        """
+        The source file of the current track.
+        
+        This is the most recent track given to :meth:`play`, even if it is still
+        loading.  It is None if no track has been played, or the music was stopped.
+        
+        **Immutable**: This value cannot be changed.  You should use the :meth:`play` 
+        and :meth:`stop` methods to alter its value.
+        
+        **Invariant**: Must be a string or None.
+        """
+        return self._source
+    
+    @property
+    def playing(self):
+        """
+        Whether or not a track is currently audible.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be a boolean.
+        """
+        return any(voice[2] > 0 for voice in self._voices)
+    
+    @property
+    def fading(self):
+        """
+        Whether or not a crossfade (or fade out) is in progress.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be a boolean.
+        """
+        return any(voice[1] != voice[2] for voice in self._voices)
+    
+    @property
+    def loading(self):
+        """
+        Whether or not a track is loading, or loaded but not yet started.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be a boolean.
+        """
+        with self._lock:
+            return not (self._request is None and self._ready is None)
+    
+    def __init__(self):
+        """
+        Creates a new music player with no track.
+        """
+        import threading
+        self._volume = 1.0
+        self._level  = 1.0
+        self._source = None
+        self._voices = []       # Each voice is [sound, gain, target gain, fade rate]
+        self._lock = threading.Lock()
+        self._request = None
+        self._ready = None
+    
+    def play(self,source,fade=0,loop=True):
+        """
+        Starts playing the given track, fading out the current one.
+        
+        The track is loaded in the background, so this method returns immediately.
+        The new track fades in (and the old one fades out) over ``fade`` seconds once
+        the new track is ready.  Playing the current track again does nothing.
+        
+        :param source: The name of a sound file
+        :type source:  ``str``
+        
+        :param fade: The length of the crossfade in seconds
+        :type fade:  ``int`` or ``float`` >= 0
+        
+        :param loop: Whether or not to loop the track
+        :type loop:  ``bool``
+        """
+        from .app import GameApp
+        assert GameApp.is_sound(source), 'source %s is not a sound file' % repr(source)
+        assert type(fade) in [int, float] and fade >= 0, 'fade %s is not a valid time' % repr(fade)
+        if source == self._source:
+            return
+        
+        import threading
+        self._source = source
+        request = (source,fade,loop)
+        with self._lock:
+            self._request = request
+            self._discard()
+        thread = threading.Thread(target=self._load,args=(request,),daemon=True)
+        thread.start()
+    
+    def stop(self,fade=0):
+        """
+        Stops the music, fading it out over ``fade`` seconds.
+        
+        A track that is still loading will not be played.
+        
+        :param fade: The length of the fade out in seconds
+        :type fade:  ``int`` or ``float`` >= 0
+        """
+        assert type(fade) in [int, float] and fade >= 0, 'fade %s is not a valid time' % repr(fade)
+        self._source = None
+        with self._lock:
+            self._request = None
+            self._discard()
+        self._fade(fade)
+    
+    def update(self,dt):
+        """
+        Starts any track that has finished loading and advances the crossfade.
+        
+        This method is called for you by :class:`GameApp` every animation frame.
+        
+        :param dt: time in seconds since last update
+        :type dt:  ``int`` or ``float``
+        """
+        with self._lock:
+            ready = self._ready
+            self._ready = None
+        
+        # At most two voices, so following the bus gain is cheap
+        level = _level('music')
+        if level != self._level:
+            self._level = level
+            self._apply()
+        
+        if not ready is None:
+            sound, fade, loop = ready
+            self._fade(fade)
+            gain = 0.0 if fade > 0 else 1.0
+            rate = 1.0/fade if fade > 0 else 0.0
+            sound.loop = loop
+            sound.volume = gain*self._volume*self._level
+            sound.play()
+            self._voices.append([sound,gain,1.0,rate])
+        
+        for voice in self._voices[:]:
+            sound, gain, target, rate = voice
+            if gain < target:
+                gain = min(target,gain+rate*dt)
+            elif gain > target:
+                gain = max(target,gain-rate*dt)
+            if gain != voice[1]:
+                voice[1] = gain
+                sound.volume = gain*self._volume*self._level
+            if gain == 0 and target == 0:
+                sound.stop()
+                sound.unload()
+                self._voices.remove(voice)
+    
+    # HIDDEN METHODS
+    def _apply(self):
+        """
+        Sets the volume of every voice from its gain, the volume and the bus gain.
+        """
+        for voice in self._voices:
+            voice[0].volume = voice[1]*self._volume*self._level
+    
+    def _fade(self,fade):
+        """
+        Starts fading out every voice over the given time.
+        
+        :param fade: The length of the fade out in seconds
+        :type fade:  ``int`` or ``float`` >= 0
+        """
+        for voice in self._voices:
+            voice[2] = 0.0
+            voice[3] = voice[1]/fade if fade > 0 else float('inf')
+    
+    def _discard(self):
+        """
+        Unloads a track that was loaded but not yet started.
+        
+        This method must be called while holding the lock.
+        """
+        if not self._ready is None:
+            self._ready[0].unload()
+            self._ready = None
+    
+    def _load(self,request):
+        """
+        Loads a track on a background thread.
+        
+        The sound is handed to :meth:`update` unless another track was requested in
+        the meantime.  If the track cannot be read, the request is dropped (so that
+        the same track can be played again later) and a warning is logged.
+        
+        :param request: The track name, fade time, and loop setting
+        :type request:  ``tuple``
+        """
+        try:
+            sound = SoundLoader.load(request[0])
+        except Exception:
+            sound = None
+        with self._lock:
+            if self._request is request:
+                self._request = None
+                if not sound is None:
+                    self._ready = (sound,request[1],request[2])
+                    return
+                self._source = None
+        if sound is None:
+            from kivy.logger import Logger
+            Logger.warning('GMusic: Cannot read the file %s' % repr(request[0]))
+        else:
+            sound.unload()
@@ -0,0 +1,104 @@
+"""
+Golden image tests for Alien Invaders
+
+This module plays a game of Alien Invaders with a scripted player and a fixed frame
+time, so that every run draws exactly the same frames.  At chosen frames, it renders
+the view into an offscreen framebuffer and compares the pixels with the golden images
+in the folder Goldens.  It reports the difference and render time for each frame, and
+exits with status 1 if any frame does not match.  Use it to check that a change to the
+drawing code (batching, culling, layers) does not change what the player sees.
+
+The first run (or a run with --update) saves the golden images instead.  Only update
+them after checking that the game still looks right.
+
+The test needs an OpenGL context but no graphics card.  On a machine without a display,
+use a virtual display and the Mesa software renderer:
+    
+    LIBGL_ALWAYS_SOFTWARE=1 xvfb-run -s "-screen 0 1024x768x24" python golden.py
+
+Software renderers round a little differently from each other, so compare against
+golden images made with the same renderer, or raise --tolerance.
+"""
+import argparse
+import os
+import sys
+
+from batch import PLAYERS
+from scripted import ScriptedGame
+
+
+# The frames to capture by default
+CHECKPOINTS = (0, 1, 30, 120, 300, 600)
+
+# The folder of golden images
+GOLDEN_FOLDER = 'Goldens'
+
+
+def make_tester(player,seed,checkpoints,golden):
+    """
+    Returns: a game that captures and checks the given frames, then quits
+    
+    The game is a ScriptedGame that also turns off the governor, which would otherwise
+    change the level of detail with the speed of the machine.
+    
+    Parameter player: The scripted player name
+    Precondition: player is a key of PLAYERS
+    
+    Parameter seed: The random seed of the game
+    Precondition: seed is an int
+    
+    Parameter checkpoints: The frames to capture
+    Precondition: checkpoints is a nonempty collection of ints >= 0
+    
+    Parameter golden: The golden images
+    Precondition: golden is a GGolden
+    """
+    import kivy.app
+    from consts import GAME_WIDTH, GAME_HEIGHT
+    from app import Invaders
+    from game2d.gcapture import capture
+    
+    frames = sorted(set(checkpoints))
+    
+    class Tester(ScriptedGame,Invaders):
+        PLAYER = player
+        SEED = seed
+        
+        def start(self):
+            self.governor.enabled = False
+            ScriptedGame.start(self)
+        
+        def after_frame(self,frame):
+            if frame in frames:
+                pixels, seconds = capture(self.view)
+                golden.check('%s-%d-%04d' % (player,seed,frame),pixels,seconds)
+            if frame >= frames[-1]:
+                kivy.app.App.stop(self)
+    
+    return Tester(width=GAME_WIDTH,height=GAME_HEIGHT,seed=seed)
+
+
+# Application code
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare Alien Invaders frames with golden images.')
+    parser.add_argument('--player',choices=sorted(PLAYERS),default='sweeper')
+    parser.add_argument('--seed',type=int,default=0,help='random seed')
+    parser.add_argument('--frames',default=','.join(map(str,CHECKPOINTS)),
+                        metavar='n1,n2,...',help='the frames to capture')
+    parser.add_argument('--folder',default=GOLDEN_FOLDER,help='golden image folder')
+    parser.add_argument('--tolerance',type=int,default=2,
+                        help='largest channel difference to ignore')
+    parser.add_argument('--limit',type=float,default=0.001,
+                        help='largest fraction of differing pixels that passes')
+    parser.add_argument('--update',action='store_true',help='save new golden images')
+    args = parser.parse_args()
+    
+    # The options above are ours, so Kivy must not try to parse them
+    os.environ['KIVY_NO_ARGS'] = '1'
+    from game2d.gcapture import GGolden
+    golden = GGolden(args.folder,args.tolerance,args.limit,args.update)
+    checkpoints = [int(frame) for frame in args.frames.split(',')]
+    make_tester(args.player,args.seed,checkpoints,golden).run()
+    
+    print(golden.report())
+    sys.exit(0 if golden.passed else 1)
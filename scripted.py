@@ -0,0 +1,74 @@
+"""
+Scripted games of Alien Invaders
+
+This module provides the mixin ScriptedGame, which turns a windowed game of Alien
+Invaders into one played by one of the scripted players of batch.py.  It is shared by
+the golden image test (golden.py) and the memory soak test (soak.py), so that both
+play exactly the same frames for the same player and seed.
+"""
+from batch import FRAME_TIME, PLAYERS
+
+
+class ScriptedGame(object):
+    """
+    A mixin for a windowed game of Invaders that is played by a scripted player.
+
+    Put this class before Invaders in the bases of a subclass, and set the class
+    attributes PLAYER (a key of PLAYERS) and SEED.  The game replaces the keyboard with
+    a GScriptedInput, and holds down the keys chosen by the player before every frame.
+    Every frame lasts exactly FRAME_TIME, and the game never goes to sleep in a static
+    state, so two runs with the same player and seed play the same frames.  Construct
+    the game with the keyword seed equal to SEED, since Invaders seeds the module
+    random (which the wave draws from) from the random stream of the game.
+
+    A subclass adds its own keys with the method extra_keys, and acts after every frame
+    (such as by checking the view or quitting) with the method after_frame.  The number
+    of frames played so far is in the attribute frame.
+    """
+
+    PLAYER = 'sweeper'
+    SEED = 0
+
+    def start(self):
+        """
+        Replaces the keyboard and seeds the player, then starts the game.
+        """
+        from game2d import GScriptedInput, GRandom
+        self._input = GScriptedInput()
+        self._rng = GRandom(self.SEED)
+        self.frame = 0
+        super().start()
+
+    def extra_keys(self,frame):
+        """
+        Returns: the keys to hold down this frame besides those of the player
+
+        Parameter frame: The current frame number
+        Precondition: frame is an int >= 0
+        """
+        return ()
+
+    def after_frame(self,frame):
+        """
+        Does nothing; a subclass acts on the frame just played here.
+
+        Parameter frame: The number of the frame just played
+        Precondition: frame is an int >= 0
+        """
+        pass
+
+    def _refresh(self,dt):
+        """
+        Holds down the keys of this frame and plays it with the time FRAME_TIME.
+
+        Parameter dt: The time in seconds since the last frame (ignored)
+        Precondition: dt is a number (int or float)
+        """
+        keys = set(PLAYERS[self.PLAYER](self.frame,self._rng))
+        keys.update(self.extra_keys(self.frame))
+        self.input.hold(keys)
+
+        self.wake()
+        super()._refresh(FRAME_TIME)
+        self.after_frame(self.frame)
+        self.frame += 1
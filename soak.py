@@ -0,0 +1,82 @@
+"""
+Memory soak test for Alien Invaders
+
+This module plays Alien Invaders for many waves with a scripted player and the memory
+telemetry of GameApp turned on.  A sample is taken at the start of every wave (and
+every new game, since the scripted player keeps pressing enter), and is written to the
+Kivy log.  Once enough waves have been played, it prints a report of the samples and
+exits with status 1 if memory or the number of live graphics objects grows steadily
+from wave to wave.
+
+Like the golden image test, it needs an OpenGL context.  On a machine without a
+display, use a virtual display and the Mesa software renderer:
+    
+    LIBGL_ALWAYS_SOFTWARE=1 xvfb-run python soak.py --waves 50
+"""
+import argparse
+import os
+import sys
+
+from batch import PLAYERS
+from scripted import ScriptedGame
+
+
+# The number of frames between presses of enter (to start the next game or wave)
+ENTER_EVERY = 90
+
+
+def make_soak(player,seed,waves):
+    """
+    Returns: a game that plays until memory has been sampled at enough waves, then quits
+    
+    The game is a ScriptedGame with memory telemetry turned on.  Besides the keys of
+    the scripted player, it taps enter every ENTER_EVERY frames.
+    
+    Parameter player: The scripted player name
+    Precondition: player is a key of PLAYERS
+    
+    Parameter seed: The random seed of the game
+    Precondition: seed is an int
+    
+    Parameter waves: The number of samples to take
+    Precondition: waves is an int > 0
+    """
+    import kivy.app
+    from consts import GAME_WIDTH, GAME_HEIGHT
+    from app import Invaders
+    
+    class Soak(ScriptedGame,Invaders):
+        PLAYER = player
+        SEED = seed
+        
+        def extra_keys(self,frame):
+            return ('enter',) if frame % ENTER_EVERY == 0 else ()
+        
+        def after_frame(self,frame):
+            if len(self.memory.samples) >= waves:
+                kivy.app.App.stop(self)
+    
+    return Soak(width=GAME_WIDTH,height=GAME_HEIGHT,seed=seed,memory=True)
+
+
+# Application code
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check Alien Invaders for memory leaks.')
+    parser.add_argument('--player',choices=sorted(PLAYERS),default='sweeper')
+    parser.add_argument('--seed',type=int,default=0,help='random seed')
+    parser.add_argument('--waves',type=int,default=20,help='waves to sample')
+    parser.add_argument('--warmup',type=int,default=2,help='samples to skip')
+    parser.add_argument('--bytes',type=int,default=65536,
+                        help='largest growth in traced memory per wave')
+    parser.add_argument('--objects',type=float,default=1.0,
+                        help='largest growth in live objects per wave')
+    args = parser.parse_args()
+    
+    os.environ['KIVY_NO_ARGS'] = '1'
+    game = make_soak(args.player,args.seed,args.waves)
+    game.run()
+    
+    print(game.memory.report())
+    leaking = game.memory.leaking(args.warmup,args.bytes,args.objects)
+    print('Memory is growing from wave to wave' if leaking else 'Memory is steady')
+    sys.exit(1 if leaking else 0)